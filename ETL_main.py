@@ -1,37 +1,34 @@
-import subprocess, sys, os
+"""
+ETL de 1000 usuarios de randomuser.me -> Resultados/.
+
+Ejecuta el pipeline único (pipeline.py); ver también ETL_main_v1.py para los
+modos streaming y por bloques.
+"""
+
+import sys
 
 # Importar las funciones
 try:
-    from Functions import api_extract, transform_data, load_and_visualize
-except ImportError:
-    print("Error al importar las funciones. Asegúrate de que 'Functions.py' está en el mismo directorio.")
-    sys.exit(1)
+    from pipeline import run_pipeline
 except ModuleNotFoundError:
     print("\nError: Módulo no encontrado.")
-    print("Asegúrate de que 'Functions.py' está en el mismo directorio.")
+    print("Asegúrate de que 'pipeline.py' está en el mismo directorio.")
     print("Y de que has instalado las dependencias manualmente ejecutando:")
     print("pip install -r requirements.txt\n")
     sys.exit(1)
 
 def run_etl():
-    # API Link
-    url = "https://randomuser.me/api"
     # Numero de Usuarios a Extraer
     users = 1000
     # Valor para generar el mismo set de usuarios.
     fixed = "1234"
 
-    # Data devuelve un JSON file de todos los usuarios
-    data = api_etl(url, results = users,seed = fixed)
+    # Extract, transform, load, estadísticas, plots y mapas (solo lo que haya cambiado)
+    run_pipeline(url="https://randomuser.me/api", users=users, seed=fixed, output_dir="Resultados",
+                 metrics_name="ETL_main")
 
-    # Función para Transformar los datos y limpiarlos
-    df_clean = transform(data)
-
-    # Función para generar las estadísticas y plots
-    make_plots(df_clean)
-    
     print("ETL Completada con Exito!")
-    
+
 # --- Ejecutar el script ---
 if __name__ == "__main__":
     run_etl()
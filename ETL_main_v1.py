@@ -1,46 +1,255 @@
-import subprocess, sys, os
+import argparse
+import os
+import shutil
 
-"""
-print("Current working directory:", os.getcwd())
-def install_requirements():
-    script_dir = os.path.dirname(os.path.abspath(__file__))  # folder where ETL_run.py is
-    req_path = os.path.join(script_dir, "requirements.txt")
-    
-    if os.path.exists(req_path):
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", req_path])
-        print("Requirements.txt file lista de packages instalados!")
-    else:
-        print("No se encuentra el archivo Requirements.txt. Instalación fallida!")
-install_requirements()
-"""
+from accumulators import UserStats
+from Functions_v1 import (api_etl, api_etl_stream, chunked, transform, transform_stream, memory_report,
+                          load_sqlite3_db, write_parquet, MAX_RESULTS_PER_PAGE)
+from http_cache import ResponseCache
+from landing import LANDING_DIR, LandingZone
+from metrics import StageMetrics
+from rate_limit import AdaptiveScheduler
+from stats_table import read_statistics
+
+def run_etl_chunked(url, users, seed, db_name, table_name, output_dir, chunk_size, cache, metrics,
+                    scheduler=None, plots=True, compact=False, landing=None, records=None, load_type="replace"):
+    """
+    ETL por bloques (out-of-core): cada bloque de chunk_size usuarios se
+    transforma, se añade a la base de datos, al dataset Parquet y a
+    raw_users.csv y actualiza los acumuladores de estadísticas antes de leer
+    el siguiente. Los gráficos y statistics.csv salen de los acumuladores, sin
+    una segunda pasada sobre los datos, así que la memoria no crece con el
+    número de usuarios. Con plots=False se omiten los gráficos y mapas y con
+    compact=True cada bloque usa el esquema compacto (ver compact_schema).
+
+    Las páginas crudas se guardan en `landing` (landing.RunWriter); con
+    `records` (e.g., LandingZone.iter_records) no se llama a la API.
+
+    load_type se aplica al primer bloque; con "replace" los siguientes se
+    añaden. Con append/upsert los gráficos y statistics.csv describen toda
+    la tabla (read_statistics), no solo los usuarios de esta ejecución.
+    """
+    fetch_stats = {}
+    stats = UserStats()
+
+    # El dataset Parquet y raw_users.csv se reescriben completos en cada ejecución
+    os.makedirs(output_dir, exist_ok=True)
+    parquet_path = os.path.join(output_dir, "usuarios_parquet")
+    if os.path.exists(parquet_path):
+        shutil.rmtree(parquet_path)
+    raw_data_path = os.path.join(output_dir, "raw_users.csv")
+
+    with metrics.stage("extract+transform+load") as m:
+        if records is None:
+            records = api_etl_stream(url, results = users, seed = seed,
+                                     page_size = MAX_RESULTS_PER_PAGE, cache = cache, stats = fetch_stats,
+                                     scheduler = scheduler, landing = landing)
+        for i, chunk in enumerate(chunked(records, chunk_size)):
+            df_chunk = transform({"results": chunk}, compact=compact)
+            del chunk
+
+            # Con "replace" solo el primer bloque reemplaza la tabla, los siguientes se añaden
+            chunk_load_type = "append" if i > 0 and load_type == "replace" else load_type
+            load_sqlite3_db(df_chunk, db_name, table_name, chunk_load_type, verbose=False)
+            write_parquet(df_chunk, output_dir, part=i, verbose=False)
+
+            # Estadísticas acumuladas (sin volver a leer los bloques anteriores)
+            stats.update_df(df_chunk)
+
+            df_chunk.to_csv(raw_data_path, mode="w" if i == 0 else "a", header=i == 0,
+                            index=False, encoding="utf-8")
+
+            print(f"Bloque {i + 1}: {stats.total.n} usuarios cargados, "
+                  f"edad media acumulada {stats.edad.value():.2f}")
+
+        m["rows"] = stats.total.n
+        m["bytes"] = fetch_stats.get("bytes", 0)
+    print(f"Datos crudos de usuarios guardados en: {raw_data_path}")
+
+    if not plots:
+        return
+
+    # Gráficos y statistics.csv desde los acumuladores
+    with metrics.stage("plots") as m:
+        # matplotlib y folium solo se cargan si se generan gráficos
+        from plots import render_plots, write_heatmap, write_statistics
+
+        inputs = read_statistics(db_name, table_name) if load_type != "replace" else None
+        if inputs is None:
+            inputs = stats.to_plot_inputs()
+        print(f"Conteo por género:\n{inputs['gender_counts']}")
+        render_plots(inputs, output_dir, parallel=True)
+        write_heatmap(stats.geo, output_dir)
+        write_statistics(inputs, output_dir)
+        m["rows"] = stats.total.n
+
+def run_etl(streaming=False, chunk_size=5000, prometheus_path=None, chunked_mode=False, users=200, plots=True,
+            compact=False, load_type="replace", workers=1, replay=None, landing_dir=None,
+            plots_from_db=False):
+    """
+    Ejecutar la ETL completa.
+
+    streaming=True decodifica la respuesta de la API como un flujo de usuarios
+    y la transforma por bloques de chunk_size, sin cargar el JSON completo en memoria.
+
+    chunked_mode=True procesa además cada bloque hasta la carga en SQLite
+    (ver run_etl_chunked): la memoria se mantiene constante con cualquier
+    número de usuarios.
+
+    plots=False solo extrae, transforma y carga (sin gráficos ni mapas): no
+    se importan matplotlib ni folium, así que arranca más rápido cuando la
+    ETL se lanza con mucha frecuencia desde un planificador.
 
-from Functions_v1 import api_etl, transform, load_sqlite3_db, make_plots
+    compact=True transforma con el esquema compacto (enteros uint8,
+    coordenadas float32, nombres category): df_clean ocupa algo menos de la
+    mitad de memoria (el uuid no cambia). Los bytes por fila se muestran y se guardan en la métrica
+    de la etapa de transformación.
 
-def run_etl():
+    workers > 1 reparte transform entre varios procesos (ver
+    parallel_transform.py); None usa todos los núcleos. No se aplica en
+    los modos streaming y chunked, que ya transforman por bloques.
+
+    Con landing_dir cada página descargada se guarda comprimida en esa zona
+    de aterrizaje (ver landing.py); por defecto no se guarda nada en disco.
+    replay=<run> vuelve a transformar y cargar una ejecución guardada en
+    landing_dir sin llamar a la API (con chunked_mode/streaming se lee
+    página a página).
+
+    load_type="append" añade a usuarios.db solo los usuarios nuevos (por
+    login.uuid): repetir la ejecución con el mismo seed no duplica filas.
+    Con append/upsert los gráficos y statistics.csv describen toda la tabla,
+    leídos de la tabla `statistics` que la carga mantiene al día.
+
+    plots_from_db=True genera los gráficos, statistics.csv y raw_users.csv
+    desde usuarios.db después de la carga (sql_stats.make_plots_from_db) y
+    libera df_clean antes: describen toda la tabla y la etapa de gráficos no
+    necesita los datos en memoria (sin mapa de calor ni Parquet). No se
+    aplica en chunked_mode, que ya los genera desde los acumuladores.
+
+    Al terminar se guarda Resultados/metrics.json con el tiempo, CPU, filas/s,
+    bytes y pico de memoria de cada etapa; si se indica prometheus_path
+    también se escribe en formato textfile de Prometheus.
+    """
     # API Link
     url = "https://randomuser.me/api"
-    # Numero de Usuarios a Extraer
-    users = 200
     # Valor para generar el mismo set de usuarios.
     fixed = "1234"
+    # Caché local de respuestas: con seed fijo las repeticiones no usan la red
+    cache = ResponseCache(".cache_api", ttl=7 * 24 * 3600, max_bytes=512 * 1024 * 1024)
+    # Ritmo adaptativo: reintenta los 429/503 de la API respetando Retry-After
+    scheduler = AdaptiveScheduler(rate=5, max_concurrency=8)
+
+    # sqlite3 DB y carpeta de resultados
+    db_name="usuarios.db"
+    table_name="usuarios"
+    output_dir_name = "Resultados"
+
+    metrics = StageMetrics("ETL_main_v1")
+    fetch_stats = {}
 
-    # Data devuelve un JSON file de todos los usuarios
-    data = api_etl(url, results = users,seed = fixed)
+    # Zona de aterrizaje: páginas crudas de esta ejecución, o la ejecución a reproducir
+    zone = LandingZone(landing_dir) if landing_dir else None
+    landing = None
+    if replay:
+        if zone is None:
+            raise ValueError("replay necesita landing_dir")
+        print(f"Reproduciendo la ejecución {replay} desde {landing_dir} (sin red)")
+    elif zone is not None:
+        landing = zone.new_run("ETL_main_v1", url=url, seed=fixed, results=users)
+        print(f"Páginas crudas guardadas en {landing_dir} (ejecución {landing.run_id})")
 
-    # Función para Transformar los datos y limpiarlos
-    df_clean = transform(data)
+    if chunked_mode:
+        run_etl_chunked(url, users, fixed, db_name, table_name, output_dir_name, chunk_size, cache, metrics,
+                        scheduler, plots, compact, landing=landing,
+                        records=zone.iter_records(replay) if replay else None, load_type=load_type)
+        metrics.write_json(output_dir_name)
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+        print("✅ ETL Completada con Exito!")
+        return
+
+    if streaming:
+        # Generador de usuarios + transformación por bloques (una sola etapa)
+        with metrics.stage("extract+transform") as m:
+            if replay:
+                records = zone.iter_records(replay)
+            else:
+                records = api_etl_stream(url, results = users, seed = fixed, cache = cache, stats = fetch_stats,
+                                         scheduler = scheduler, landing = landing)
+            df_clean = transform_stream(records, chunk_size, compact=compact)
+            m["rows"] = len(df_clean)
+            m["bytes_per_row"] = memory_report(df_clean)["bytes_per_row"]
+            m["bytes"] = fetch_stats.get("bytes", 0)
+    else:
+        # Data devuelve un JSON file de todos los usuarios
+        with metrics.stage("extract") as m:
+            if replay:
+                data = zone.replay(replay)
+            else:
+                # Más de MAX_RESULTS_PER_PAGE usuarios se piden en páginas concurrentes
+                data = api_etl(url, results = users,seed = fixed, page_size = MAX_RESULTS_PER_PAGE,
+                               cache = cache, stats = fetch_stats, scheduler = scheduler, landing = landing)
+            m["rows"] = len(data["results"])
+            m["bytes"] = fetch_stats.get("bytes", 0)
+
+        # Función para Transformar los datos y limpiarlos
+        with metrics.stage("transform") as m:
+            df_clean = transform(data, compact=compact, workers=workers)
+            m["rows"] = len(df_clean)
+            m["bytes_per_row"] = memory_report(df_clean)["bytes_per_row"]
+
+    print(f"Memoria de df_clean: {m['bytes_per_row']} bytes por fila")
 
     # Función para cargar los datos en sqlite3 DB
-    db_name="usuarios.db"
-    table_name="usuarios"
-    load_sqlite3_db(df_clean,db_name,table_name)
+    with metrics.stage("load") as m:
+        m["rows"] = load_sqlite3_db(df_clean,db_name,table_name,load_type)
     
     # Función para generar las estadísticas y plots
-    output_dir_name = "Resultados"
-    make_plots(df_clean,output_dir_name)
+    if plots and plots_from_db:
+        # Todo sale de usuarios.db: df_clean ya no hace falta en memoria
+        del df_clean
+        with metrics.stage("plots") as m:
+            from sql_stats import make_plots_from_db
+            m["rows"] = make_plots_from_db(db_name, table_name, output_dir_name, parallel=True)["n_users"]
+    elif plots:
+        with metrics.stage("plots") as m:
+            from plots import make_plots
+            inputs = read_statistics(db_name, table_name) if load_type != "replace" else None
+            make_plots(df_clean,output_dir_name,parallel=True,inputs=inputs)
+            m["rows"] = len(df_clean)
+
+    # Informe de métricas por etapa
+    metrics.write_json(output_dir_name)
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
     
     print("✅ ETL Completada con Exito!")
     
 # --- Ejecutar el script ---
 if __name__ == "__main__":
-    run_etl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ETL de usuarios de randomuser.me")
+    parser.add_argument("--users", type=int, default=200, help="Número de usuarios a extraer")
+    parser.add_argument("--streaming", action="store_true", help="Extraer y transformar como flujo")
+    parser.add_argument("--chunked", action="store_true", help="Procesar por bloques hasta la carga")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Usuarios por bloque")
+    parser.add_argument("--no-plots", action="store_true", help="Solo extraer, transformar y cargar")
+    parser.add_argument("--plots-from-db", action="store_true",
+                        help="Generar gráficos y statistics.csv desde usuarios.db después de la carga")
+    parser.add_argument("--compact", action="store_true", help="Esquema compacto de df_clean (menos memoria)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para transform (0 = todos los núcleos)")
+    parser.add_argument("--load-type", choices=("replace", "append", "upsert"), default="replace",
+                        help="Carga en SQLite: reemplazar la tabla o añadir solo usuarios nuevos")
+    parser.add_argument("--replay", metavar="RUN",
+                        help="Transformar y cargar una ejecución guardada en la zona de aterrizaje (sin red)")
+    parser.add_argument("--landing-dir",
+                        help=f"Guardar las páginas crudas en esta zona de aterrizaje (con --replay, "
+                             f"por defecto {LANDING_DIR})")
+    parser.add_argument("--prometheus", help="Fichero textfile de Prometheus para las métricas")
+    args = parser.parse_args()
+
+    run_etl(streaming=args.streaming, chunk_size=args.chunk_size, prometheus_path=args.prometheus,
+            chunked_mode=args.chunked, users=args.users, plots=not args.no_plots, compact=args.compact,
+            load_type=args.load_type, workers=args.workers or None, replay=args.replay,
+            landing_dir=args.landing_dir or (LANDING_DIR if args.replay else None),
+            plots_from_db=args.plots_from_db)
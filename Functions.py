@@ -11,10 +11,12 @@ data = api_etl(url, results = users,seed = fixed)
 """
 
 import requests
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
+from accumulators import rango_edad
+from extractor import compile_extractor
+
 def api_etl(url: str, results: int, seed: str):
     """
     Función para extraer los datos de dentro de randomuser.me API y devolverlos en formato JSON.
@@ -45,13 +47,10 @@ def api_etl(url: str, results: int, seed: str):
 
 def transform(data):
     """
-    Transformar los datos JSON obtenidos, normalizar y devolver un DataFrame limpio.
-    Extraer, seleccionar solo las columnas relevantes, renombrar y convertir los Datos.
+    Transformar los datos JSON obtenidos y devolver un DataFrame limpio.
+    Extraer solo las columnas relevantes, renombrarlas y convertir los Datos.
     """
     
-    # Normalizar los Datos JSON a Dataframe
-    df = pd.json_normalize(data["results"])
-    
     # Columns to rename
     rename_colls = {
         "gender": "Genero",
@@ -61,18 +60,21 @@ def transform(data):
         "dob.age": "Edad",
         "location.country": "Pais"
     }
-    
-    # Seleccionar solo columnas existentes
-    columnas_seleccionadas = [col for col in rename_colls if col in df.columns]
-    df_clean = df[columnas_seleccionadas]
-    
-    # Renombrar (sin asignar inplace)
-    df_clean = df_clean.rename(columns=rename_colls)
-    
-    # Conversión de las columnas a variables int / float / datetime /category
-    df_clean["Genero"] = df_clean["Genero"].astype("category")
-    df_clean["Nacionalidad"] = df_clean["Nacionalidad"].astype("category")
-    df_clean["Pais"] = df_clean["Pais"].astype("category")
+
+    # Conversión de las columnas a variables int / category
+    dtypes = {
+        "Genero": "category",
+        "Nacionalidad": "category",
+        "Pais": "category",
+        "Edad": "int"
+    }
+
+    # Extractor columnar: lee solo estas rutas, sin pd.json_normalize
+    extract = compile_extractor(rename_colls, dtypes)
+    df_clean = extract(data["results"])
+
+    # Rango de edad que usa make_plots (gráfico 3)
+    df_clean['RangoEdad'] = rango_edad(df_clean['Edad'])
     
     return df_clean
 
@@ -11,23 +11,49 @@ data = api_etl(url, results = users,seed = fixed)
 """
 
 import requests
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import codecs
+import contextlib
+import json
 import os
+import shutil
 import sqlite3
 
-import statistics
-import csv
-import random
-import folium
-import webbrowser
-import pathlib
-import sys
-import subprocess
-from collections import Counter
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from accumulators import RANGO_BINS, RANGO_LABELS, rango_edad
+from bloom import BloomFilter, MIN_CAPACITY, drop_filter, existing_keys, load_filter, rebuild_filter, save_filter
+from extractor import compile_extractor
+from countries import category_codes
+import stats_table
+
+# Funciones de la etapa de gráficos y mapas (plots.py). Se importan solo al
+# usarlas para que extraer y cargar no cargue matplotlib ni folium.
+_LAZY_PLOTS = (
+    "plot_inputs", "plot_gender", "plot_age", "plot_country", "plot_bivar", "plot_rango",
+    "PLOTS", "render_plots", "write_statistics", "write_heatmap", "make_plots",
+)
+
+def __getattr__(name):
+    if name in _LAZY_PLOTS:
+        import plots
+        return getattr(plots, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Máximo de usuarios que randomuser.me devuelve en una sola petición
+MAX_RESULTS_PER_PAGE = 5000
+
+# Protege los contadores de count_fetch en la descarga concurrente
+_STATS_LOCK = threading.Lock()
 
         
-def api_etl(url: str, results: int, seed: str):
+def api_etl(url: str, results: int, seed: str, page_size: int | None = None, max_workers: int = 8,
+            cache=None, stats=None, scheduler=None, landing=None):
     """
     Función para extraer los datos de dentro de randomuser.me API y devolverlos en formato JSON.
 
@@ -39,30 +65,479 @@ def api_etl(url: str, results: int, seed: str):
         Numero de usuarios a extraer (e.g., 500)
     seed : str
         Seed valor para generar el mismo set de usuarios.
+    page_size : int, optional
+        Si se indica y results > page_size, la extracción se divide en páginas
+        concurrentes (ver api_etl_paginated).
+    max_workers : int
+        Número de peticiones simultáneas en modo paginado.
+    cache : http_cache.ResponseCache, optional
+        Caché local de respuestas; con seed se evita repetir la petición.
+    stats : dict, optional
+        Se acumulan 'requests', 'bytes' y 'cache_hits' (ver count_fetch).
+    scheduler : rate_limit.AdaptiveScheduler, optional
+        Control de ritmo con reintentos para los 429/503 de la API.
+    landing : landing.RunWriter, optional
+        Ejecución de la zona de aterrizaje donde se guarda cada página cruda
+        (también las servidas desde cache), para reproducirla sin red. Una
+        página que ya está en la zona no se vuelve a guardar (ver landing.py).
     """
+    if page_size and results > page_size:
+        return api_etl_paginated(url, results, seed, page_size=page_size, max_workers=max_workers,
+                                 cache=cache, stats=stats, scheduler=scheduler, landing=landing)
+
     params: Dict[str, str | int] = {
         "results": results, # El resultado de Nº users que queremos extraer
         "seed": seed,       # Seeds permite generar la misma seleccion de usuarios.
         "format": "json"    # JSON,CSV,XML,YAML output
     }
 
+    # Respuesta ya descargada con los mismos parámetros
+    use_cache = cache is not None and cache.cacheable(params)
+    if use_cache:
+        body = cache.get(url, params)
+        if body is not None:
+            count_fetch(stats, len(body), cache_hits=1)
+            if landing is not None:
+                landing.write_page(1, body, url=url, params=params)
+            return json.loads(body)
+
     try:
-        response = requests.get(url, params=params)
+        if scheduler is not None:
+            with make_session(pool_size=1, retries=0, status_forcelist=()) as session:
+                response = scheduler.get(session, url, params=params, timeout=60)
+        else:
+            response = requests.get(url, params=params, timeout=60)
         response.raise_for_status()   # Si requests falla nos da información con un mensaje de error
-    
-    except requests.exceptions.RequestException as e:    
+
+    except requests.exceptions.RequestException as e:
+        # Sin respuesta válida no hay datos que devolver
         print(f"Error extrayendo los datos: {e}")
-        
+        raise
+
+    count_fetch(stats, len(response.content), requests=1)
+    if use_cache:
+        cache.put(url, params, response.content)
+    if landing is not None:
+        landing.write_page(1, response.content, url=url, params=params)
     return response.json()
 
-def transform(data):
+def count_fetch(stats, nbytes: int = 0, requests: int = 0, cache_hits: int = 0):
     """
-    Transformar los datos JSON obtenidos, normalizar y devolver un DataFrame limpio.
-    Extraer, seleccionar solo las columnas relevantes, renombrar y convertir los Datos.
+    Acumular en `stats` (si se indica) las peticiones, los bytes recibidos y
+    los aciertos de cache. Es seguro llamarla desde varios hilos.
     """
-    
-    # Normalizar los Datos JSON a Dataframe
-    df = pd.json_normalize(data["results"])
+    if stats is None:
+        return
+    with _STATS_LOCK:
+        stats["requests"] = stats.get("requests", 0) + requests
+        stats["cache_hits"] = stats.get("cache_hits", 0) + cache_hits
+        stats["bytes"] = stats.get("bytes", 0) + nbytes
+
+def make_session(pool_size: int = 8, retries: int = 5, backoff: float = 0.5,
+                 status_forcelist=(429, 500, 502, 503, 504)):
+    """
+    Crear una requests.Session con conexiones keep-alive reutilizables (pool)
+    y reintentos automáticos con backoff exponencial.
+
+    Parameters
+    ----------
+    pool_size : int
+        Número máximo de conexiones abiertas contra el mismo host.
+    retries : int
+        Número máximo de reintentos por petición.
+    backoff : float
+        Factor de espera entre reintentos (0.5 -> 0.5s, 1s, 2s, ...).
+    status_forcelist : tuple
+        Códigos HTTP que provocan un reintento.
+
+    Con un AdaptiveScheduler se usa retries=0 y status_forcelist=(): los
+    reintentos los hace el scheduler, que necesita ver cada 429/503.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=status_forcelist,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _get(session, url: str, params: dict, scheduler=None, **kwargs):
+    """
+    session.get, o scheduler.get si hay control de ritmo.
+    """
+    if scheduler is None:
+        return session.get(url, params=params, **kwargs)
+    return scheduler.get(session, url, params=params, **kwargs)
+
+def fetch_page(session, url: str, page: int, page_size: int, seed: str, cache=None, stats=None,
+               scheduler=None, landing=None):
+    """
+    Descargar una sola página de usuarios. Con el mismo seed y page_size cada
+    página devuelve siempre los mismos usuarios (y se puede servir desde cache).
+    Con scheduler la petición pasa por su control de ritmo y reintentos.
+    Con landing la página cruda se guarda en la zona de aterrizaje.
+    """
+    params = {
+        "results": page_size,
+        "seed": seed,
+        "page": page,
+        "format": "json"
+    }
+    use_cache = cache is not None and cache.cacheable(params)
+    if use_cache:
+        body = cache.get(url, params)
+        if body is not None:
+            count_fetch(stats, len(body), cache_hits=1)
+            if landing is not None:
+                landing.write_page(page, body, url=url, params=params)
+            return json.loads(body)
+
+    response = _get(session, url, params, scheduler, timeout=60)
+    response.raise_for_status()
+    count_fetch(stats, len(response.content), requests=1)
+    if use_cache:
+        cache.put(url, params, response.content)
+    if landing is not None:
+        landing.write_page(page, response.content, url=url, params=params)
+    return response.json()
+
+def api_etl_paginated(url: str, results: int, seed: str, page_size: int = MAX_RESULTS_PER_PAGE,
+                      max_workers: int = 8, session=None, cache=None, stats=None, scheduler=None, landing=None):
+    """
+    Extraer un número grande de usuarios dividiendo la petición en páginas
+    (parámetro 'page' de la API) que se descargan en paralelo.
+
+    Todas las páginas comparten seed y page_size, por lo que el resultado es
+    determinista: se unen en orden de página y se recorta al número pedido.
+    Devuelve el mismo formato que api_etl: {"results": [...], "info": {...}}.
+
+    Parameters
+    ----------
+    url : str
+        API Link "https://randomuser.me/api"
+    results : int
+        Numero total de usuarios a extraer (e.g., 100000)
+    seed : str
+        Seed valor para generar el mismo set de usuarios.
+    page_size : int
+        Usuarios por página (máximo MAX_RESULTS_PER_PAGE).
+    max_workers : int
+        Número de páginas descargadas a la vez.
+    session : requests.Session, optional
+        Sesión a reutilizar; por defecto se crea una con make_session().
+    cache : http_cache.ResponseCache, optional
+        Caché local; cada página se guarda y se busca por separado.
+    stats : dict, optional
+        Contadores de peticiones y bytes (ver count_fetch).
+    scheduler : rate_limit.AdaptiveScheduler, optional
+        Control de ritmo adaptativo; el número de hilos pasa a ser su
+        max_concurrency y el scheduler decide cuántas peticiones van a la vez.
+    landing : landing.RunWriter, optional
+        Zona de aterrizaje donde se guarda cada página cruda.
+    """
+    page_size = max(1, min(page_size, MAX_RESULTS_PER_PAGE, results))
+    n_pages = -(-results // page_size)   # División redondeando hacia arriba
+    pages = range(1, n_pages + 1)
+    if scheduler is not None:
+        max_workers = scheduler.max_concurrency
+
+    own_session = session is None
+    if own_session:
+        if scheduler is not None:
+            session = make_session(pool_size=max_workers, retries=0, status_forcelist=())
+        else:
+            session = make_session(pool_size=max_workers)
+
+    try:
+        # executor.map devuelve los resultados en el orden de 'pages'
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            payloads = list(executor.map(
+                lambda p: fetch_page(session, url, p, page_size, seed, cache, stats, scheduler, landing), pages))
+    except requests.exceptions.RequestException as e:
+        print(f"Error extrayendo los datos: {e}")
+        raise
+    finally:
+        if own_session:
+            session.close()
+
+    users = [user for payload in payloads for user in payload["results"]][:results]
+    info = dict(payloads[0].get("info", {})) if payloads else {}
+    info.update({"seed": seed, "results": len(users), "page": n_pages})
+
+    print(f"Datos extraídos: {len(users)} usuarios en {n_pages} páginas.")
+    return {"results": users, "info": info}
+
+# Caracteres con los que puede continuar un número JSON
+NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+def iter_json_array(chunks, key: str = "results"):
+    """
+    Decodificar de forma incremental el array `key` de un objeto JSON recibido
+    por trozos (bytes) y devolver sus elementos uno a uno como generador.
+
+    Solo se mantiene en memoria el trozo pendiente de decodificar y el
+    elemento actual, nunca el documento completo. El resto del objeto raíz
+    también se lee hasta su cierre, así que un cuerpo truncado lanza
+    ValueError (después de devolver los elementos completos).
+
+    Parameters
+    ----------
+    chunks : iterable de bytes
+        Trozos del cuerpo de la respuesta (e.g., response.iter_content()).
+    key : str
+        Clave del objeto raíz que contiene el array (default 'results').
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        # Leer el siguiente trozo y descartar lo ya consumido del buffer
+        nonlocal buf, pos, eof
+        for chunk in chunks:
+            text = utf8.decode(chunk)
+            if text:
+                buf = buf[pos:] + text
+                pos = 0
+                return
+        buf = buf[pos:] + utf8.decode(b"", final=True)
+        pos, eof = 0, True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError(f"JSON inesperado en posición {pos}: se esperaba {chars!r}")
+        pos += 1
+        return buf[pos - 1]
+
+    def value():
+        # Decodificar un valor completo; si el buffer se queda corto, leer más
+        nonlocal pos
+        skip_ws()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # Un número al final del buffer puede seguir en el siguiente trozo ("7." + "5")
+                complete = end < len(buf) and not (isinstance(obj, (int, float)) and buf[end] in NUMBER_CHARS)
+                if complete or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect("{")
+    skip_ws()
+    if buf[pos:pos + 1] == "}":
+        return
+    while True:
+        name = value()
+        expect(":")
+        if name != key:
+            value()
+        else:
+            expect("[")
+            skip_ws()
+            if buf[pos:pos + 1] == "]":
+                pos += 1
+            else:
+                while True:
+                    yield value()
+                    if expect(",]") == "]":
+                        break
+        if expect(",}") == "}":
+            return
+
+def _tee(chunks, sink):
+    """
+    Copiar cada trozo de la respuesta en `sink` mientras se decodifica.
+    """
+    for chunk in chunks:
+        sink.write(chunk)
+        yield chunk
+
+def _landing_writer(landing, page, url, params):
+    """
+    Escritor de la página en la zona de aterrizaje, o nada si no hay.
+    """
+    if landing is None:
+        return contextlib.nullcontext()
+    return landing.writer(page, url=url, params=params)
+
+def _counted(chunks, stats):
+    """
+    Contar los bytes de cada trozo leído (ver count_fetch).
+    """
+    for chunk in chunks:
+        count_fetch(stats, len(chunk))
+        yield chunk
+
+def api_etl_stream(url: str, results: int, seed: str, page_size: int | None = None,
+                   chunk_size: int = 64 * 1024, session=None, cache=None, stats=None, scheduler=None,
+                   landing=None):
+    """
+    Extraer usuarios de randomuser.me como generador, decodificando el array
+    'results' a medida que llegan los bytes de la respuesta (stream=True).
+
+    La memoria usada depende de chunk_size y no del total de usuarios.
+
+    Parameters
+    ----------
+    url : str
+        API Link "https://randomuser.me/api"
+    results : int
+        Numero de usuarios a extraer
+    seed : str
+        Seed valor para generar el mismo set de usuarios.
+    page_size : int, optional
+        Usuarios por petición; por defecto una sola petición (hasta MAX_RESULTS_PER_PAGE).
+    chunk_size : int
+        Bytes leídos de la respuesta en cada iteración.
+    session : requests.Session, optional
+        Sesión a reutilizar; por defecto se crea una con make_session().
+    cache : http_cache.ResponseCache, optional
+        Caché local; las páginas cacheadas se leen del disco también por trozos.
+    stats : dict, optional
+        Contadores de peticiones y bytes (ver count_fetch).
+    scheduler : rate_limit.AdaptiveScheduler, optional
+        Control de ritmo con reintentos para los 429/503 de la API.
+    landing : landing.RunWriter, optional
+        Zona de aterrizaje: cada página se copia comprimida mientras se
+        decodifica (y se lee completa aunque no se usen todos sus usuarios).
+    """
+    page_size = max(1, min(page_size or results, MAX_RESULTS_PER_PAGE, results))
+    n_pages = -(-results // page_size)
+
+    own_session = session is None
+    if own_session:
+        if scheduler is not None:
+            session = make_session(pool_size=1, retries=0, status_forcelist=())
+        else:
+            session = make_session(pool_size=1)
+
+    pending = results
+    try:
+        for page in range(1, n_pages + 1):
+            params = {"results": page_size, "seed": seed, "page": page, "format": "json"}
+            use_cache = cache is not None and cache.cacheable(params)
+
+            # Página ya descargada: se decodifica desde el archivo comprimido
+            cached = cache.open(url, params) if use_cache else None
+            if cached is not None:
+                count_fetch(stats, cache_hits=1)
+                with cached, _landing_writer(landing, page, url, params) as landed:
+                    chunks = _counted(iter(lambda: cached.read(chunk_size), b""), stats)
+                    if landed is not None:
+                        chunks = _tee(chunks, landed)
+                    for user in iter_json_array(chunks):
+                        yield user
+                        pending -= 1
+                        if pending == 0:
+                            break
+                    if landed is not None:
+                        for _ in chunks:
+                            pass
+                if pending == 0:
+                    return
+                continue
+
+            with _get(session, url, params, scheduler, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                count_fetch(stats, requests=1)
+                chunks = _counted(response.iter_content(chunk_size), stats)
+                with cache.writer(url, params) if use_cache else contextlib.nullcontext() as sink, \
+                        _landing_writer(landing, page, url, params) as landed:
+                    if sink is not None:
+                        chunks = _tee(chunks, sink)
+                    if landed is not None:
+                        chunks = _tee(chunks, landed)
+                    for user in iter_json_array(chunks):
+                        yield user
+                        pending -= 1
+                        if pending == 0:
+                            break
+                    # Leer el resto de la respuesta para guardarla completa
+                    if sink is not None or landed is not None:
+                        for _ in chunks:
+                            pass
+            if pending == 0:
+                return
+    finally:
+        if own_session:
+            session.close()
+
+def chunked(records, size: int):
+    """
+    Agrupar un iterable de usuarios en listas de como máximo `size` elementos.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def transform_stream(records, chunk_size: int = 5000, compact: bool = False):
+    """
+    Transformar un generador de usuarios por bloques de chunk_size y devolver
+    un único DataFrame limpio, sin materializar nunca toda la lista de dicts.
+    Con compact=True se usa el esquema compacto (ver compact_schema).
+    """
+    frames = [transform({"results": chunk}, compact=compact) for chunk in chunked(records, chunk_size)]
+    if not frames:
+        return pd.DataFrame()
+
+    df_clean = pd.concat(frames, ignore_index=True)
+
+    # pd.concat pierde el tipo category si las categorías difieren entre bloques
+    category_cols = ("Genero", "Nacionalidad", "Pais", "CodigoPais") + (COMPACT_CATEGORY_COLS if compact else ())
+    for col in category_cols:
+        if col in df_clean.columns:
+            df_clean[col] = df_clean[col].astype("category")
+    return df_clean
+
+def transform(data, compact: bool = False, age_bins=RANGO_BINS, age_labels=RANGO_LABELS, workers: int = 1):
+    """
+    Transformar los datos JSON obtenidos y devolver un DataFrame limpio.
+    Extraer solo las columnas relevantes, renombrarlas y convertir los Datos.
+
+    Se usa un extractor columnar (extractor.py) que lee únicamente las rutas
+    de rename_colls en columnas ya tipadas, en lugar de aplanar todos los
+    campos de cada usuario con pd.json_normalize.
+
+    Las columnas derivadas (RangoEdad con los rangos age_bins/age_labels,
+    Registered y CodigoPais) se calculan aquí en una sola pasada vectorizada
+    (ver derive_features) y se guardan en usuarios.db con el resto.
+
+    Con compact=True el DataFrame usa el esquema compacto (ver compact_schema).
+
+    Con workers > 1 (o None = todos los núcleos) los usuarios se reparten
+    entre varios procesos que escriben las columnas en memoria compartida
+    (ver parallel_transform.py); el resultado es el mismo DataFrame.
+    """
+    if workers != 1:
+        from parallel_transform import transform_parallel
+        return transform_parallel(data, workers, compact=compact, age_bins=age_bins, age_labels=age_labels)
     
     # Columns to rename
     rename_colls = {
@@ -73,234 +548,462 @@ def transform(data):
         "dob.age": "Edad",
         "location.country": "Pais",
         "location.coordinates.latitude": "latitude",
-        "location.coordinates.longitude": "longitude"
+        "location.coordinates.longitude": "longitude",
+        "registered.age": "Registered",
+        "login.uuid": "uuid"            # Identificador único del usuario (clave del upsert)
     }
+
+    # Conversión de las columnas a variables int / float / category
+    dtypes = {
+        "Genero": "category",
+        "Nacionalidad": "category",
+        "Pais": "category",
+        "Edad": "int",
+        "latitude": "float",   # lat/lon llegan como texto; inválidos -> NaN
+        "longitude": "float",
+        "Registered": "int"
+    }
+
+    # Extraer solo las columnas seleccionadas (las que no existen se omiten)
+    extract = compile_extractor(rename_colls, dtypes)
+    df_clean = extract(data["results"])
     
-    # Seleccionar solo columnas existentes
-    columnas_seleccionadas = [col for col in rename_colls if col in df.columns]
-    df_clean = df[columnas_seleccionadas]
-    
-    # Renombrar (sin asignar inplace)
-    df_clean = df_clean.rename(columns=rename_colls)
-    
-    # Conversión de las columnas a variables int / float / datetime /category
-    df_clean["Genero"] = df_clean["Genero"].astype("category")
-    df_clean["Nacionalidad"] = df_clean["Nacionalidad"].astype("category")
-    df_clean["Pais"] = df_clean["Pais"].astype("category")
-
-    # Convertir lat/lon a numérico (si existen)  
-    df_clean["latitude"] = pd.to_numeric(df_clean["latitude"], errors="coerce")
-    df_clean["longitude"] = pd.to_numeric(df_clean["longitude"], errors="coerce")
-    
+    df_clean = derive_features(df_clean, data["results"], age_bins, age_labels)
+
+    if compact:
+        df_clean = compact_schema(df_clean)
+    return df_clean
+
+def registration_age(dates, now=None):
+    """
+    Años completos desde la fecha de registro (registered.date, ISO 8601)
+    hasta `now`, vectorizado. Las fechas no válidas quedan como <NA>.
+    """
+    fechas = pd.to_datetime(pd.Series(dates), utc=True, errors="coerce")
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    dias = (now - fechas).dt.days
+    return (dias // 365.2425).astype("Int64")
+
+def derive_features(df_clean, records=None, age_bins=RANGO_BINS, age_labels=RANGO_LABELS):
+    """
+    Columnas derivadas de df_clean en una sola pasada vectorizada:
+
+        RangoEdad   rango de edad (category ordenada) con una tabla entera
+                    precalculada edad -> rango (accumulators.rango_edad)
+        Registered  años desde el registro: registered.age de la API; si no
+                    viene, se calcula desde registered.date de `records`
+        CodigoPais  código ISO3 del país, buscado en la tabla precompilada
+                    de countries.py una vez por categoría de Pais (y de
+                    Nacionalidad si el país no se reconoce), no por fila
+
+    Las etapas posteriores (gráficos, CSV, estadísticas) usan estas columnas
+    en lugar de recalcularlas.
+    """
+    if "Edad" in df_clean.columns:
+        df_clean["RangoEdad"] = rango_edad(df_clean["Edad"], age_bins, age_labels)
+
     # Normalizamos la columna registered.age (años desde registro)
-    df_clean['Registered'] = df['registered.age'] if 'registered.age' in df.columns else pd.Series([random.randint(0,10) for _ in range(len(df_clean))])
-    
+    if "Registered" not in df_clean.columns:
+        fechas = None
+        if records is not None:
+            fechas = compile_extractor({"registered.date": "FechaRegistro"})(records).get("FechaRegistro")
+        if fechas is not None:
+            df_clean["Registered"] = registration_age(fechas).to_numpy()
+        else:
+            # Sin fecha de registro se mantiene el valor aleatorio de siempre
+            df_clean["Registered"] = np.random.default_rng().integers(0, 11, size=len(df_clean))
+
+    if "Pais" in df_clean.columns:
+        codigo = category_codes(df_clean["Pais"])
+        # En randomuser.me el país es el de la nacionalidad (nat, ISO2)
+        if codigo.hasnans and "Nacionalidad" in df_clean.columns:
+            codigo = codigo.astype(object).fillna(category_codes(df_clean["Nacionalidad"]).astype(object))
+        df_clean["CodigoPais"] = codigo.astype("category")
+    return df_clean
+
+# Columnas de texto con pocos valores distintos que se guardan como category
+# en el esquema compacto (los nombres se repiten mucho entre usuarios)
+COMPACT_CATEGORY_COLS = ("Nombre", "Apellido")
+# Columnas enteras que se reducen al menor entero sin signo posible
+COMPACT_UINT_COLS = ("Edad", "Registered")
+# Coordenadas en float32 (unos 7 dígitos significativos, ~1 m de precisión)
+COMPACT_FLOAT_COLS = ("latitude", "longitude")
+
+def _downcast_uint(serie):
+    """
+    Reducir una columna entera a uint8/uint16/... según su máximo. Con valores
+    ausentes se usa el entero nullable equivalente (UInt8, UInt16...).
+    """
+    if not serie.hasnans:
+        return pd.to_numeric(serie, downcast="unsigned")
+    values = serie.dropna()
+    if len(values) == 0 or values.min() < 0 or (values % 1 != 0).any():
+        return serie
+    for dtype in ("UInt8", "UInt16", "UInt32"):
+        if values.max() <= np.iinfo(dtype.lower()).max:
+            return serie.astype(dtype)
+    return serie
+
+def compact_schema(df_clean):
+    """
+    Esquema compacto de df_clean:
+        Edad, Registered   -> menor entero sin signo (uint8)
+        latitude/longitude -> float32
+        Nombre, Apellido   -> category
+        resto de texto     -> string de Arrow (si pyarrow está instalado)
+
+    Con usuarios sintéticos baja de unos 108 a unos 61 bytes por fila (algo
+    menos de la mitad): los enteros pasan de 8 bytes a 1, las coordenadas de
+    8 a 4 y los nombres de ~13 a ~1. El uuid (44 bytes por fila como string
+    de Arrow) se deja igual y es ya la mayor parte de lo que queda. Lo que se
+    guarda en SQLite no cambia. Ver memory_report para medirlo.
+    """
+    df_clean = df_clean.copy()
+    for col in COMPACT_UINT_COLS:
+        if col in df_clean.columns and pd.api.types.is_numeric_dtype(df_clean[col].dtype):
+            df_clean[col] = _downcast_uint(df_clean[col])
+    for col in COMPACT_FLOAT_COLS:
+        if col in df_clean.columns:
+            df_clean[col] = df_clean[col].astype(np.float32)
+    for col in COMPACT_CATEGORY_COLS:
+        if col in df_clean.columns:
+            df_clean[col] = df_clean[col].astype("category")
+
+    # El resto de columnas de texto (e.g., uuid) como strings de Arrow
+    try:
+        import pyarrow  # noqa: F401
+    except ModuleNotFoundError:
+        return df_clean
+    for col in df_clean.columns:
+        dtype = df_clean[col].dtype
+        if dtype == object or (isinstance(dtype, pd.StringDtype) and dtype.storage != "pyarrow"):
+            df_clean[col] = df_clean[col].astype(pd.StringDtype("pyarrow"))
     return df_clean
 
+def memory_report(df_clean):
+    """
+    Memoria ocupada por df_clean (incluidos los strings): total, bytes por
+    fila y bytes por columna.
+    """
+    usage = df_clean.memory_usage(deep=True, index=False)
+    total = int(usage.sum())
+    rows = len(df_clean)
+    return {
+        "rows": rows,
+        "bytes": total,
+        "bytes_per_row": round(total / rows, 2) if rows else None,
+        "columns": {col: int(n) for col, n in usage.items()},
+    }
+
 def load_data():
     
     print(f"CSV Generated:{DB_name}")
     return
 
-def load_sqlite3_db(df, db_name="usuarios.db", table_name="usuarios", data_load_type = "replace"):
+# Esquema de la tabla de usuarios en SQLite (columna -> tipo)
+USUARIOS_SCHEMA = {
+    "uuid": "TEXT",
+    "Genero": "TEXT",
+    "Nombre": "TEXT",
+    "Apellido": "TEXT",
+    "Nacionalidad": "TEXT",
+    "Edad": "INTEGER",
+    "Pais": "TEXT",
+    "latitude": "REAL",
+    "longitude": "REAL",
+    "Registered": "INTEGER",
+    "RangoEdad": "TEXT",
+    "CodigoPais": "TEXT"
+}
+
+# Columnas indexadas, los índices se crean al final de cada carga
+USUARIOS_INDEXES = ("Pais", "Nacionalidad", "Edad")
+
+# PRAGMAs para cargas masivas: WAL permite leer mientras se escribe y
+# synchronous=NORMAL evita un fsync por transacción (seguro con WAL)
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",       # 64 MB de caché de páginas
+    "PRAGMA mmap_size=268435456",     # 256 MB mapeados en memoria
+)
+
+def _sqlite_type(dtype):
+    """
+    Tipo SQLite para una columna de pandas que no está en USUARIOS_SCHEMA.
+    """
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def _widen_float32(values):
+    """
+    Pasar un array float32 a float64 redondeando a los 7 dígitos
+    significativos que guarda float32, para que 12.3456 no se escriba en
+    SQLite como 12.345600128173828.
+    """
+    values = values.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    magnitude[~np.isfinite(magnitude)] = 0
+    scale = 10.0 ** (6 - magnitude)
+    return np.round(values * scale) / scale
+
+def _iter_rows(df, columns, chunk_size):
+    """
+    Recorrer el DataFrame por bloques de chunk_size filas y devolver cada
+    bloque como lista de tuplas con tipos nativos de Python (NaN -> NULL).
+    """
+    for start in range(0, len(df), chunk_size):
+        part = df.iloc[start:start + chunk_size]
+        values = []
+        for col in columns:
+            serie = part[col]
+            if serie.dtype == np.float32:
+                serie = pd.Series(_widen_float32(serie.to_numpy()), index=serie.index)
+            if serie.hasnans or not pd.api.types.is_numeric_dtype(serie.dtype):
+                serie = serie.astype(object).where(serie.notna(), None)
+            values.append(serie.tolist())
+        yield list(zip(*values))
+
+def _table_columns(cursor, table_name):
+    cursor.execute(f'PRAGMA table_info("{table_name}")')
+    return [row[1] for row in cursor.fetchall()]
+
+def _new_users(cursor, table_name, df, bloom):
+    """
+    Filas de df cuyo uuid no está todavía en la tabla. El filtro de Bloom
+    descarta sin consultar la base de datos los uuid que seguro son nuevos;
+    el resto se comprueba en el índice único de uuid.
+    """
+    uuids = df["uuid"]
+    maybe = bloom.contains_many(uuids)
+    if not maybe.any():
+        return df
+    existing = existing_keys(cursor, table_name, uuids[maybe].tolist())
+    if not existing:
+        return df
+    return df[~uuids.isin(existing).to_numpy()]
+
+def load_sqlite3_db(df, db_name="usuarios.db", table_name="usuarios", data_load_type = "replace", chunk_size=50000,
+                    verbose=True):
     """
     Función para cargar los datos de Usuarios formato DataFrame en una base de datos SQLite.
+
+    La carga se hace con executemany por bloques dentro de una única transacción
+    explícita, con WAL y PRAGMAs de carga masiva. Los índices sobre Pais,
+    Nacionalidad y Edad se crean al terminar la carga.
+
+    Los uuid cargados se guardan también en un filtro de Bloom persistente
+    (bloom.py) que se actualiza en la misma transacción. En 'append' se usa
+    para descartar los usuarios que ya existen sin escribirlos: repetir una
+    carga con el mismo seed no añade filas y el coste depende de las filas
+    nuevas, no del tamaño de la tabla.
+
+    En la misma transacción se actualiza la tabla `statistics` (ver
+    stats_table.py) solo con la contribución de las filas cargadas, para
+    leer las estadísticas sin recorrer la tabla de usuarios.
     
     Parámetros:
         df (pandas.DataFrame): DataFrame con las columnas esperadas
         db_name (str): nombre del archivo .db (default 'usuarios.db')
         table_name (str): nombre de la tabla (default 'usuarios')
+        data_load_type (str):
+            'replace' -> borra la tabla y la vuelve a crear con los datos nuevos
+            'append'  -> añade solo los usuarios cuyo uuid no existe todavía (idempotente)
+            'upsert'  -> inserta los nuevos y actualiza los existentes (clave uuid;
+                         ValueError si df no tiene la columna uuid)
+        chunk_size (int): filas por llamada a executemany (default 50000)
+        verbose (bool): mostrar el resumen de la carga (False en cargas por bloques)
+
+    Devuelve el número de filas escritas (en 'append', solo las nuevas).
     """
-    
+    if data_load_type not in ("replace", "append", "upsert"):
+        raise ValueError(f"data_load_type no válido: {data_load_type!r} (replace, append o upsert)")
+    if data_load_type == "upsert" and "uuid" not in df.columns:
+        raise ValueError("La carga 'upsert' necesita la columna uuid (clave de los usuarios)")
+
+    # Columnas a cargar: las del esquema y cualquier columna extra del DataFrame
+    schema = dict(USUARIOS_SCHEMA)
+    for col in df.columns:
+        schema.setdefault(col, _sqlite_type(df[col].dtype))
+    columns = [col for col in schema if col in df.columns]
+
+    # En una misma carga cada usuario aparece una sola vez (las filas sin uuid
+    # no son el mismo usuario y se cargan todas)
+    if "uuid" in df.columns:
+        df = df[~(df["uuid"].duplicated(keep="last") & df["uuid"].notna()).to_numpy()]
+
     # Conectar a la base de datos, si no existe genera una nueva DB con el nombre default db_name="usuarios.db"
-    conn = sqlite3.connect(db_name)
+    # isolation_level=None: las transacciones se abren y cierran explícitamente
+    conn = sqlite3.connect(db_name, isolation_level=None)
     cursor = conn.cursor()
+    for pragma in BULK_PRAGMAS:
+        cursor.execute(pragma)
+
+    column_defs = ",\n        ".join(f'"{col}" {schema[col]}' for col in schema)
+    col_names = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+
+    if data_load_type == "upsert":
+        updates = ", ".join(f'"{col}" = excluded."{col}"' for col in columns if col != "uuid")
+        insert_sql = (f'INSERT INTO "{table_name}" ({col_names}) VALUES ({placeholders}) '
+                      f'ON CONFLICT(uuid) DO UPDATE SET {updates}')
+    elif data_load_type == "append":
+        insert_sql = f'INSERT OR IGNORE INTO "{table_name}" ({col_names}) VALUES ({placeholders})'
+    else:
+        insert_sql = f'INSERT INTO "{table_name}" ({col_names}) VALUES ({placeholders})'
 
-    # Crear la tabla si no existe, nombre default table_name="usuarios"
-    cursor.execute(f"""
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        Genero TEXT,
-        Nombre TEXT,
-        Apellido TEXT,
-        Nacionalidad TEXT,
-        Edad INTEGER,
-        Pais TEXT,
-        latitude REAL,
-        longitude REAL
-        );
-    """
-    )
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
 
-    # Insertar el DataFrame (append = agrega datos sin borrar lo anterior)
-    # if_exists="replace" Overwritte completely
-    # data_load_type = append or replace
-    df.to_sql(table_name, conn, if_exists=data_load_type, index=False)
+        if data_load_type == "replace":
+            # Overwrite completo: al borrar la tabla se borran también sus índices
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            drop_filter(cursor, table_name)
+
+        # Crear la tabla si no existe, nombre default table_name="usuarios"
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{table_name}" (
+        {column_defs}
+        );
+        """
+        )
+
+        # Tablas antiguas (creadas con df.to_sql) pueden no tener todas las columnas
+        existing = set(_table_columns(cursor, table_name))
+        for col in schema:
+            if col not in existing:
+                cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {schema[col]}')
+
+        # append/upsert necesitan el índice único de uuid antes de insertar
+        if data_load_type != "replace":
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{table_name}_uuid" ON "{table_name}" (uuid)')
+
+        # Filtro de Bloom de los uuid ya cargados (se reconstruye si no está al día)
+        bloom = None
+        if "uuid" in df.columns:
+            if data_load_type == "replace":
+                bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(df)))
+            else:
+                bloom = load_filter(cursor, table_name) or rebuild_filter(cursor, table_name, extra=len(df))
+
+        # append: solo se escriben los usuarios nuevos
+        duplicates = 0
+        if bloom is not None and data_load_type == "append":
+            n_before = len(df)
+            df = _new_users(cursor, table_name, df, bloom)
+            duplicates = n_before - len(df)
+
+        # Estadísticas incrementales: sin estadísticas al día se recalculan al final
+        stats_table.ensure_table(cursor)
+        incremental = (all(col in df.columns for col in stats_table.STATS_COLUMNS)
+                       and (data_load_type == "replace" or stats_table.is_current(cursor, table_name)))
+        stats_rows = []
+        if incremental and data_load_type == "upsert":
+            # Los usuarios que se actualizan restan primero sus valores anteriores
+            maybe = df["uuid"][bloom.contains_many(df["uuid"])] if bloom is not None else df["uuid"]
+            old = stats_table.existing_rows(cursor, table_name, maybe.tolist())
+            stats_rows = stats_table.statistics_rows(old, sign=-1)
+
+        rows_loaded = 0
+        for rows in _iter_rows(df, columns, chunk_size):
+            cursor.executemany(insert_sql, rows)
+            rows_loaded += len(rows)
+
+        # Índices creados después de la carga (más rápido que mantenerlos fila a fila)
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{table_name}_uuid" ON "{table_name}" (uuid)')
+        for col in USUARIOS_INDEXES:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_{col}" ON "{table_name}" ("{col}")')
+
+        if data_load_type == "replace":
+            stats_table.clear_statistics(cursor, table_name)
+        if incremental:
+            stats_table.apply_rows(cursor, table_name, stats_rows + stats_table.statistics_rows(df))
+        else:
+            stats_table.rebuild_statistics(cursor, table_name)
+        stats_table.mark_current(cursor, table_name)
+
+        if bloom is not None:
+            bloom.add_many(df["uuid"].dropna())
+            if bloom.full():
+                # Con más uuid que su capacidad el error sube: se redimensiona
+                bloom = rebuild_filter(cursor, table_name)
+            save_filter(cursor, table_name, bloom)
+
+        cursor.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        conn.close()
+        raise
+
+    if not verbose:
+        conn.close()
+        return rows_loaded
 
     # Print Tables available
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     tables = cursor.fetchall()
     print(f"Tables available: {tables}")
     
-    # Guardar y cerrar conexión
-    conn.commit()
+    # Cerrar conexión
     conn.close()
 
-    #print(f"✅ Datos guardados correctamente en la tabla '{table_name}' dentro de '{db_name}'.")
     print("Datos Guardados correctamente! Sqlite3 DB & Table created!")
     print(f"DB name: {db_name}")
     print(f"DB Table name: {table_name}")
-    return
+    print(f"Filas procesadas ({data_load_type}): {rows_loaded}")
+    if duplicates:
+        print(f"Usuarios ya existentes omitidos: {duplicates}")
+    return rows_loaded
 
-def make_plots(df_clean, output_dir):
-    """
-    Función para calcular estadísticas y generar plots en formato png.
+def write_parquet(df_clean, output_dir, partition_cols=("Pais",), compression="zstd",
+                  dataset_name="usuarios_parquet", part=None, verbose=True):
     """
-    # 1. # Creamos un directorio para guardar los resultados si no existe
-    #output_dir = "plots"
-    os.makedirs(output_dir, exist_ok=True)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-
-    # 2b. Calcular Estadísticas
-    print("Calculando estadísticas...")
-
-    # Conteo por género
-    gender_counts = df_clean['Genero'].value_counts()
-
-    # Edad media total
-    average_age = df_clean['Edad'].mean()
-
-    # Edad media por género
-    avg_age_by_gender = df_clean.groupby('Genero')['Edad'].mean()
-
-    print(f"Edad media total: {average_age:.2f}")
-    print(f"Conteo por género:\n{gender_counts}")
-    
-    # 2c. Generar Gráficos
-    print("Generando gráficos...")
-    
-    # Gráfico 1: Distribución de Género (Barra)
-    plt.figure(figsize=(8, 5))
-    gender_counts.plot(kind='bar', color=['pink', 'skyblue'])
-    plt.title('Distribución por Género (500 Usuarios)')
-    plt.xlabel('Género')
-    plt.ylabel('Cantidad')
-    plt.xticks(rotation=0)
-    plot_path_gender = os.path.join(output_dir, 'distribucion_genero.png')
-    plt.savefig(plot_path_gender)
-    plt.close()
-    print(f"Gráfico de género guardado en: {plot_path_gender}")
-
-    # Gráfico 1: Distribución de Edades (Histograma)
-    plt.figure(figsize=(10, 6))
-    df_clean['Edad'].plot(kind='hist', bins=20, edgecolor='black', color='lightgreen')
-    plt.title('Distribución de Edades (500 Usuarios)')
-    plt.xlabel('Edad')
-    plt.ylabel('Frecuencia')
-    # Añadimos una línea vertical para la edad media
-    plt.axvline(average_age, color='red', linestyle='dashed', linewidth=2, label=f'Edad Media: {average_age:.2f}')
-    plt.legend()
-    plot_path_age = os.path.join(output_dir, 'distribucion_edad.png')
-    plt.savefig(plot_path_age)
-    plt.close()
-    print(f"Gráfico de edad guardado en: {plot_path_age}")
-    
-
-    # Gráfico 2: Histograma de Nacionalidad
-    print("Generando histograma de nacionalidades...")
-
-    # Contar usuarios por país
-    country_counts = df_clean['Pais'].value_counts()
-
-    plt.figure(figsize=(12, 6))
-    country_counts.plot(kind='bar', color='lightcoral')
-    plt.title('Distribución de Usuarios por Nacionalidad')
-    plt.xlabel('País')
-    plt.ylabel('Cantidad de Usuarios')
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-
-    plot_path_country = os.path.join(output_dir, 'histograma_nacionalidad.png')
-    plt.savefig(plot_path_country)
-    plt.close()
-    print(f"Histograma de nacionalidad guardado en: {plot_path_country}")
+    Guardar df_clean como dataset Parquet particionado (por defecto por Pais):
+    output_dir/usuarios_parquet/Pais=Spain/part-0-0.parquet, ...
 
-    # Gráfico 3: Gráfico Bivariante: Edad vs Años registrados
-    print("Generando gráfico bivariante: Edad vs Años registrados...")
-
-    # Normalizamos la columna registered.age (años desde registro)
-    #df_clean['Registered'] = df['registered.age'] if 'registered.age' in df.columns else pd.Series([random.randint(0,10) for _ in range(len(df_clean))])
-
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df_clean['Edad'], df_clean['Registered'], alpha=0.6, color='purple', edgecolors='w', s=50)
-    plt.title('Edad del Usuario vs Años Registrado')
-    plt.xlabel('Edad del Usuario')
-    plt.ylabel('Años Registrado')
-    plt.grid(True)
-    plt.tight_layout()
-
-    plot_path_bivar = os.path.join(output_dir, 'bivar_age_registered.png')
-    plt.savefig(plot_path_bivar)
-    plt.close()
-    print(f"Gráfico bivariante guardado en: {plot_path_bivar}")
-
-
-    # --- Crear columna de rango de edades ---
-    print("Generando columna de rango de edades y histograma...")
-
-    bins = [0, 18, 30, 65, 120]  # 120 para cubrir edades máximas posibles
-    labels = ['0-18', '18-30', '30-65', '65+']
-
-    df_clean['RangoEdad'] = pd.cut(df_clean['Edad'], bins=bins, labels=labels, right=False)
-
-    # Conteo de usuarios por rango de edad
-    rango_counts = df_clean['RangoEdad'].value_counts().sort_index()
-
-    # Grafico 4: Histograma de usuarios por rango de edad
-    plt.figure(figsize=(8, 5))
-    rango_counts.plot(kind='bar', color='orange', edgecolor='black')
-    plt.title('Número de Usuarios por Rango de Edad')
-    plt.xlabel('Rango de Edad')
-    plt.ylabel('Número de Usuarios')
-    plt.xticks(rotation=0)
-    plt.tight_layout()
-
-    plot_path_rango = os.path.join(output_dir, 'histograma_rango_edad.png')
-    plt.savefig(plot_path_rango)
-    plt.close()
-    print(f"Histograma de rango de edades guardado en: {plot_path_rango}")
-
-
-    # --- 3. CARGA (Load) ---
-    print("3. Cargando datos y estadísticas en ficheros...")
-    
-    # 3a. Cargar datos crudos de usuarios a CSV
-    raw_data_path = os.path.join(output_dir, 'raw_users.csv')
-    df_clean.to_csv(raw_data_path, index=False, encoding='utf-8')
-    print(f"Datos crudos de usuarios guardados en: {raw_data_path}")
-
-    # 3b. Cargar estadísticas a CSV
-    stats_data = {
-        'Metrica': [
-            'Edad Media Total', 
-            'Edad Media (male)', 
-            'Edad Media (female)', 
-            'Total (male)', 
-            'Total (female)'
-        ],
-        'Valor': [
-            f"{average_age:.2f}",
-            f"{avg_age_by_gender.get('male', 0):.2f}",
-            f"{avg_age_by_gender.get('female', 0):.2f}",
-            gender_counts.get('male', 0),
-            gender_counts.get('female', 0)
-        ]
-    }
-    stats_df = pd.DataFrame(stats_data)
-    stats_path = os.path.join(output_dir, 'statistics.csv')
-    stats_df.to_csv(stats_path, index=False, encoding='utf-8')
-    print(f"Estadísticas guardadas en: {stats_path}")
-    
-    return
+    Las columnas category se guardan con codificación de diccionario y cada
+    fichero va comprimido, así que se puede leer un solo país o unas pocas
+    columnas sin recorrer todos los usuarios:
+        pd.read_parquet(path, columns=["Edad"], filters=[("Pais", "=", "Spain")])
 
+    Parámetros:
+        df_clean (pandas.DataFrame): datos limpios de transform
+        output_dir (str): carpeta de resultados
+        partition_cols (tuple): columnas de partición (default ('Pais',))
+        compression (str): 'zstd', 'snappy', 'gzip'... (default 'zstd')
+        dataset_name (str): nombre de la carpeta del dataset
+        part (int): None reescribe el dataset completo; con un número se añaden
+            ficheros part-<n>-*.parquet a un dataset existente (carga por bloques)
+        verbose (bool): mostrar la ruta del dataset al terminar
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ModuleNotFoundError:
+        print("pyarrow no disponible, no se genera el dataset Parquet (pip install pyarrow).")
+        return None
+
+    dataset_path = os.path.join(output_dir, dataset_name)
+    if part is None and os.path.exists(dataset_path):
+        # Reescritura completa: no dejar particiones de ejecuciones anteriores
+        shutil.rmtree(dataset_path)
+
+    table = pa.Table.from_pandas(df_clean, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        dataset_path,
+        partition_cols=list(partition_cols),
+        compression=compression,
+        use_dictionary=True,
+        basename_template=f"part-{part or 0}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    if verbose:
+        print(f"Dataset Parquet guardado en: {dataset_path}")
+    return dataset_path
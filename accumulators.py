@@ -0,0 +1,480 @@
+"""
+Acumuladores de estadísticas en una sola pasada y combinables (merge).
+
+Cada acumulador se actualiza bloque a bloque (update / update_many) y se
+puede combinar con otro del mismo tipo (merge), así que las estadísticas se
+calculan a la vez que la extracción por streaming o por bloques, o en varios
+procesos en paralelo, sin volver a recorrer los datos.
+
+UserStats agrupa todos los que usan make_plots y marina.py:
+    stats = UserStats()
+    for chunk in chunks:
+        stats.update_df(transform({"results": chunk}))
+    inputs = stats.to_plot_inputs()      # mismo formato que plot_inputs
+"""
+
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Rangos de edad: [0, 18), [18, 30), [30, 65), [65, 120)
+RANGO_BINS = [0, 18, 30, 65, 120]  # 120 para cubrir edades máximas posibles
+RANGO_LABELS = ['0-18', '18-30', '30-65', '65+']
+
+# Número de barras del histograma de edades
+AGE_HIST_BINS = 20
+
+# Tamaño en grados de las celdas del mapa de calor
+GEO_RESOLUTION = 2.0  # ~6 px a zoom 2, menos que el radio del mapa de calor
+
+
+@lru_cache(maxsize=None)
+def rango_lookup(bins):
+    """
+    Tabla precalculada edad entera -> código de rango (-1 fuera de rango)
+    para los límites enteros `bins` (tupla), con rangos [bins[i], bins[i+1]).
+    """
+    lo, hi = bins[0], bins[-1]
+    lookup = np.full(hi - lo, -1, dtype=np.int8)
+    for code, (low, high) in enumerate(zip(bins[:-1], bins[1:])):
+        lookup[low - lo:high - lo] = code
+    lookup.flags.writeable = False
+    return lookup
+
+
+def rango_edad(edades, bins=RANGO_BINS, labels=RANGO_LABELS):
+    """
+    Rango de edad de cada usuario, igual que pd.cut(edades, bins, labels,
+    right=False), con una sola indexación en la tabla de rango_lookup.
+    Los límites tienen que ser enteros.
+    """
+    if any(int(b) != b for b in bins):
+        raise ValueError(f"Los límites de los rangos de edad deben ser enteros: {bins}")
+    bins = tuple(int(b) for b in bins)
+    lookup = rango_lookup(bins)
+    values = pd.to_numeric(pd.Series(edades), errors="coerce").to_numpy(dtype=np.float64)
+    # Con límites enteros, floor(edad) cae en el mismo rango que la edad
+    idx = np.floor(values) - bins[0]
+    valid = (idx >= 0) & (idx < len(lookup))
+    codes = np.full(len(values), -1, dtype=np.int8)
+    codes[valid] = lookup[idx[valid].astype(np.intp)]
+    return pd.Categorical.from_codes(codes, categories=list(labels), ordered=True)
+
+
+def rango_column(df_clean, bins=RANGO_BINS, labels=RANGO_LABELS):
+    """
+    Columna RangoEdad de df_clean si ya la calculó transform con las mismas
+    etiquetas; si no, se calcula a partir de Edad.
+    """
+    if "RangoEdad" in df_clean.columns:
+        rango = df_clean["RangoEdad"]
+        if isinstance(rango.dtype, pd.CategoricalDtype) and list(rango.cat.categories) == list(labels):
+            return rango.array
+    return rango_edad(df_clean["Edad"], bins, labels)
+
+
+class Count:
+    """
+    Contador de elementos.
+    """
+
+    def __init__(self):
+        self.n = 0
+
+    def update(self, k=1):
+        self.n += k
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        return self
+
+
+class MeanVar:
+    """
+    Media y varianza en una pasada (Welford) combinables entre bloques
+    con la fórmula de Chan et al.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0   # Suma de cuadrados de las desviaciones a la media
+
+    def _merge_stats(self, n, mean, m2):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        return self
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        return self
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        mean = float(values.mean())
+        return self._merge_stats(values.size, mean, float(((values - mean) ** 2).sum()))
+
+    def merge(self, other):
+        return self._merge_stats(other.n, other.mean, other.m2)
+
+    @property
+    def variance(self):
+        """
+        Varianza muestral (ddof=1), igual que pandas.
+        """
+        return self.m2 / (self.n - 1) if self.n > 1 else float("nan")
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def value(self):
+        return self.mean if self.n else float("nan")
+
+
+class IntHistogram:
+    """
+    Histograma de valores enteros con un bin por valor en [lo, hi). Los
+    valores fuera de rango se guardan aparte para no perder ninguno.
+    """
+
+    def __init__(self, lo=0, hi=RANGO_BINS[-1]):
+        self.lo = lo
+        self.hi = hi
+        self.counts = np.zeros(hi - lo, dtype=np.int64)
+        self.outside = Counter()
+
+    def update_many(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        values = values.astype(np.int64)
+        inside = (values >= self.lo) & (values < self.hi)
+        self.counts += np.bincount(values[inside] - self.lo, minlength=self.hi - self.lo)
+        if not inside.all():
+            self.outside.update(values[~inside].tolist())
+        return self
+
+    def merge(self, other):
+        if (other.lo, other.hi) != (self.lo, self.hi):
+            raise ValueError("Solo se pueden combinar histogramas con el mismo rango")
+        self.counts += other.counts
+        self.outside.update(other.outside)
+        return self
+
+    def values_and_counts(self):
+        """
+        Valores observados y su frecuencia, ordenados.
+        """
+        present = np.nonzero(self.counts)[0]
+        values = (present + self.lo).tolist() + list(self.outside)
+        counts = self.counts[present].tolist() + list(self.outside.values())
+        order = np.argsort(values, kind="stable")
+        return np.asarray(values, dtype=np.int64)[order], np.asarray(counts, dtype=np.int64)[order]
+
+    def histogram(self, bins=AGE_HIST_BINS):
+        """
+        Igual que np.histogram(valores, bins): con datos enteros basta con
+        ponderar cada valor distinto por su frecuencia.
+        """
+        values, counts = self.values_and_counts()
+        counts_hist, edges = np.histogram(values.astype(np.float64), bins=bins, weights=counts)
+        return counts_hist.astype(np.int64), edges
+
+
+class CategoryCounter:
+    """
+    Conteo por categoría (género, país, par edad/registro...).
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def update(self, key, k=1):
+        self.counts[key] += k
+        return self
+
+    def update_many(self, keys):
+        if isinstance(keys, pd.Series):
+            # value_counts es vectorizado; las categorías sin usuarios se omiten
+            counts = keys.value_counts(sort=False)
+            self.counts.update({key: int(n) for key, n in counts.items() if n})
+        else:
+            self.counts.update(keys)
+        return self
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def most_common(self, n=None):
+        return self.counts.most_common(n)
+
+    def to_series(self, name="count", index_name=None):
+        """
+        Series de conteos ordenada de mayor a menor (empates por clave).
+        """
+        items = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        serie = pd.Series([n for _, n in items], index=[key for key, _ in items], dtype="int64", name=name)
+        serie.index.name = index_name
+        return serie
+
+
+class GroupMeanVar:
+    """
+    Media y varianza por grupo (e.g., edad media por género).
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = MeanVar()
+        return self.groups[key]
+
+    def update(self, key, x):
+        self._group(key).update(x)
+        return self
+
+    def update_df(self, df, key_col, value_col):
+        agg = df.groupby(key_col, observed=True)[value_col].agg(["count", "mean", "var"])
+        for key, row in agg.iterrows():
+            n = int(row["count"])
+            if n:
+                m2 = float(row["var"]) * (n - 1) if n > 1 else 0.0
+                self._group(key)._merge_stats(n, float(row["mean"]), m2)
+        return self
+
+    def merge(self, other):
+        for key, acc in other.groups.items():
+            self._group(key).merge(acc)
+        return self
+
+    def to_series(self, name=None, index_name=None):
+        keys = sorted(self.groups)
+        serie = pd.Series([self.groups[key].value() for key in keys], index=keys, name=name, dtype="float64")
+        serie.index.name = index_name
+        return serie
+
+
+class RangeBuckets:
+    """
+    Conteo por rangos [bins[i], bins[i+1]) con etiquetas, como pd.cut(right=False).
+    """
+
+    def __init__(self, bins=RANGO_BINS, labels=RANGO_LABELS):
+        self.bins = np.asarray(bins)
+        self.labels = list(labels)
+        self.counts = np.zeros(len(self.labels), dtype=np.int64)
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        idx = np.searchsorted(self.bins, values, side="right") - 1
+        valid = (idx >= 0) & (idx < len(self.labels)) & ~np.isnan(values)
+        self.counts += np.bincount(idx[valid], minlength=len(self.labels))
+        return self
+
+    def update_codes(self, codes):
+        """
+        Actualizar con códigos de rango ya calculados (-1 = sin rango).
+        """
+        codes = np.asarray(codes)
+        self.counts += np.bincount(codes[codes >= 0], minlength=len(self.labels))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def to_series(self, name="count", index_name="Edad"):
+        index = pd.CategoricalIndex(self.labels, categories=self.labels, ordered=True, name=index_name)
+        return pd.Series(self.counts.copy(), index=index, name=name)
+
+
+class GeoGrid:
+    """
+    Usuarios por celda de una rejilla lat/lon de `resolution` grados. Las
+    coordenadas no numéricas o fuera de rango se descartan.
+    """
+
+    def __init__(self, resolution=GEO_RESOLUTION):
+        self.resolution = resolution
+        self.n_rows = int(np.ceil(180 / resolution))
+        self.n_cols = int(np.ceil(360 / resolution))
+        self.counts = Counter()     # id de celda -> usuarios
+        self.n = 0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+
+    def update_many(self, latitudes, longitudes):
+        lat = pd.to_numeric(pd.Series(latitudes), errors="coerce").to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(pd.Series(longitudes), errors="coerce").to_numpy(dtype=np.float64)
+        valid = (np.isfinite(lat) & np.isfinite(lon)
+                 & (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180))
+        lat, lon = lat[valid], lon[valid]
+        if lat.size == 0:
+            return self
+        rows = np.minimum(((lat + 90) / self.resolution).astype(np.int64), self.n_rows - 1)
+        cols = np.minimum(((lon + 180) / self.resolution).astype(np.int64), self.n_cols - 1)
+        cells, counts = np.unique(rows * self.n_cols + cols, return_counts=True)
+        self.counts.update(dict(zip(cells.tolist(), counts.tolist())))
+        self.n += lat.size
+        self.sum_lat += float(lat.sum())
+        self.sum_lon += float(lon.sum())
+        return self
+
+    def merge(self, other):
+        if other.resolution != self.resolution:
+            raise ValueError("Solo se pueden combinar rejillas con la misma resolución")
+        self.counts.update(other.counts)
+        self.n += other.n
+        self.sum_lat += other.sum_lat
+        self.sum_lon += other.sum_lon
+        return self
+
+    def center(self, default=(20, 0)):
+        """
+        Posición media de los usuarios (centro del mapa).
+        """
+        return (self.sum_lat / self.n, self.sum_lon / self.n) if self.n else default
+
+    def to_frame(self):
+        """
+        DataFrame con el centro de cada celda (latitude, longitude) y su número de usuarios (weight).
+        """
+        cells = np.fromiter(self.counts.keys(), dtype=np.int64, count=len(self.counts))
+        weights = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        order = np.argsort(cells)
+        cells, weights = cells[order], weights[order]
+        rows, cols = np.divmod(cells, self.n_cols)
+        return pd.DataFrame({
+            "latitude": -90 + (rows + 0.5) * self.resolution,
+            "longitude": -180 + (cols + 0.5) * self.resolution,
+            "weight": weights,
+        })
+
+
+class UserStats:
+    """
+    Todas las estadísticas de usuarios de make_plots y marina.py en un
+    único objeto actualizable por bloques y combinable con merge().
+    """
+
+    def __init__(self, geo_resolution=GEO_RESOLUTION):
+        self.total = Count()
+        self.edad = MeanVar()
+        self.edad_hist = IntHistogram()
+        self.genero = CategoryCounter()
+        self.pais = CategoryCounter()
+        self.edad_por_genero = GroupMeanVar()
+        self.rangos = RangeBuckets()
+        self.edad_registro = CategoryCounter()   # pares (Edad, Registered)
+        self.geo = GeoGrid(geo_resolution)        # mapa de calor
+
+    def update_df(self, df_clean):
+        """
+        Actualizar con un bloque ya transformado (columnas de transform).
+        """
+        self.total.update(len(df_clean))
+        edades = pd.to_numeric(df_clean["Edad"], errors="coerce").to_numpy(dtype=np.float64)
+        edades = edades[~np.isnan(edades)]
+        self.edad.update_many(edades)
+        self.edad_hist.update_many(edades)
+        self.rangos.update_codes(rango_column(df_clean, self.rangos.bins, self.rangos.labels).codes)
+        self.genero.update_many(df_clean["Genero"].dropna())
+        self.pais.update_many(df_clean["Pais"].dropna())
+        self.edad_por_genero.update_df(df_clean, "Genero", "Edad")
+        if "Registered" in df_clean.columns:
+            pares = df_clean[["Edad", "Registered"]].dropna().value_counts(sort=False)
+            self.edad_registro.counts.update({(int(e), int(r)): int(n) for (e, r), n in pares.items()})
+        if "latitude" in df_clean.columns and "longitude" in df_clean.columns:
+            self.geo.update_many(df_clean["latitude"], df_clean["longitude"])
+        return self
+
+    def update_records(self, usuarios):
+        """
+        Actualizar con usuarios sin transformar (data["results"]) en una sola pasada.
+        """
+        edades, latitudes, longitudes = [], [], []
+        for u in usuarios:
+            edad = u["dob"]["age"]
+            genero = u["gender"]
+            edades.append(edad)
+            self.genero.counts[genero] += 1
+            self.pais.counts[u["location"]["country"]] += 1
+            self.edad_por_genero.update(genero, edad)
+            registered = u.get("registered", {}).get("age")
+            if registered is not None:
+                self.edad_registro.counts[(edad, registered)] += 1
+            coordinates = u["location"].get("coordinates", {})
+            latitudes.append(coordinates.get("latitude"))
+            longitudes.append(coordinates.get("longitude"))
+        self.total.update(len(edades))
+        self.edad.update_many(edades)
+        self.edad_hist.update_many(edades)
+        self.rangos.update_many(edades)
+        self.geo.update_many(latitudes, longitudes)
+        return self
+
+    def merge(self, other):
+        self.total.merge(other.total)
+        self.edad.merge(other.edad)
+        self.edad_hist.merge(other.edad_hist)
+        self.genero.merge(other.genero)
+        self.pais.merge(other.pais)
+        self.edad_por_genero.merge(other.edad_por_genero)
+        self.rangos.merge(other.rangos)
+        self.edad_registro.merge(other.edad_registro)
+        self.geo.merge(other.geo)
+        return self
+
+    def to_plot_inputs(self, hist_bins=AGE_HIST_BINS):
+        """
+        Series de entrada de los gráficos, mismo formato que Functions_v1.plot_inputs.
+        """
+        pares = sorted(self.edad_registro.counts.items())
+        bivar = pd.DataFrame(
+            [(edad, registered, n) for (edad, registered), n in pares],
+            columns=["Edad", "Registered", "n"],
+        ).astype("int64")
+        return {
+            'n_users': self.total.n,
+            'gender_counts': self.genero.to_series(index_name="Genero"),
+            'average_age': self.edad.value(),
+            'avg_age_by_gender': self.edad_por_genero.to_series(name="Edad", index_name="Genero"),
+            'age_hist': self.edad_hist.histogram(hist_bins),
+            'country_counts': self.pais.to_series(index_name="Pais"),
+            'bivar': bivar,
+            'rango_counts': self.rangos.to_series(),
+        }
+
+    def marina_estadisticas(self):
+        """
+        Diccionario de estadísticas con el formato de marina.py.
+        """
+        total = self.total.n
+        num_hombres = self.genero.counts.get("male", 0)
+        num_mujeres = self.genero.counts.get("female", 0)
+        pais_mas_frecuente = self.pais.most_common(1)[0][0] if self.pais.counts else None
+        return {
+            "total_usuarios": total,
+            "media_edad": round(self.edad.value(), 2),
+            "porcentaje_hombres": round((num_hombres / total) * 100, 2),
+            "porcentaje_mujeres": round((num_mujeres / total) * 100, 2),
+            "pais_mas_frecuente": pais_mas_frecuente
+        }
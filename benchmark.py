@@ -0,0 +1,234 @@
+"""
+Benchmarks offline de la ETL con usuarios sintéticos (synthetic_users.py).
+
+Mide transform (con el esquema por defecto, el compacto y en paralelo con
+todos los núcleos), transform_parallel con workers=1 frente a workers=N
+(el pool se fuerza aunque haya pocos usuarios), load_sqlite3_db,
+make_plots y las estadísticas de marina.py, y los bytes por fila de
+df_clean, para 1k, 10k, 100k y 1M usuarios, sin llamar a la API. Los
+resultados se pueden guardar como baseline y comparar en ejecuciones posteriores: si el
+throughput (filas/s) de algún benchmark cae más que el umbral, el script
+termina con código 1.
+
+También mide el arranque en frío de una ejecución que solo extrae y carga
+(import de ETL_main_v1 en un intérprete nuevo): con --check falla si supera
+--cold-start-budget o si carga matplotlib, folium o selenium.
+
+Uso:
+    python benchmark.py                                   # todos los tamaños
+    python benchmark.py --sizes 1000 10000 --save-baseline
+    python benchmark.py --sizes 1000 10000 --check --threshold 0.2
+    python benchmark.py --sizes 100000 --workers 8      # workers=1 frente a workers=8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+
+from Functions_v1 import transform, load_sqlite3_db, memory_report
+from parallel_transform import transform_parallel
+from plots import make_plots
+from marina import calcular_estadisticas
+from synthetic_users import generate_payload
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Tiempo máximo de import para extraer y cargar (sin la etapa de gráficos)
+COLD_START_BUDGET_SECONDS = 1.0
+# Módulos que solo deben cargarse en la etapa de gráficos y mapas
+HEAVY_MODULES = ("matplotlib", "folium", "selenium")
+
+
+def _best_time(fn, repeat):
+    """
+    Mejor tiempo de `repeat` ejecuciones (menos sensible al ruido que la media).
+    La salida por pantalla de las funciones de la ETL se descarta.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(sizes=SIZES, repeat=5, workers=None):
+    """
+    Ejecutar todos los benchmarks y devolver {nombre: resultado}, donde el
+    nombre es "etapa@usuarios" (e.g., "transform@10000"). `workers` son los
+    procesos de transform_workers_n (por defecto os.cpu_count()).
+    """
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="etl_bench_") as workdir:
+        for n in sizes:
+            print(f"Generando {n} usuarios sintéticos...")
+            data = generate_payload(n)
+            df_clean = transform(data)
+
+            # Con tamaños grandes basta una repetición
+            reps = repeat if n < 100_000 else 1
+            db_name = os.path.join(workdir, f"usuarios_{n}.db")
+            output_dir = os.path.join(workdir, f"Resultados_{n}")
+
+            benchmarks = {
+                "transform": lambda: transform(data),
+                "transform_compact": lambda: transform(data, compact=True),
+                # Todos los núcleos (con menos de 2 * MIN_SHARD usuarios es el transform normal)
+                "transform_parallel": lambda: transform(data, workers=None),
+                # Mismo código con 1 y con N procesos, sin el umbral de MIN_SHARD
+                "transform_workers_1": lambda: transform_parallel(data, workers=1, min_shard=1),
+                "transform_workers_n": lambda: transform_parallel(data, workers=workers, min_shard=1),
+                "load_sqlite3_db": lambda: load_sqlite3_db(df_clean, db_name, "usuarios", "replace"),
+                "make_plots": lambda: make_plots(df_clean.copy(), output_dir),
+                "marina_stats": lambda: calcular_estadisticas(data["results"]),
+            }
+            for stage, fn in benchmarks.items():
+                seconds = _best_time(fn, reps)
+                name = f"{stage}@{n}"
+                results[name] = {
+                    "stage": stage,
+                    "rows": n,
+                    "seconds": round(seconds, 6),
+                    "rows_per_second": round(n / seconds, 2),
+                }
+                print(f"  {name:<28} {seconds:>10.4f} s  {n / seconds:>14,.0f} filas/s")
+
+            # Aceleración de workers=N frente a workers=1
+            serial = results[f"transform_workers_1@{n}"]["seconds"]
+            parallel = results[f"transform_workers_n@{n}"]
+            parallel["workers"] = workers
+            parallel["speedup"] = round(serial / parallel["seconds"], 3)
+            print(f"  {'workers ' + str(workers) + ' / 1':<28} {parallel['speedup']:>10.2f}x")
+
+            # Memoria de df_clean con el esquema por defecto y el compacto
+            default = memory_report(df_clean)["bytes_per_row"]
+            compact = memory_report(transform(data, compact=True))["bytes_per_row"]
+            results[f"memory@{n}"] = {"stage": "memory", "rows": n,
+                                      "bytes_per_row": default, "compact_bytes_per_row": compact}
+            print(f"  {'memory@' + str(n):<28} {default:>10.2f} B/fila  compacto {compact:.2f} B/fila")
+            del data, df_clean
+    return results
+
+
+def measure_cold_start(module="ETL_main_v1", repeat=5):
+    """
+    Mejor tiempo de `import module` en un intérprete nuevo (sin cachés de
+    import en memoria) y módulos pesados que quedan cargados.
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': seconds, 'heavy_modules': heavy}))\n"
+    )
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True,
+                                capture_output=True, text=True).stdout
+        process_seconds = time.perf_counter() - start
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = {"stage": "cold_start", "module": module,
+                    "seconds": round(result["seconds"], 6),
+                    "process_seconds": round(process_seconds, 6),
+                    "heavy_modules": result["heavy_modules"]}
+    print(f"  cold_start ({module:<14}) {best['seconds']:>10.4f} s  "
+          f"(proceso {best['process_seconds']:.4f} s, módulos pesados: {best['heavy_modules'] or 'ninguno'})")
+    return best
+
+def save_baseline(results, path=BASELINE_PATH):
+    """
+    Guardar los resultados como baseline junto con datos de la máquina.
+    """
+    baseline = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=4)
+    print(f"Baseline guardado en: {path}")
+
+
+def check_regressions(results, path=BASELINE_PATH, threshold=0.2):
+    """
+    Comparar con el baseline y devolver la lista de benchmarks cuyo
+    throughput ha caído más que `threshold` (0.2 = 20%).
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or "rows_per_second" not in result:
+            continue
+        before = baseline[name]["rows_per_second"]
+        after = result["rows_per_second"]
+        change = (after - before) / before
+        print(f"  {name:<28} {before:>14,.0f} -> {after:>14,.0f} filas/s ({change:+.1%})")
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline de la ETL")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Números de usuarios a medir")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por benchmark (tamaños < 100k)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Archivo JSON del baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como baseline")
+    parser.add_argument("--check", action="store_true", help="Comparar con el baseline y fallar si hay regresión")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Caída máxima de throughput permitida (0.2 = 20%%)")
+    parser.add_argument("--workers", type=int, help="Procesos de transform_workers_n (por defecto todos los núcleos)")
+    parser.add_argument("--output", help="Guardar también los resultados de esta ejecución en JSON")
+    parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET_SECONDS,
+                        help="Segundos máximos de import para extraer y cargar")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.workers)
+    cold_start = measure_cold_start(repeat=args.repeat)
+    results["cold_start@extract_load"] = cold_start
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+
+    if args.check:
+        print(f"Comparando con {args.baseline} (umbral {args.threshold:.0%})...")
+        regressions = check_regressions(results, args.baseline, args.threshold)
+        if cold_start["seconds"] > args.cold_start_budget or cold_start["heavy_modules"]:
+            print(f"Arranque en frío fuera de presupuesto ({args.cold_start_budget:.2f} s, sin "
+                  f"{', '.join(HEAVY_MODULES)})")
+            regressions.append("cold_start@extract_load")
+        if regressions:
+            print(f"Regresión de rendimiento en: {', '.join(regressions)}")
+            return 1
+        print("Sin regresiones de rendimiento.")
+    return 0
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    sys.exit(main())
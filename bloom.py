@@ -0,0 +1,183 @@
+"""
+Filtro de Bloom persistente para deduplicar usuarios por login.uuid.
+
+En una carga 'append' casi todos los usuarios de una ejecución repetida (mismo
+seed) ya están en la tabla. El filtro responde "seguro que no existe" para
+los uuid nuevos sin consultar la base de datos; solo los que "pueden existir"
+se comprueban contra el índice único de uuid. Así el coste de la carga
+depende de las filas nuevas y no del tamaño de la tabla.
+
+El filtro se guarda en la propia base de datos (tabla _uuid_bloom), dentro de
+la misma transacción que la carga, junto con el último rowid de la tabla: si
+la tabla se modifica por otro camino el filtro se reconstruye desde el índice.
+
+Uso:
+    bloom = BloomFilter(capacity=1_000_000, error_rate=0.001)
+    bloom.add_many(df["uuid"])
+    nuevos = ~bloom.contains_many(df["uuid"])
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Tabla con un filtro por tabla de usuarios
+BLOOM_TABLE = "_uuid_bloom"
+# Capacidad mínima de un filtro nuevo (unos 180 KB con error_rate=0.001)
+MIN_CAPACITY = 100_000
+# Identifica la función hash: si cambia, los filtros guardados no sirven
+HASH_SCHEME = "pandas-hash_array-v1"
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def _hash(keys):
+    """
+    Hash de 64 bits de cada clave (vectorizado, sin bucle de Python).
+    """
+    keys = np.asarray(pd.Series(keys, dtype=object).to_numpy(), dtype=object)
+    return pd.util.hash_array(keys, categorize=False)
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom con los bits empaquetados en un array de numpy.
+
+    Las k posiciones de cada clave salen de un único hash de 64 bits con
+    doble hashing (h1 + i * h2), así que añadir o consultar un millón de
+    claves son unas pocas operaciones vectorizadas.
+
+    Parameters
+    ----------
+    capacity : int
+        Número de claves para el que se dimensiona el filtro.
+    error_rate : float
+        Probabilidad de falso positivo con `capacity` claves.
+    """
+
+    def __init__(self, capacity=MIN_CAPACITY, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.n_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys):
+        h = _hash(keys)
+        h1 = h & _MASK32
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.n_bits)
+
+    def add_many(self, keys):
+        positions = self._positions(keys).ravel()
+        if len(positions) == 0:
+            return self
+        masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), masks)
+        self.count += len(positions) // self.n_hashes
+        return self
+
+    def contains_many(self, keys):
+        """
+        Array de bool: False = la clave seguro que no se ha añadido,
+        True = puede que sí (con probabilidad error_rate de falso positivo).
+        """
+        positions = self._positions(keys)
+        if positions.size == 0:
+            return np.zeros(len(positions), dtype=bool)
+        bits = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+        return (bits & 1).all(axis=1)
+
+    def full(self):
+        """
+        True si ya tiene más claves que su capacidad (el error real sube).
+        """
+        return self.count > self.capacity
+
+
+def _ensure_table(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{BLOOM_TABLE}" (
+        table_name TEXT PRIMARY KEY,
+        scheme TEXT,
+        capacity INTEGER,
+        error_rate REAL,
+        count INTEGER,
+        max_rowid INTEGER,
+        bits BLOB
+    );
+    """)
+
+
+def _max_rowid(cursor, table_name):
+    # MAX(rowid) es una búsqueda en el B-tree, no recorre la tabla
+    cursor.execute(f'SELECT MAX(rowid) FROM "{table_name}"')
+    return cursor.fetchone()[0] or 0
+
+
+def load_filter(cursor, table_name):
+    """
+    Filtro guardado de la tabla, o None si no existe o ya no corresponde a
+    la tabla (otro esquema de hash o filas escritas sin actualizarlo).
+    """
+    _ensure_table(cursor)
+    cursor.execute(f'SELECT scheme, capacity, error_rate, count, max_rowid, bits FROM "{BLOOM_TABLE}" '
+                   f'WHERE table_name = ?', (table_name,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    scheme, capacity, error_rate, count, max_rowid, bits = row
+    if scheme != HASH_SCHEME or max_rowid != _max_rowid(cursor, table_name):
+        return None
+    bloom = BloomFilter(capacity, error_rate)
+    bloom.bits = np.frombuffer(bits, dtype=np.uint8).copy()
+    bloom.count = count
+    return bloom
+
+
+def rebuild_filter(cursor, table_name, extra=0, error_rate=0.001):
+    """
+    Crear el filtro con todos los uuid de la tabla (lectura del índice de
+    uuid), con capacidad para el doble de filas más `extra` nuevas.
+    """
+    cursor.execute(f'SELECT uuid FROM "{table_name}" WHERE uuid IS NOT NULL')
+    uuids = [row[0] for row in cursor.fetchall()]
+    bloom = BloomFilter(max(MIN_CAPACITY, 2 * (len(uuids) + extra)), error_rate)
+    bloom.add_many(uuids)
+    return bloom
+
+
+def save_filter(cursor, table_name, bloom):
+    """
+    Guardar el filtro (dentro de la transacción de la carga).
+    """
+    _ensure_table(cursor)
+    cursor.execute(
+        f'INSERT OR REPLACE INTO "{BLOOM_TABLE}" '
+        f'(table_name, scheme, capacity, error_rate, count, max_rowid, bits) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (table_name, HASH_SCHEME, bloom.capacity, bloom.error_rate, bloom.count,
+         _max_rowid(cursor, table_name), bloom.bits.tobytes()),
+    )
+
+
+def drop_filter(cursor, table_name):
+    _ensure_table(cursor)
+    cursor.execute(f'DELETE FROM "{BLOOM_TABLE}" WHERE table_name = ?', (table_name,))
+
+
+def existing_keys(cursor, table_name, keys, batch_size=900):
+    """
+    Subconjunto de `keys` que ya está en la tabla (búsquedas en el índice
+    único de uuid por lotes de batch_size parámetros).
+    """
+    found = set()
+    keys = list(keys)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f'SELECT uuid FROM "{table_name}" WHERE uuid IN ({placeholders})', batch)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
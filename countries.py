@@ -0,0 +1,193 @@
+"""
+Tabla precompilada de países: nombres, alias, ISO2, ISO3 y los códigos de
+nacionalidad (nat) de randomuser.me.
+
+La tabla se genera una sola vez (python countries.py build, con pycountry
+instalado) y se guarda en geodata/countries.json, que va en el repositorio:
+en cada ejecución solo se lee ese fichero, sin pycountry ni red. Los
+códigos se resuelven una vez por categoría distinta de Pais o
+Nacionalidad (unas pocas decenas), no por usuario, y el resultado se
+memoriza para los siguientes bloques.
+
+Uso:
+    python countries.py build          # regenerar geodata/countries.json
+
+    iso3("United Kingdom")             # 'GBR'
+    category_codes(df["Pais"])         # Categorical de códigos ISO3
+"""
+
+import json
+import os
+import sys
+import unicodedata
+from functools import lru_cache
+
+COUNTRY_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geodata", "countries.json")
+TABLE_VERSION = 1
+
+# Nombres que usa randomuser.me (u otros habituales) que no coinciden con el
+# nombre oficial -> código ISO3. Tienen prioridad sobre los de pycountry.
+COUNTRY_ALIASES = {
+    "United States": "USA",
+    "United Kingdom": "GBR",
+    "Russia": "RUS",
+    "Iran": "IRN",
+    "Syria": "SYR",
+    "Moldova": "MDA",
+    "Tanzania": "TZA",
+    "Vietnam": "VNM",
+    "Laos": "LAO",
+    "South Korea": "KOR",
+    "North Korea": "PRK",
+    "Cape Verde": "CPV",
+    "Ivory Coast": "CIV",
+    "Czechia": "CZE",
+    "Swaziland": "SWZ",
+    "The Bahamas": "BHS",
+    "The Gambia": "GMB",
+    "Burma": "MMR",
+    "North Macedonia": "MKD",
+    "Venezuela": "VEN",
+    "Bolivia": "BOL",
+    "Micronesia": "FSM",
+    "Brunei": "BRN",
+    "Serbia": "SRB",
+    "Turkey": "TUR",
+    "Türkiye": "TUR",
+    "Netherlands": "NLD",
+    "Switzerland": "CHE",
+}
+
+# Nacionalidades de randomuser.me (parámetro nat) -> ISO3. Son códigos ISO2
+RANDOMUSER_NATS = {
+    "AU": "AUS", "BR": "BRA", "CA": "CAN", "CH": "CHE", "DE": "DEU", "DK": "DNK", "ES": "ESP",
+    "FI": "FIN", "FR": "FRA", "GB": "GBR", "IE": "IRL", "IN": "IND", "IR": "IRN", "MX": "MEX",
+    "NL": "NLD", "NO": "NOR", "NZ": "NZL", "RS": "SRB", "TR": "TUR", "UA": "UKR", "US": "USA",
+}
+
+
+def normalize_name(name):
+    """
+    Clave de búsqueda de un nombre de país: sin acentos, mayúsculas ni espacios extra.
+    """
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())
+
+
+def build_country_table(path=COUNTRY_TABLE_PATH):
+    """
+    Generar la tabla de países desde pycountry y COUNTRY_ALIASES y
+    guardarla en `path`. Devuelve la tabla.
+
+    'countries': ISO3 -> {'iso2', 'name'}
+    'names':     nombre, nombre oficial, nombre común, ISO2 o ISO3
+                 normalizados -> ISO3
+    """
+    try:
+        import pycountry
+    except ModuleNotFoundError:
+        raise SystemExit("Para generar la tabla hace falta pycountry (pip install pycountry).")
+
+    countries, names = {}, {}
+    short_names = {}
+    for country in pycountry.countries:
+        code = country.alpha_3
+        name = getattr(country, "common_name", None) or country.name
+        countries[code] = {"iso2": country.alpha_2, "name": name}
+        for attr in ("name", "official_name", "common_name", "alpha_2", "alpha_3"):
+            value = getattr(country, attr, None)
+            if value:
+                names[normalize_name(value)] = code
+        # "Iran, Islamic Republic of" -> "Iran" (solo si no es ambiguo)
+        if "," in country.name:
+            short = normalize_name(country.name.split(",")[0])
+            short_names.setdefault(short, set()).add(code)
+
+    for short, codes in short_names.items():
+        if len(codes) == 1 and short not in names:
+            names[short] = codes.pop()
+    for nat, code in RANDOMUSER_NATS.items():
+        names[normalize_name(nat)] = code
+    for name, code in COUNTRY_ALIASES.items():
+        names[normalize_name(name)] = code
+
+    table = {"version": TABLE_VERSION, "countries": countries, "names": names}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    print(f"Tabla de países: {len(countries)} países, {len(names)} nombres -> {path}")
+    load_country_table.cache_clear()
+    return table
+
+
+def _fallback_table():
+    # Sin geodata/countries.json: solo los alias y las nacionalidades conocidas
+    names = {normalize_name(nat): code for nat, code in RANDOMUSER_NATS.items()}
+    names.update({normalize_name(name): code for name, code in COUNTRY_ALIASES.items()})
+    return {"version": TABLE_VERSION, "countries": {}, "names": names}
+
+
+@lru_cache(maxsize=None)
+def load_country_table(path=COUNTRY_TABLE_PATH):
+    """
+    Tabla de países precompilada (se lee una vez por proceso). Si no existe
+    se usa una tabla mínima con COUNTRY_ALIASES y RANDOMUSER_NATS y se avisa.
+    """
+    if not os.path.exists(path):
+        print(f"No existe {path}: se usa la tabla mínima de países (python countries.py build).")
+        return _fallback_table()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iso3(name, path=COUNTRY_TABLE_PATH):
+    """
+    Código ISO3 de un nombre de país, ISO2 o ISO3 (None si no se conoce).
+    """
+    if name is None or (isinstance(name, float) and name != name):
+        return None
+    return load_country_table(path)["names"].get(normalize_name(name))
+
+
+def iso2(name, path=COUNTRY_TABLE_PATH):
+    """
+    Código ISO2 de un nombre de país, ISO2 o ISO3 (None si no se conoce).
+    """
+    code = iso3(name, path)
+    country = load_country_table(path)["countries"].get(code) if code else None
+    return country["iso2"] if country else None
+
+
+@lru_cache(maxsize=256)
+def _codes_for(categories, kind, path):
+    lookup = iso3 if kind == "iso3" else iso2
+    return {category: lookup(category, path) for category in categories}
+
+
+def country_codes(names, kind="iso3", path=COUNTRY_TABLE_PATH):
+    """
+    {nombre: código o None} para cada nombre distinto de `names`. El
+    resultado se memoriza por conjunto de nombres, así que los bloques con
+    las mismas categorías no vuelven a buscar nada.
+    """
+    return dict(_codes_for(tuple(sorted(set(names), key=str)), kind, path))
+
+
+def category_codes(serie, kind="iso3", path=COUNTRY_TABLE_PATH):
+    """
+    Códigos de país de una columna (Pais o Nacionalidad) como category: la
+    búsqueda se hace una vez por categoría y se aplica a las filas con sus
+    códigos enteros.
+    """
+    serie = serie.astype("category")
+    codes = country_codes(serie.cat.categories, kind, path)
+    return serie.map(codes).astype("category")
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_country_table(sys.argv[2] if len(sys.argv) > 2 else COUNTRY_TABLE_PATH)
+    else:
+        print(__doc__)
@@ -0,0 +1,121 @@
+"""
+Extractor columnar para los usuarios de randomuser.me.
+
+pd.json_normalize aplana todos los campos anidados de cada usuario (login,
+picture, id, street, timezone...) aunque luego solo usemos unos pocos.
+compile_extractor genera una función que lee únicamente las rutas
+configuradas (e.g., "dob.age", "location.country") y las escribe directamente
+en columnas tipadas, produciendo el mismo DataFrame que json_normalize + rename.
+
+Uso:
+    extract = compile_extractor({"dob.age": "Edad", "location.country": "Pais"},
+                                dtypes={"Edad": "int", "Pais": "category"})
+    df = extract(data["results"])
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Marca para los campos que no existen en un usuario
+_MISSING = object()
+
+
+def _compile_getter(path: str):
+    """
+    Generar el código de una comprensión de lista que lee `path` de cada
+    usuario con acceso directo por clave (u["dob"]["age"]), sin bucles
+    intermedios de Python ni búsqueda de claves por ruta.
+    """
+    keys = path.split(".")
+    access = "".join(f"[{key!r}]" for key in keys)
+    namespace = {}
+    exec(f"def get(records):\n    return [u{access} for u in records]\n", namespace)
+    return namespace["get"], tuple(keys)
+
+
+def _safe_get(record, keys):
+    """
+    Leer una ruta de un usuario devolviendo _MISSING si algún nivel no existe.
+    """
+    value = record
+    for key in keys:
+        try:
+            value = value[key]
+        except (KeyError, TypeError, IndexError):
+            return _MISSING
+    return value
+
+
+def _read_column(getter, keys, records):
+    """
+    Leer una columna completa. Se intenta primero la versión compilada; solo
+    si algún usuario no tiene la ruta se recorre usuario a usuario.
+    """
+    try:
+        return getter(records), True
+    except (KeyError, TypeError, IndexError):
+        values = [_safe_get(record, keys) for record in records]
+        present = any(value is not _MISSING for value in values)
+        return [None if value is _MISSING else value for value in values], present
+
+
+def _to_typed(values, dtype, n):
+    """
+    Convertir los valores leídos al tipo final de la columna.
+    """
+    if dtype == "category":
+        return pd.Categorical(values)
+    if dtype == "float":
+        try:
+            return np.fromiter(values, dtype=np.float64, count=n)
+        except (ValueError, TypeError):
+            return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    if dtype == "int":
+        try:
+            return np.fromiter(values, dtype=np.int64, count=n)
+        except (ValueError, TypeError):
+            # Con valores ausentes json_normalize también devuelve float
+            return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy()
+    return pd.Series(values, dtype=dtype)
+
+
+@lru_cache(maxsize=None)
+def _compile(columns, dtypes):
+    getters = [(path, name, *_compile_getter(path)) for path, name in columns]
+    dtypes = dict(dtypes)
+
+    def extract(records):
+        if not isinstance(records, list):
+            records = list(records)
+        n = len(records)
+
+        data = {}
+        for path, name, getter, keys in getters:
+            values, present = _read_column(getter, keys, records)
+            # Igual que al seleccionar solo columnas existentes tras json_normalize
+            if not present:
+                continue
+            data[name] = _to_typed(values, dtypes.get(name), n)
+        return pd.DataFrame(data, index=pd.RangeIndex(n))
+
+    return extract
+
+
+def compile_extractor(rename_colls: dict, dtypes: dict | None = None):
+    """
+    Compilar (una sola vez por configuración) un extractor de columnas.
+
+    Parameters
+    ----------
+    rename_colls : dict
+        Ruta JSON con puntos -> nombre de la columna final
+        (e.g., {"dob.age": "Edad"}), igual que el mapeo usado con json_normalize.
+    dtypes : dict, optional
+        Nombre de columna -> "category", "int", "float" o un dtype de pandas.
+        Las columnas sin tipo se infieren como en json_normalize.
+
+    Devuelve una función extract(records) -> DataFrame.
+    """
+    return _compile(tuple(rename_colls.items()), tuple((dtypes or {}).items()))
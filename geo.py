@@ -0,0 +1,286 @@
+"""
+Geometrías de países para el mapa coroplético (choropleth) sin red.
+
+En lugar de descargar world-countries.json completo en cada ejecución, el
+repositorio incluye en geodata/ la geometría ya preparada:
+
+- world_z2.geojson, world_z4.geojson, world_z6.geojson: geometría
+  simplificada (Douglas-Peucker) y con coordenadas redondeadas para cada
+  nivel de zoom de Leaflet, de modo que no hay más detalle que píxeles,
+- world_index.json: índice precalculado nombre de país / ISO3 -> feature.
+
+El join con los usuarios es una búsqueda en diccionario por país y el HTML
+solo incluye los países que tienen usuarios.
+
+Los ficheros incluidos se generaron desde Natural Earth 1:110m (dominio
+público, naturalearthdata.com) convertido al formato de world-countries.json
+(id = ISO3, properties.name). `python geo.py build` los regenera a partir de
+world-countries.json de folium o de otro fichero con ese formato.
+
+Uso:
+    python geo.py build                       # regenerar geodata/ (descarga world-countries.json)
+    python geo.py build world-countries.json  # desde un fichero local
+
+    world, df = choropleth_data(Counter(...), zoom=2)
+    folium.Choropleth(geo_data=world, data=df, columns=["iso3", "count"], key_on="feature.id")
+"""
+
+import json
+import math
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from countries import load_country_table, normalize_name
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geodata")
+WORLD_SOURCE_URL = "https://raw.githubusercontent.com/python-visualization/folium/master/examples/data/world-countries.json"
+WORLD_SOURCE_NAME = "world-countries.json"
+INDEX_NAME = "world_index.json"
+
+# Niveles de zoom de Leaflet para los que se genera geometría
+ZOOM_LEVELS = (2, 4, 6)
+
+
+def zoom_filename(zoom):
+    return f"world_z{zoom}.geojson"
+
+
+def zoom_tolerance(zoom):
+    """
+    Grados por píxel en el ecuador al nivel de zoom (teselas de 256 px):
+    por debajo de esa distancia un vértice no se ve.
+    """
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def zoom_decimals(zoom):
+    """
+    Decimales suficientes para la precisión de un píxel al nivel de zoom.
+    """
+    return max(1, math.ceil(-math.log10(zoom_tolerance(zoom))) + 1)
+
+
+def _douglas_peucker(points, tolerance):
+    """
+    Simplificar una línea (array n x 2) con el algoritmo de Douglas-Peucker.
+    """
+    n = len(points)
+    if n < 3:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = points[end] - points[start]
+        rel = points[start + 1:end] - points[start]
+        norm = math.hypot(seg[0], seg[1])
+        if norm == 0:   # anillo cerrado: distancia al punto inicial
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return points[keep]
+
+
+def simplify_ring(ring, tolerance, decimals):
+    """
+    Simplificar y redondear un anillo de polígono. Devuelve None si deja de
+    ser un polígono (menos de 4 puntos) al nivel de detalle pedido.
+    """
+    points = _douglas_peucker(np.asarray(ring, dtype=np.float64), tolerance)
+    points = np.round(points, decimals)
+    # Quitar puntos repetidos consecutivos que aparecen al redondear
+    if len(points) > 1:
+        points = points[np.r_[True, np.any(points[1:] != points[:-1], axis=1)]]
+    if len(points) < 4:
+        return None
+    return points.tolist()
+
+
+def _simplify_polygon(rings, tolerance, decimals):
+    exterior = simplify_ring(rings[0], tolerance, decimals)
+    if exterior is None:
+        return None
+    holes = [hole for hole in (simplify_ring(r, tolerance, decimals) for r in rings[1:]) if hole is not None]
+    return [exterior] + holes
+
+
+def _bbox_area(rings):
+    points = np.asarray(rings[0], dtype=np.float64)
+    return float(np.ptp(points[:, 0]) * np.ptp(points[:, 1]))
+
+
+def simplify_geometry(geometry, tolerance, decimals):
+    """
+    Simplificar un Polygon o MultiPolygon. Las islas más pequeñas que un
+    píxel desaparecen, pero cada país conserva al menos su polígono mayor.
+    """
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return geometry
+
+    simplified = [p for p in (_simplify_polygon(rings, tolerance, decimals) for rings in polygons) if p is not None]
+    if not simplified:
+        largest = max(polygons, key=_bbox_area)
+        exterior = np.round(np.asarray(largest[0], dtype=np.float64), decimals).tolist()
+        simplified = [[exterior]]
+    if len(simplified) == 1:
+        return {"type": "Polygon", "coordinates": simplified[0]}
+    return {"type": "MultiPolygon", "coordinates": simplified}
+
+
+def _download_source(geo_dir):
+    import requests
+
+    os.makedirs(geo_dir, exist_ok=True)
+    path = os.path.join(geo_dir, WORLD_SOURCE_NAME)
+    print(f"Descargando {WORLD_SOURCE_URL}...")
+    response = requests.get(WORLD_SOURCE_URL, timeout=60)
+    response.raise_for_status()
+    with open(path, "wb") as f:
+        f.write(response.content)
+    return path
+
+
+def build_index(features):
+    """
+    Índice {'iso3': {ISO3: posición}, 'names': {nombre normalizado: ISO3}} con
+    los nombres del GeoJSON y los de la tabla de países (countries.py).
+    """
+    iso3 = {feature["id"]: i for i, feature in enumerate(features)}
+    names = {name: code for name, code in load_country_table()["names"].items() if code in iso3}
+    # El nombre del propio GeoJSON tiene prioridad
+    for feature in features:
+        names[normalize_name(feature["properties"]["name"])] = feature["id"]
+        names[normalize_name(feature["id"])] = feature["id"]
+    return {"iso3": iso3, "names": names}
+
+
+def build_geo_bundle(source=None, geo_dir=GEO_DIR, zooms=ZOOM_LEVELS):
+    """
+    Generar geodata/ a partir de world-countries.json (ruta local; por
+    defecto se descarga una sola vez). Devuelve las rutas generadas.
+    """
+    if source is None:
+        source = os.path.join(geo_dir, WORLD_SOURCE_NAME)
+        if not os.path.exists(source):
+            source = _download_source(geo_dir)
+    with open(source, encoding="utf-8") as f:
+        world = json.load(f)
+
+    # Solo países con código ISO3 (el join se hace por feature.id)
+    features = [f for f in world["features"] if isinstance(f.get("id"), str) and len(f["id"]) == 3]
+    os.makedirs(geo_dir, exist_ok=True)
+    paths = []
+
+    for zoom in zooms:
+        tolerance, decimals = zoom_tolerance(zoom), zoom_decimals(zoom)
+        simplified = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "id": f["id"], "properties": {"name": f["properties"]["name"]},
+                 "geometry": simplify_geometry(f["geometry"], tolerance, decimals)}
+                for f in features
+            ],
+        }
+        path = os.path.join(geo_dir, zoom_filename(zoom))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(simplified, f, separators=(",", ":"), ensure_ascii=False)
+        paths.append(path)
+        print(f"Zoom {zoom}: {os.path.getsize(path) / 1024:.0f} KB -> {path}")
+
+    path = os.path.join(geo_dir, INDEX_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_index(features), f, ensure_ascii=False, sort_keys=True)
+    paths.append(path)
+    print(f"Índice de países: {path}")
+    return paths
+
+
+def _nearest_zoom(zoom, zooms):
+    # El nivel generado más detallado que no supere el zoom pedido
+    candidates = [z for z in zooms if z <= zoom]
+    return max(candidates) if candidates else min(zooms)
+
+
+@lru_cache(maxsize=None)
+def load_world(zoom=2, geo_dir=GEO_DIR):
+    """
+    Geometría simplificada para el zoom indicado (cacheada en memoria).
+    """
+    zoom = _nearest_zoom(zoom, ZOOM_LEVELS)
+    with open(os.path.join(geo_dir, zoom_filename(zoom)), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_index(geo_dir=GEO_DIR):
+    with open(os.path.join(geo_dir, INDEX_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def country_iso3(name, geo_dir=GEO_DIR):
+    """
+    Código ISO3 de un nombre de país (None si no está en el índice).
+    """
+    return load_index(geo_dir)["names"].get(normalize_name(name))
+
+
+def choropleth_data(counts, zoom=2, geo_dir=GEO_DIR):
+    """
+    Preparar el choropleth a partir de {país: usuarios}.
+
+    Devuelve (geojson, df): un FeatureCollection solo con los países que
+    tienen usuarios (con 'count' en properties) y un DataFrame con las
+    columnas iso3 y count para folium.Choropleth(key_on="feature.id").
+    Los países que no están en el índice se avisan por pantalla.
+    """
+    import pandas as pd
+
+    index = load_index(geo_dir)
+    world = load_world(zoom, geo_dir)
+
+    totals = {}
+    unmatched = []
+    for country, count in counts.items():
+        code = index["names"].get(normalize_name(country))
+        if code is None:
+            unmatched.append(country)
+            continue
+        totals[code] = totals.get(code, 0) + int(count)
+    if unmatched:
+        print(f"Países sin geometría: {', '.join(sorted(map(str, unmatched)))}")
+
+    features = []
+    for code, count in totals.items():
+        feature = world["features"][index["iso3"][code]]
+        features.append({**feature, "properties": {**feature["properties"], "count": count}})
+
+    df = pd.DataFrame(sorted(totals.items()), columns=["iso3", "count"])
+    return {"type": "FeatureCollection", "features": features}, df
+
+
+def geo_bundle_available(geo_dir=GEO_DIR):
+    return os.path.exists(os.path.join(geo_dir, INDEX_NAME))
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_geo_bundle(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        print(__doc__)
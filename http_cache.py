@@ -0,0 +1,175 @@
+"""
+Caché local en disco de las respuestas de randomuser.me.
+
+Con un seed fijo la API devuelve siempre los mismos usuarios, así que la
+respuesta se puede guardar y reutilizar. Cada respuesta se identifica por el
+hash de (url, results, seed, page, format) y se guarda comprimida con gzip.
+Las entradas caducan tras `ttl` segundos y, si la caché supera `max_bytes`,
+se borran las menos usadas recientemente (LRU).
+
+Uso:
+    cache = ResponseCache(".cache_api", ttl=7 * 24 * 3600)
+    data = api_etl(url, results=200, seed="1234", cache=cache)
+"""
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Parámetros de la petición que identifican la respuesta
+KEY_PARAMS = ("results", "seed", "page", "format")
+
+
+class ResponseCache:
+    """
+    Caché de respuestas HTTP direccionada por contenido.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Carpeta donde se guardan las respuestas comprimidas.
+    ttl : float
+        Segundos que una respuesta se considera válida (None = sin caducidad).
+    max_bytes : int
+        Tamaño máximo en disco; al superarlo se borran las entradas LRU.
+    compresslevel : int
+        Nivel de compresión gzip (1 rápido ... 9 máximo).
+    """
+
+    def __init__(self, cache_dir=".cache_api", ttl=7 * 24 * 3600, max_bytes=512 * 1024 * 1024, compresslevel=6):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cacheable(params):
+        """
+        Solo las peticiones con seed son deterministas y se pueden cachear.
+        """
+        return bool(params.get("seed"))
+
+    def key(self, url, params):
+        """
+        Hash SHA-256 de la url y los parámetros que definen la respuesta.
+        """
+        ident = {"url": url.rstrip("/")}
+        ident.update({name: str(params.get(name, "")) for name in KEY_PARAMS})
+        # Sin 'page' la API devuelve la primera página
+        ident["page"] = ident["page"] or "1"
+        ident["format"] = ident["format"] or "json"
+        return hashlib.sha256(json.dumps(ident, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def open(self, url, params):
+        """
+        Abrir una respuesta cacheada para leerla por trozos (bytes ya
+        descomprimidos). Devuelve None si no existe o ha caducado.
+        """
+        path = self._path(self.key(url, params))
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        now = time.time()
+        # mtime = momento en que se guardó la respuesta
+        if self.ttl is not None and now - stat.st_mtime > self.ttl:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return None
+
+        # atime = último uso, se actualiza a mano para el orden LRU
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path, (now, stat.st_mtime))
+        try:
+            return gzip.open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def get(self, url, params):
+        """
+        Devolver el cuerpo completo de una respuesta cacheada o None.
+        """
+        f = self.open(url, params)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    @contextlib.contextmanager
+    def writer(self, url, params):
+        """
+        Escribir una respuesta por trozos. La entrada solo se publica si el
+        bloque termina sin errores (escritura atómica con os.replace).
+        """
+        path = self._path(self.key(url, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compresslevel) as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def put(self, url, params, body):
+        """
+        Guardar el cuerpo completo de una respuesta.
+        """
+        with self.writer(url, params) as f:
+            f.write(body)
+
+    def _entries(self):
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json.gz"):
+                    yield entry
+
+    def size(self):
+        """
+        Bytes ocupados por la caché en disco.
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self):
+        """
+        Borrar entradas caducadas y, si se supera max_bytes, las menos usadas.
+        """
+        now = time.time()
+        entries = []
+        for entry in self._entries():
+            stat = entry.stat()
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        """
+        Vaciar la caché.
+        """
+        for entry in list(self._entries()):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(entry.path)
@@ -0,0 +1,340 @@
+"""
+Zona de aterrizaje (landing zone) de las respuestas crudas de la API.
+
+Cada página descargada se guarda tal como llegó, comprimida con gzip, al
+final de un fichero de segmento (solo se añade, nunca se reescribe). Un
+índice por (run, página) guarda en qué segmento, offset y longitud está
+cada página, así que se puede leer cualquier página sin descomprimir las
+demás. Así se pueden volver a transformar ejecuciones antiguas, también las
+que no usan seed (marina.py), sin red y a velocidad de disco.
+
+    landing/
+        runs.jsonl              una línea por ejecución (origen, url, seed...)
+        index.jsonl             una línea por página: run, page, segment, offset, length
+        segments/segment-000001.gz   páginas concatenadas (gzip multi-miembro)
+
+Los datos de una página se escriben (y se sincronizan en disco) antes de su
+línea del índice: una página solo aparece en el índice cuando está completa.
+Cada página lleva el sha256 de su contenido: si ya hay una página igual en la
+zona (e.g., las páginas servidas desde .cache_api en cada ejecución) solo se
+añade la línea del índice, apuntando al mismo tramo del segmento.
+Si una página se repite en una ejecución vale la última. Un solo proceso
+escribe a la vez en cada zona (varios hilos sí).
+
+Guardar las páginas es opcional: ETL_main_v1.py y pipeline.py solo lo
+hacen con --landing-dir y marina.py con la variable de entorno LANDING_DIR.
+
+Uso:
+    zone = LandingZone("landing")
+    run = zone.new_run("api_etl", url=url, seed="1234")
+    data = api_etl(url, results=200, seed="1234", landing=run)
+
+    data = zone.replay(run.run_id)            # mismo formato que api_etl (los `results` pedidos)
+    df_clean = transform(zone.replay("20260101T120000-ab12cd"))
+
+    python landing.py list                    # ejecuciones guardadas
+    python landing.py pages <run>
+"""
+
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+LANDING_DIR = "landing"
+# Tamaño a partir del cual se empieza un segmento nuevo
+SEGMENT_BYTES = 256 * 1024 * 1024
+
+
+class LandingZone:
+    """
+    Segmentos comprimidos de solo añadir con índice por (run, página).
+
+    Parameters
+    ----------
+    root : str
+        Carpeta de la zona de aterrizaje.
+    segment_bytes : int
+        Tamaño máximo aproximado de cada segmento.
+    compresslevel : int
+        Nivel de compresión gzip (1 rápido ... 9 máximo).
+    fsync : bool
+        Sincronizar cada página en disco antes de añadirla al índice.
+    """
+
+    def __init__(self, root=LANDING_DIR, segment_bytes=SEGMENT_BYTES, compresslevel=6, fsync=True):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.compresslevel = compresslevel
+        self.fsync = fsync
+        self.segments_dir = os.path.join(root, "segments")
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.runs_path = os.path.join(root, "runs.jsonl")
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        # Índice en memoria: {run: {page: entrada}}, leído por incrementos
+        self._index = {}
+        self._index_pos = 0
+        # Entrada con los datos de cada contenido ya guardado: {sha256: entrada}
+        self._by_hash = {}
+
+    # --- Escritura ---
+
+    def new_run(self, source, run_id=None, **meta):
+        """
+        Registrar una ejecución nueva y devolver su RunWriter. meta: url,
+        seed, results, page_size... (se guarda tal cual en runs.jsonl).
+        """
+        run_id = run_id or f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{secrets.token_hex(3)}"
+        entry = {"run": run_id, "source": source, "created_at": time.time(), **meta}
+        with self.lock:
+            self._append_line(self.runs_path, entry)
+        return RunWriter(self, run_id)
+
+    def _append_line(self, path, entry):
+        line = (json.dumps(entry, ensure_ascii=False, sort_keys=True) + "\n").encode("utf-8")
+        with open(path, "a+b") as f:
+            # Tras una escritura interrumpida la línea incompleta queda sola (y se ignora)
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _current_segment(self):
+        """
+        Último segmento, o uno nuevo si no hay o ya supera segment_bytes.
+        """
+        names = sorted(name for name in os.listdir(self.segments_dir) if name.startswith("segment-"))
+        if names:
+            path = os.path.join(self.segments_dir, names[-1])
+            if os.path.getsize(path) < self.segment_bytes:
+                return names[-1]
+        number = int(names[-1][len("segment-"):-len(".gz")]) + 1 if names else 1
+        return f"segment-{number:06d}.gz"
+
+    def write_page(self, run_id, page, compressed, raw_bytes, sha256=None, **meta):
+        """
+        Añadir una página ya comprimida (un miembro gzip) al segmento actual
+        y después su entrada al índice. Si sha256 (del contenido sin
+        comprimir) ya está en la zona, solo se añade la entrada, que apunta
+        a los datos existentes. Devuelve la entrada.
+        """
+        with self.lock:
+            stored = self._refresh_hashes().get(sha256) if sha256 else None
+            if stored is not None:
+                segment, offset, duplicate = stored["segment"], stored["offset"], True
+            else:
+                segment, duplicate = self._current_segment(), False
+                with open(os.path.join(self.segments_dir, segment), "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(compressed)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+            entry = {"run": run_id, "page": int(page), "segment": segment, "offset": offset,
+                     "length": stored["length"] if duplicate else len(compressed), "bytes": raw_bytes,
+                     "sha256": sha256, "duplicate": duplicate, "fetched_at": time.time(), **meta}
+            self._append_line(self.index_path, entry)
+        return entry
+
+    # --- Lectura ---
+
+    def _refresh(self):
+        """
+        Leer las líneas nuevas del índice (otro proceso puede estar escribiendo).
+        """
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return self._index
+        if size == self._index_pos:
+            return self._index
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # Línea a medio escribir: se lee en la siguiente llamada
+                self._index_pos += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index.setdefault(entry["run"], {})[entry["page"]] = entry
+                if entry.get("sha256"):
+                    self._by_hash.setdefault(entry["sha256"], entry)
+        return self._index
+
+    def _refresh_hashes(self):
+        self._refresh()
+        return self._by_hash
+
+    def runs(self):
+        """
+        Ejecuciones registradas (runs.jsonl) con su número de páginas y bytes.
+        """
+        index = self._refresh()
+        runs = []
+        if os.path.exists(self.runs_path):
+            with open(self.runs_path, encoding="utf-8") as f:
+                for line in f:
+                    with contextlib.suppress(json.JSONDecodeError):
+                        runs.append(json.loads(line))
+        for run in runs:
+            pages = index.get(run["run"], {})
+            run["pages"] = len(pages)
+            run["bytes"] = sum(entry["bytes"] for entry in pages.values())
+            run["stored_bytes"] = sum(entry["length"] for entry in pages.values() if not entry.get("duplicate"))
+        return runs
+
+    def run_info(self, run_id):
+        """
+        Línea de runs.jsonl de la ejecución (None si no está registrada).
+        """
+        for run in self.runs():
+            if run["run"] == run_id:
+                return run
+        return None
+
+    def _recorded_results(self, run_id):
+        # Usuarios que pidió la ejecución: la última página puede traer más
+        run = self.run_info(run_id)
+        return run.get("results") if run else None
+
+    def pages(self, run_id):
+        """
+        Números de página guardados de una ejecución, en orden.
+        """
+        return sorted(self._refresh().get(run_id, {}))
+
+    def entry(self, run_id, page):
+        try:
+            return self._refresh()[run_id][int(page)]
+        except KeyError:
+            raise KeyError(f"No existe la página {page} de la ejecución {run_id!r} en {self.root}") from None
+
+    def read_page(self, run_id, page):
+        """
+        Cuerpo original (bytes) de una página: se lee solo su tramo del segmento.
+        """
+        entry = self.entry(run_id, page)
+        with open(os.path.join(self.segments_dir, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            return gzip.decompress(f.read(entry["length"]))
+
+    def load_page(self, run_id, page):
+        """
+        Página decodificada ({"results": [...], "info": {...}}).
+        """
+        return json.loads(self.read_page(run_id, page))
+
+    def iter_records(self, run_id, pages=None, results=None):
+        """
+        Usuarios de la ejecución página a página (para transform_stream).
+        Sin pages ni results se para en los `results` que pidió la ejecución.
+        """
+        if pages is None and results is None:
+            results = self._recorded_results(run_id)
+        pending = results
+        for page in (self.pages(run_id) if pages is None else pages):
+            users = self.load_page(run_id, page)["results"]
+            if pending is not None:
+                users = users[:pending]
+                pending -= len(users)
+            yield from users
+            if pending == 0:
+                return
+
+    def replay(self, run_id, pages=None, results=None):
+        """
+        Reconstruir la respuesta de una ejecución sin red, con el mismo
+        formato que api_etl: {"results": [...], "info": {...}}. Se puede
+        limitar a algunas páginas y a los primeros `results` usuarios; por
+        defecto se devuelven los `results` que pidió la ejecución (la última
+        página descargada puede tener más usuarios).
+        """
+        if pages is None and results is None:
+            results = self._recorded_results(run_id)
+        pages = self.pages(run_id) if pages is None else list(pages)
+        if not pages:
+            raise KeyError(f"La ejecución {run_id!r} no tiene páginas en {self.root}")
+        users, info = [], {}
+        for page in pages:
+            payload = self.load_page(run_id, page)
+            users.extend(payload["results"])
+            info = info or dict(payload.get("info", {}))
+        if results is not None:
+            users = users[:results]
+        info.update({"results": len(users), "page": len(pages), "run": run_id})
+        print(f"Datos reproducidos de {self.root}: {len(users)} usuarios en {len(pages)} páginas ({run_id}).")
+        return {"results": users, "info": info}
+
+
+class RunWriter:
+    """
+    Escritor de las páginas de una ejecución (se pasa como landing= a las
+    funciones de extracción de Functions_v1).
+    """
+
+    def __init__(self, zone, run_id):
+        self.zone = zone
+        self.run_id = run_id
+
+    def write_page(self, page, body, **meta):
+        """
+        Guardar el cuerpo completo de una página.
+        """
+        compressed = gzip.compress(body, compresslevel=self.zone.compresslevel)
+        return self.zone.write_page(self.run_id, page, compressed, len(body),
+                                    sha256=hashlib.sha256(body).hexdigest(), **meta)
+
+    @contextlib.contextmanager
+    def writer(self, page, **meta):
+        """
+        Escribir una página por trozos (respuestas en streaming). Solo se
+        añade a la zona si el bloque termina sin errores.
+        """
+        buffer = io.BytesIO()
+        counter = _CountingWriter(gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=self.zone.compresslevel))
+        with counter.raw:
+            yield counter
+        self.zone.write_page(self.run_id, page, buffer.getvalue(), counter.count,
+                             sha256=counter.sha256.hexdigest(), **meta)
+
+
+class _CountingWriter:
+    # Cuenta (y resume con sha256) los bytes sin comprimir de la página
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.count += len(data)
+        self.sha256.update(data)
+        return self.raw.write(data)
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    zone = LandingZone(os.environ.get("LANDING_DIR", LANDING_DIR))
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        for run in zone.runs():
+            print(f"{run['run']}  {run['source']:<12} páginas={run['pages']:<5} "
+                  f"bytes={run['bytes']:,} guardados={run['stored_bytes']:,}  seed={run.get('seed')}")
+    elif command == "pages" and len(sys.argv) > 2:
+        for page in zone.pages(sys.argv[2]):
+            entry = zone.entry(sys.argv[2], page)
+            print(f"página {page}: {entry['segment']} offset={entry['offset']} length={entry['length']}")
+    else:
+        print(__doc__)
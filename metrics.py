@@ -0,0 +1,231 @@
+"""
+Métricas por etapa de la ETL (extract, transform, load, plots).
+
+Para cada etapa se mide el tiempo real, el tiempo de CPU, las filas
+procesadas, las filas por segundo, los bytes descargados y el pico de memoria
+(RSS) durante la etapa, muestreado por un hilo en segundo plano. El máximo
+del proceso desde su inicio (ru_maxrss) se guarda aparte como
+process_peak_rss_bytes: no baja entre etapas, así que no sirve para
+compararlas. El informe se guarda como JSON en la carpeta de resultados
+y, opcionalmente, como fichero de texto para el textfile collector de
+Prometheus (node_exporter).
+
+Uso:
+    metrics = StageMetrics()
+    with metrics.stage("transform") as m:
+        df_clean = transform(data)
+        m["rows"] = len(df_clean)
+    metrics.write_json("Resultados")
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# Intervalo de muestreo del RSS durante una etapa (segundos)
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def peak_rss_bytes():
+    """
+    Pico de memoria residente del proceso desde su inicio (None si no disponible).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    """
+    Memoria residente actual del proceso (solo Linux, None en otros sistemas).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Muestreadores con el hilo en marcha (ver pause_samplers)
+_ACTIVE_SAMPLERS = set()
+_ACTIVE_LOCK = threading.Lock()
+
+
+class RssSampler:
+    """
+    Hilo que lee el RSS actual cada `interval` segundos y guarda el máximo
+    (solo Linux; en otros sistemas peak es None).
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _join(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sample()
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._start()
+            with _ACTIVE_LOCK:
+                _ACTIVE_SAMPLERS.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _ACTIVE_LOCK:
+            _ACTIVE_SAMPLERS.discard(self)
+        self._join()
+        return False
+
+
+@contextlib.contextmanager
+def pause_samplers():
+    """
+    Parar los hilos de muestreo del RSS durante el bloque y volver a
+    arrancarlos al salir. Se usa alrededor de un fork: un hijo creado
+    mientras otro hilo tiene tomado un lock (el del fichero de /proc, el
+    del intérprete al abrirlo...) puede quedarse bloqueado para siempre.
+    El pico de la etapa incluye una lectura justo antes y otra justo después.
+    """
+    with _ACTIVE_LOCK:
+        samplers = [sampler for sampler in _ACTIVE_SAMPLERS if sampler._thread is not None]
+    for sampler in samplers:
+        sampler._join()
+    try:
+        yield
+    finally:
+        for sampler in samplers:
+            sampler._start()
+
+
+class StageMetrics:
+    """
+    Registro de métricas de las etapas de una ejecución de la ETL.
+    """
+
+    def __init__(self, run_name="etl"):
+        self.run_name = run_name
+        self.started_at = time.time()
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Medir una etapa. Dentro del bloque se pueden rellenar las claves
+        'rows' y 'bytes' del diccionario devuelto.
+        """
+        record = {"stage": name, "rows": None, "bytes": None}
+        rss_before = current_rss_bytes()
+        sampler = RssSampler()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            with sampler:
+                yield record
+            record["status"] = "ok"
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            record["wall_seconds"] = round(wall, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            rows = record["rows"]
+            record["rows_per_second"] = round(rows / wall, 2) if rows and wall > 0 else None
+            record["rss_start_bytes"] = rss_before
+            record["rss_end_bytes"] = current_rss_bytes()
+            # Pico de esta etapa (muestreado) y máximo del proceso hasta ahora
+            record["peak_rss_bytes"] = sampler.peak
+            record["process_peak_rss_bytes"] = peak_rss_bytes()
+            self.stages.append(record)
+
+    def report(self):
+        """
+        Informe completo como diccionario serializable a JSON.
+        """
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages), 6),
+            "process_peak_rss_bytes": peak_rss_bytes(),
+            "stages": self.stages,
+        }
+
+    def write_json(self, output_dir, filename="metrics.json"):
+        """
+        Guardar el informe en output_dir/filename.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=4)
+        print(f"Métricas guardadas en: {path}")
+        return path
+
+    def write_prometheus(self, path):
+        """
+        Escribir las métricas en formato de texto de Prometheus. Se escribe en
+        un fichero temporal y se renombra para que el collector nunca lea un
+        fichero a medias.
+        """
+        series = {
+            "etl_stage_wall_seconds": ("gauge", "Tiempo real de la etapa", "wall_seconds"),
+            "etl_stage_cpu_seconds": ("gauge", "Tiempo de CPU de la etapa", "cpu_seconds"),
+            "etl_stage_rows": ("gauge", "Filas procesadas en la etapa", "rows"),
+            "etl_stage_rows_per_second": ("gauge", "Filas por segundo de la etapa", "rows_per_second"),
+            "etl_stage_bytes": ("gauge", "Bytes descargados en la etapa", "bytes"),
+            "etl_stage_bytes_per_row": ("gauge", "Memoria de df_clean por fila", "bytes_per_row"),
+            "etl_stage_peak_rss_bytes": ("gauge", "Pico de RSS durante la etapa", "peak_rss_bytes"),
+            "etl_process_peak_rss_bytes": ("gauge", "Pico de RSS del proceso al terminar la etapa",
+                                           "process_peak_rss_bytes"),
+        }
+        lines = []
+        for metric, (kind, help_text, key) in series.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for record in self.stages:
+                if record.get(key) is not None:
+                    lines.append(f'{metric}{{run="{self.run_name}",stage="{record["stage"]}"}} {record[key]}')
+        lines.append("# HELP etl_last_run_timestamp_seconds Fin de la última ejecución")
+        lines.append("# TYPE etl_last_run_timestamp_seconds gauge")
+        lines.append(f'etl_last_run_timestamp_seconds{{run="{self.run_name}"}} {time.time():.3f}')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        print(f"Métricas Prometheus guardadas en: {path}")
+        return path
@@ -0,0 +1,381 @@
+"""
+transform en paralelo: los usuarios se reparten en fragmentos contiguos
+entre varios procesos y cada proceso escribe sus columnas ya tipadas en
+memoria compartida, sin devolverlas serializadas con pickle.
+
+    - Los procesos se crean con fork después de guardar la lista de usuarios
+      en una variable del módulo: la heredan sin serializar ningún dict
+      (gc.freeze evita que el recolector toque todos los objetos en los hijos).
+      Los hilos de muestreo de metrics.py se paran mientras se crean los
+      procesos: un fork con otro hilo en marcha puede bloquear al hijo.
+    - Cada proceso ejecuta el transform de siempre sobre su fragmento.
+    - Las columnas numéricas (int64/float64) y los códigos de las category
+      se escriben en un mmap anónimo compartido por columna, reservado por el
+      proceso principal para todas las filas: cada fragmento escribe en su
+      tramo y df_clean usa ese mismo mmap, sin copiar.
+    - Las columnas de texto (str con pyarrow) se copian una vez en un bloque
+      shared_memory por fragmento; df_clean las usa como un ChunkedArray de
+      Arrow (un trozo por fragmento) sobre ese bloque.
+    - Lo demás (tipos inesperados, columnas que faltan en un fragmento) se
+      devuelve con pickle y se concatena como en transform_stream.
+
+Solo las categorías (unas decenas de valores) y la descripción de los
+bloques vuelven al proceso principal.
+
+Sin fork (Windows, macOS con spawn) o con pocos usuarios por proceso se usa
+transform normal: enviar los dicts a cada proceso costaría más que
+transformarlos.
+
+Uso:
+    df_clean = transform_parallel(data, workers=16)
+    df_clean = transform(data, workers=16)      # lo mismo desde Functions_v1
+"""
+
+import gc
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from accumulators import RANGO_BINS, RANGO_LABELS
+from metrics import pause_samplers
+
+# Por debajo de este número de usuarios por proceso no compensa arrancar el pool
+MIN_SHARD = 20_000
+# Usuarios que se transforman en el proceso principal para conocer el esquema
+PROBE_SIZE = 64
+# Alineación de los buffers de Arrow dentro de cada bloque compartido
+_ALIGN = 64
+
+# Estado heredado por los procesos del pool (fork): nunca se serializa
+_RECORDS = None
+_OUTPUTS = None
+
+
+def _column_kind(serie):
+    """
+    Cómo viaja una columna: 'fixed' (int64/float64), 'category', 'string'
+    (str con pyarrow) o 'pickle'.
+    """
+    dtype = serie.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if isinstance(dtype, np.dtype) and dtype in (np.int64, np.float64):
+        return "fixed"
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow":
+        return "string"
+    return "pickle"
+
+
+def _string_dtype():
+    # dtype str de pandas sobre Arrow (el de las columnas de texto de transform)
+    return pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def _allocate_outputs(schema, n):
+    """
+    Un mmap anónimo compartido (MAP_SHARED, heredado con fork) por columna
+    de ancho fijo: 8 bytes por fila para 'fixed' y 4 para los códigos int32.
+    """
+    outputs = {}
+    for name, kind in schema.items():
+        if kind == "fixed":
+            outputs[name] = (kind, mmap.mmap(-1, 8 * n))
+        elif kind == "category":
+            outputs[name] = (kind, mmap.mmap(-1, 4 * n))
+        else:
+            outputs[name] = (kind, None)
+    return outputs
+
+
+def _string_segment(strings):
+    """
+    Copiar las columnas de texto del fragmento (arrays de Arrow) en un único
+    bloque shared_memory. Devuelve (nombre del bloque, {columna: layout}).
+    """
+    import pyarrow as pa
+
+    arrays, size = {}, 0
+    for name, serie in strings.items():
+        array = pa.array(serie.array)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        array = array.cast(pa.large_string())
+        buffers = []
+        for buf in array.buffers():
+            if buf is None:
+                buffers.append((buf, None))
+                continue
+            size = -(-size // _ALIGN) * _ALIGN
+            buffers.append((buf, size))
+            size += buf.size
+        arrays[name] = (array, buffers)
+    if not arrays:
+        return None, {}
+
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layouts = {}
+    try:
+        for name, (array, buffers) in arrays.items():
+            spans = []
+            for buf, pos in buffers:
+                if buf is None:
+                    spans.append(None)
+                    continue
+                segment.buf[pos:pos + buf.size] = memoryview(buf).cast("B")
+                spans.append((pos, buf.size))
+            layouts[name] = (len(array), array.null_count, array.offset, spans)
+    except Exception:
+        segment.close()
+        segment.unlink()
+        raise
+    segment.close()
+    return segment.name, layouts
+
+
+def _transform_shard(start, stop, age_bins, age_labels):
+    """
+    Transformar los usuarios _RECORDS[start:stop] y escribir sus columnas en
+    los buffers compartidos. Devuelve solo la descripción de cada columna.
+    """
+    from Functions_v1 import transform
+
+    df = transform({"results": _RECORDS[start:stop]}, age_bins=age_bins, age_labels=age_labels)
+
+    columns, strings = {}, {}
+    for name in df.columns:
+        serie = df[name]
+        kind, buffer = _OUTPUTS.get(name, ("pickle", None))
+        if _column_kind(serie) != kind or kind == "pickle":
+            columns[name] = ("pickle", serie)
+        elif kind == "fixed":
+            values = serie.to_numpy()
+            np.frombuffer(buffer, dtype=values.dtype)[start:stop] = values
+            columns[name] = ("fixed", values.dtype.str)
+        elif kind == "category":
+            np.frombuffer(buffer, dtype=np.int32)[start:stop] = serie.cat.codes.to_numpy()
+            columns[name] = ("category", list(serie.cat.categories), serie.cat.ordered)
+        else:
+            strings[name] = serie
+            columns[name] = ("string",)
+
+    segment, layouts = _string_segment(strings)
+    for name, layout in layouts.items():
+        columns[name] = ("string", segment, layout)
+    return {"start": start, "stop": stop, "order": list(df.columns), "columns": columns}
+
+
+def _open_segment(segments, segment_name):
+    """
+    Abrir (una vez por ensamblado) el bloque de texto de un fragmento. Se
+    desvincula en cuanto se abre: la memoria se libera cuando pandas suelta
+    el último array que lo usa.
+    """
+    if segment_name not in segments:
+        segment = shared_memory.SharedMemory(name=segment_name)
+        segment.unlink()
+        view = np.frombuffer(segment.buf, dtype=np.uint8)
+        segments[segment_name] = (segment, view.ctypes.data)
+        del view
+    return segments[segment_name]
+
+
+def _string_chunk(segments, info):
+    """
+    Array de Arrow (large_string) de un fragmento sobre su bloque compartido.
+    """
+    import pyarrow as pa
+
+    _, segment_name, (length, null_count, offset, spans) = info
+    segment, address = _open_segment(segments, segment_name)
+    # foreign_buffer mantiene vivo el bloque mientras Arrow use el buffer
+    buffers = [None if span is None else pa.foreign_buffer(address + span[0], span[1], base=segment)
+               for span in spans]
+    return pa.Array.from_buffers(pa.large_string(), length, buffers, null_count, offset)
+
+
+def _release_segments(shards):
+    # Bloques de texto que no se han llegado a abrir (si algo falla a medias)
+    for shard in shards:
+        for info in shard["columns"].values():
+            if info[0] == "string":
+                try:
+                    segment = shared_memory.SharedMemory(name=info[1])
+                except FileNotFoundError:
+                    continue
+                segment.close()
+                segment.unlink()
+
+
+def _category_column(shards, name, codes_buffer, n):
+    """
+    Categorical sobre los códigos compartidos. Si las categorías difieren
+    entre fragmentos se unen (ordenadas, como pd.Categorical) y se
+    reescriben los códigos de cada tramo en su sitio.
+    """
+    codes = np.frombuffer(codes_buffer, dtype=np.int32)
+    first = shards[0]["columns"][name]
+    categories, ordered = first[1], first[2]
+    if any(shard["columns"][name][1:] != first[1:] for shard in shards):
+        if ordered:
+            return None
+        categories = sorted(set().union(*(shard["columns"][name][1] for shard in shards)))
+        index = pd.Index(categories)
+        for shard in shards:
+            start, stop = shard["start"], shard["stop"]
+            lookup = index.get_indexer(pd.Index(shard["columns"][name][1])).astype(np.int32)
+            shard_codes = codes[start:stop]
+            codes[start:stop] = np.where(shard_codes >= 0, lookup[shard_codes], -1)
+    dtype = pd.CategoricalDtype(categories, ordered=ordered)
+    return pd.Categorical.from_codes(codes[:n], dtype=dtype, validate=False)
+
+
+def _fixed_column(shards, name, buffer, n):
+    """
+    Vista numpy del mmap de la columna. Si algún fragmento la devolvió como
+    float64 (enteros con ausentes) los tramos int64 se convierten en su sitio.
+    """
+    dtypes = {shard["columns"][name][1] for shard in shards}
+    if len(dtypes) == 1:
+        return np.frombuffer(buffer, dtype=np.dtype(dtypes.pop()))[:n]
+    as_float = np.frombuffer(buffer, dtype=np.float64)
+    as_int = np.frombuffer(buffer, dtype=np.int64)
+    for shard in shards:
+        if np.dtype(shard["columns"][name][1]) == np.int64:
+            as_float[shard["start"]:shard["stop"]] = as_int[shard["start"]:shard["stop"]]
+    return as_float[:n]
+
+
+def _shard_piece(shard, name, kinds, outputs, segments):
+    """
+    Valores de la columna en un fragmento como Series (camino lento, cuando
+    los fragmentos no coinciden en el tipo de la columna).
+    """
+    start, stop = shard["start"], shard["stop"]
+    index = pd.RangeIndex(start, stop)
+    info = shard["columns"].get(name)
+    if info is None:
+        # Columna ausente en el fragmento: nulos del tipo que tendría en transform
+        if "string" in kinds:
+            return pd.Series(np.nan, index=index, dtype=_string_dtype())
+        if "fixed" in kinds:
+            return pd.Series(np.nan, index=index, dtype=np.float64)
+        return pd.Series([None] * (stop - start), index=index, dtype=object)
+    if info[0] == "pickle":
+        return info[1].set_axis(index)
+    if info[0] == "fixed":
+        return pd.Series(np.frombuffer(outputs[name][1], dtype=np.dtype(info[1]))[start:stop], index=index)
+    if info[0] == "category":
+        codes = np.frombuffer(outputs[name][1], dtype=np.int32)[start:stop]
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(info[1], ordered=info[2])),
+                         index=index)
+    return pd.Series(pd.array(_string_chunk(segments, info), dtype=_string_dtype()), index=index)
+
+
+def _assemble(shards, outputs, n):
+    """
+    Construir df_clean con las columnas de todos los fragmentos, en el
+    orden en que las devuelve transform.
+    """
+    import pyarrow as pa
+
+    order = []
+    for shard in shards:
+        order.extend(name for name in shard["order"] if name not in order)
+
+    segments = {}
+    data = {}
+    for name in order:
+        kinds = {shard["columns"][name][0] if name in shard["columns"] else None for shard in shards}
+        column = None
+        if kinds == {"fixed"}:
+            column = _fixed_column(shards, name, outputs[name][1], n)
+        elif kinds == {"category"}:
+            column = _category_column(shards, name, outputs[name][1], n)
+        elif kinds == {"string"}:
+            chunks = [_string_chunk(segments, shard["columns"][name]) for shard in shards]
+            column = pd.array(pa.chunked_array(chunks, type=pa.large_string()), dtype=_string_dtype())
+        if column is None:
+            column = pd.concat([_shard_piece(shard, name, kinds, outputs, segments) for shard in shards])
+            if "category" in kinds:
+                # Como en transform_stream: pd.concat pierde el tipo category
+                column = column.astype("category")
+        data[name] = column
+    return pd.DataFrame(data, index=pd.RangeIndex(n), copy=False)
+
+
+def transform_parallel(data, workers=None, compact=False, age_bins=RANGO_BINS, age_labels=RANGO_LABELS,
+                       min_shard=MIN_SHARD):
+    """
+    Igual que Functions_v1.transform pero repartiendo los usuarios entre
+    `workers` procesos (por defecto os.cpu_count()).
+
+    Parámetros:
+        data (dict): respuesta de la API ({"results": [...]})
+        workers (int): procesos del pool
+        compact (bool): esquema compacto (se aplica al final, ver compact_schema)
+        age_bins, age_labels: rangos de RangoEdad (como en transform)
+        min_shard (int): usuarios mínimos por proceso; con menos se usan menos
+            procesos o el transform normal
+    """
+    global _RECORDS, _OUTPUTS
+    from Functions_v1 import compact_schema, transform
+
+    records = data["results"]
+    if not isinstance(records, list):
+        records = list(records)
+    n = len(records)
+    workers = min(workers or os.cpu_count() or 1, n // max(1, min_shard))
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    if workers <= 1 or not fork:
+        if workers > 1:
+            print("Sin fork en esta plataforma: transform en un solo proceso.")
+        return transform({"results": records}, compact=compact, age_bins=age_bins, age_labels=age_labels)
+
+    # Esquema de las columnas con unos pocos usuarios
+    probe = transform({"results": records[:PROBE_SIZE]}, age_bins=age_bins, age_labels=age_labels)
+    schema = {name: _column_kind(probe[name]) for name in probe.columns}
+    if "string" in schema.values():
+        try:
+            import pyarrow  # noqa: F401
+        except ModuleNotFoundError:
+            schema = {name: ("pickle" if kind == "string" else kind) for name, kind in schema.items()}
+
+    bounds = np.linspace(0, n, workers + 1).astype(int)
+    _RECORDS, _OUTPUTS = records, _allocate_outputs(schema, n)
+    outputs = _OUTPUTS
+    # Los bloques compartidos se registran en el resource_tracker del proceso principal
+    resource_tracker.ensure_running()
+    gc.freeze()
+    shards, error = [], None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            # Con fork el pool crea todos los procesos en el primer submit
+            with pause_samplers():
+                futures = [executor.submit(_transform_shard, int(start), int(stop), age_bins, age_labels)
+                           for start, stop in zip(bounds[:-1], bounds[1:])]
+            # Se esperan todos los fragmentos para poder liberar sus bloques si alguno falla
+            for future in futures:
+                try:
+                    shards.append(future.result())
+                except Exception as e:
+                    error = error or e
+    finally:
+        gc.unfreeze()
+        _RECORDS, _OUTPUTS = None, None
+
+    try:
+        if error is not None:
+            raise error
+        df_clean = _assemble(shards, outputs, n)
+    except Exception:
+        _release_segments(shards)
+        raise
+
+    if compact:
+        df_clean = compact_schema(df_clean)
+    return df_clean
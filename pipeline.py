@@ -0,0 +1,489 @@
+"""
+Pipeline único de la ETL como grafo de etapas (DAG) con caché de resultados.
+
+Las etapas (extract, transform, load, stats, un gráfico por etapa, mapas...)
+declaran de qué etapas dependen. Cada resultado se guarda en .pipeline_cache/
+junto con su huella (fingerprint): el hash de los parámetros de la etapa, del
+código de sus funciones y de las huellas de sus dependencias. Si la huella
+no cambia y los ficheros de salida siguen siendo los que escribió (misma
+fecha de modificación y tamaño, también si otro script como ETL_main_v1.py
+los ha sobrescrito), la etapa no se vuelve a ejecutar; solo se lee su resultado del disco si alguna etapa posterior lo
+necesita. Así, cambiar un gráfico solo vuelve a dibujar ese gráfico, sin
+volver a descargar ni transformar los usuarios.
+
+Uso:
+    python pipeline.py                                  # ejecutar lo que haya cambiado
+    python pipeline.py --users 1000 --output-dir resultados_etl
+    python pipeline.py --targets plot:distribucion_edad # solo ese gráfico (y lo que necesite)
+    python pipeline.py --force extract                  # volver a descargar
+    python pipeline.py --list                           # etapas y estado de la caché
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import secrets
+import sys
+import tempfile
+
+from metrics import StageMetrics
+
+CACHE_DIR = ".pipeline_cache"
+MANIFEST_NAME = "manifest.json"
+
+
+def code_hash(*functions):
+    """
+    Hash del código fuente de las funciones (si cambia el código, cambia la huella).
+    """
+    h = hashlib.sha256()
+    for fn in functions:
+        try:
+            source = inspect.getsource(fn)
+        except (OSError, TypeError):
+            source = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+        h.update(source.encode("utf-8"))
+    return h.hexdigest()
+
+
+class Stage:
+    """
+    Etapa del pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Nombre único (e.g., 'transform', 'plot:distribucion_edad').
+    fn : callable
+        fn(*resultados_de_deps, **params) -> resultado de la etapa.
+    deps : tuple
+        Nombres de las etapas cuyos resultados recibe fn, en orden.
+    params : dict
+        Parámetros de fn; forman parte de la huella.
+    outputs : tuple
+        Ficheros que genera la etapa; si falta alguno o ha cambiado desde
+        que la etapa lo escribió (fecha o tamaño) se vuelve a ejecutar.
+    code : tuple
+        Funciones adicionales cuyo código forma parte de la huella (por
+        defecto solo fn), e.g., la función concreta de un gráfico.
+    """
+
+    def __init__(self, name, fn, deps=(), params=None, outputs=(), code=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.params = dict(params or {})
+        self.outputs = tuple(outputs)
+        self.code = (fn,) + tuple(code)
+
+    def fingerprint(self, dep_fingerprints):
+        payload = {
+            "stage": self.name,
+            "code": code_hash(*self.code),
+            "params": self.params,
+            "deps": [dep_fingerprints[d] for d in self.deps],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def output_signature(path):
+    """
+    [mtime_ns, bytes] de un fichero (de todo su contenido si es una carpeta),
+    o None si no existe. Si otro script reescribe el fichero la firma cambia.
+    """
+    if os.path.isdir(path):
+        mtime, size = os.stat(path).st_mtime_ns, 0
+        for root, _, files in os.walk(path):
+            for filename in files:
+                stat = os.stat(os.path.join(root, filename))
+                mtime, size = max(mtime, stat.st_mtime_ns), size + stat.st_size
+        return [mtime, size]
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def output_signatures(paths):
+    return {path: output_signature(path) for path in paths}
+
+
+class Pipeline:
+    """
+    Grafo de etapas con caché en disco de los resultados por huella.
+    """
+
+    def __init__(self, stages, cache_dir=CACHE_DIR):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa repetida: {stage.name}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Ciclo en el pipeline: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Dependencia desconocida: {name} (en {path[-1]})")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def _required(self, targets):
+        """
+        Etapas pedidas y todas sus dependencias, en orden topológico.
+        """
+        if not targets:
+            return list(self.order)
+        needed, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Etapa desconocida: {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.order if name in needed]
+
+    # --- Caché en disco ---
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        self._atomic_write(self._manifest_path(), json.dumps(manifest, indent=4).encode("utf-8"))
+
+    def _atomic_write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _value_path(self, name, fingerprint):
+        return os.path.join(self.cache_dir, name.replace(":", "_"), f"{fingerprint}.pkl")
+
+    def _store(self, name, fingerprint, value):
+        path = self._value_path(name, fingerprint)
+        self._atomic_write(path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        # Solo se conserva el último resultado de cada etapa
+        for old in os.listdir(os.path.dirname(path)):
+            if old != os.path.basename(path):
+                os.remove(os.path.join(os.path.dirname(path), old))
+
+    def _load(self, name, fingerprint):
+        with open(self._value_path(name, fingerprint), "rb") as f:
+            return pickle.load(f)
+
+    def _is_fresh(self, stage, fingerprint, manifest):
+        entry = manifest.get(stage.name)
+        return (entry is not None
+                and entry["fingerprint"] == fingerprint
+                and entry.get("outputs") == output_signatures(stage.outputs)
+                and os.path.exists(self._value_path(stage.name, fingerprint)))
+
+    # --- Ejecución ---
+
+    def fingerprints(self, names=None):
+        fingerprints = {}
+        for name in self.order:
+            fingerprints[name] = self.stages[name].fingerprint(fingerprints)
+        return fingerprints if names is None else {n: fingerprints[n] for n in names}
+
+    def status(self):
+        """
+        {etapa: 'al día' | 'pendiente'} según la caché actual.
+        """
+        manifest = self._load_manifest()
+        fingerprints = self.fingerprints()
+        return {name: "al día" if self._is_fresh(self.stages[name], fingerprints[name], manifest) else "pendiente"
+                for name in self.order}
+
+    def run(self, targets=None, force=(), metrics=None):
+        """
+        Ejecutar las etapas necesarias para `targets` (todas por defecto).
+        Las etapas de `force` se ejecutan aunque su huella no haya cambiado.
+        Devuelve {etapa: 'ejecutada' | 'caché'}.
+        """
+        required = self._required(targets)
+        fingerprints = self.fingerprints()
+        manifest = self._load_manifest()
+        values, result = {}, {}
+
+        def value(name):
+            if name not in values:
+                values[name] = self._load(name, fingerprints[name])
+            return values[name]
+
+        for name in required:
+            stage = self.stages[name]
+            fingerprint = fingerprints[name]
+            if name not in force and self._is_fresh(stage, fingerprint, manifest):
+                print(f"[pipeline] {name}: sin cambios, se omite")
+                result[name] = "caché"
+                continue
+
+            print(f"[pipeline] {name}: ejecutando...")
+            args = [value(dep) for dep in stage.deps]
+            if metrics is not None:
+                with metrics.stage(name) as m:
+                    values[name] = stage.fn(*args, **stage.params)
+                    if hasattr(values[name], "__len__") and not isinstance(values[name], (str, dict)):
+                        m["rows"] = len(values[name])
+            else:
+                values[name] = stage.fn(*args, **stage.params)
+
+            self._store(name, fingerprint, values[name])
+            manifest[name] = {"fingerprint": fingerprint, "outputs": output_signatures(stage.outputs)}
+            self._save_manifest(manifest)
+            result[name] = "ejecutada"
+        return result
+
+
+# --- Etapas de la ETL de usuarios ---
+
+def extract_users(url, results, seed, page_size, run=None, landing_dir=None):
+    # run: identificador de la ejecución sin seed (solo para la huella)
+    from Functions_v1 import api_etl
+    from http_cache import ResponseCache
+    from landing import LandingZone
+    from rate_limit import AdaptiveScheduler
+
+    cache = ResponseCache(".cache_api", ttl=7 * 24 * 3600, max_bytes=512 * 1024 * 1024)
+    # Con landing_dir las páginas crudas quedan en la zona de aterrizaje (ver landing.py)
+    landing = None
+    if landing_dir:
+        landing = LandingZone(landing_dir).new_run("pipeline", url=url, seed=seed, results=results)
+    return api_etl(url, results=results, seed=seed, page_size=page_size, cache=cache,
+                   scheduler=AdaptiveScheduler(rate=5, max_concurrency=8), landing=landing)
+
+
+def transform_users(data, compact=False, age_bins=None, age_labels=None):
+    from Functions_v1 import transform, memory_report
+    rangos = {"age_bins": age_bins, "age_labels": age_labels} if age_bins is not None else {}
+    df_clean = transform(data, compact=compact, **rangos)
+    print(f"Memoria de df_clean: {memory_report(df_clean)['bytes_per_row']} bytes por fila")
+    return df_clean
+
+
+def load_users(df_clean, db_name, table_name):
+    from Functions_v1 import load_sqlite3_db
+    load_sqlite3_db(df_clean, db_name, table_name, "replace")
+    return db_name
+
+
+def user_stats(df_clean):
+    from accumulators import UserStats
+    return UserStats().update_df(df_clean)
+
+
+def chart_inputs(stats):
+    return stats.to_plot_inputs()
+
+
+def render_chart(inputs, chart, output_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    from plots import PLOTS
+
+    os.makedirs(output_dir, exist_ok=True)
+    plot, keys = PLOTS[chart]
+    return plot({key: inputs[key] for key in keys}, output_dir)
+
+
+def statistics_csv(inputs, output_dir):
+    from plots import write_statistics
+    os.makedirs(output_dir, exist_ok=True)
+    write_statistics(inputs, output_dir)
+    return os.path.join(output_dir, "statistics.csv")
+
+
+def raw_users_csv(df_clean, output_dir):
+    # RangoEdad y el resto de columnas derivadas ya vienen de transform
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "raw_users.csv")
+    df_clean.to_csv(path, index=False, encoding="utf-8")
+    print(f"Datos crudos de usuarios guardados en: {path}")
+    return path
+
+
+def parquet_dataset(df_clean, output_dir):
+    from Functions_v1 import write_parquet
+    os.makedirs(output_dir, exist_ok=True)
+    return write_parquet(df_clean, output_dir)
+
+
+def heatmap_html(stats, output_dir):
+    from plots import write_heatmap
+    os.makedirs(output_dir, exist_ok=True)
+    return write_heatmap(stats.geo, output_dir)
+
+
+def choropleth_html(stats, output_dir, zoom, geo_bundle):
+    import folium
+    from geo import build_geo_bundle, choropleth_data, geo_bundle_available
+
+    if not geo_bundle_available():
+        try:
+            build_geo_bundle()
+        except Exception as e:
+            print(f"No hay geometría de países en geodata/ ({e}). Mapa no generado.")
+            return None
+
+    world, df = choropleth_data(stats.pais.counts, zoom=zoom)
+    m = folium.Map(location=[20, 0], zoom_start=zoom, tiles="OpenStreetMap")
+    folium.Choropleth(
+        geo_data=world,
+        data=df,
+        columns=["iso3", "count"],
+        key_on="feature.id",
+        fill_color="YlOrRd",
+        nan_fill_color="#eeeeee",
+        legend_name="Usuarios por país",
+    ).add_to(m)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "choropleth_usuarios.html")
+    m.save(path)
+    print(f"Mapa por países generado en HTML: {path}")
+    return path
+
+
+def marina_json(data, output_dir):
+    from marina import calcular_estadisticas
+
+    estadisticas, _, _, _ = calcular_estadisticas(data["results"])
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "estadisticas.json")
+    with open(path, "w") as f:
+        json.dump(estadisticas, f, indent=4)
+    return path
+
+
+def build_pipeline(url="https://randomuser.me/api", users=200, seed="1234", page_size=None,
+                   output_dir="Resultados", db_name="usuarios.db", table_name="usuarios",
+                   maps=True, parquet=True, compact=False, cache_dir=CACHE_DIR, landing_dir=None):
+    """
+    Pipeline completo de la ETL de usuarios:
+
+        extract -> transform -> load
+                             -> raw_csv, parquet
+                             -> stats -> plot_inputs -> plot:<gráfico>..., statistics_csv
+                                      -> heatmap, choropleth
+                -> marina_stats
+    """
+    from accumulators import RANGO_BINS, RANGO_LABELS
+    from Functions_v1 import transform, compact_schema, derive_features
+    from extractor import compile_extractor
+    from geo import geo_bundle_available
+    import plots
+
+    def out(filename):
+        return os.path.join(output_dir, filename)
+
+    extract_params = {"url": url, "results": users, "seed": seed, "page_size": page_size}
+    if seed is None:
+        # Sin seed cada ejecución descarga usuarios nuevos: la huella no se repite
+        extract_params["run"] = secrets.token_hex(8)
+    if landing_dir:
+        extract_params["landing_dir"] = landing_dir
+
+    stages = [
+        Stage("extract", extract_users, params=extract_params),
+        Stage("transform", transform_users, deps=("extract",),
+              params={"compact": compact, "age_bins": RANGO_BINS, "age_labels": RANGO_LABELS},
+              code=(transform, derive_features, compact_schema, compile_extractor)),
+        Stage("load", load_users, deps=("transform",), params={"db_name": db_name, "table_name": table_name},
+              outputs=(db_name,)),
+        Stage("stats", user_stats, deps=("transform",)),
+        Stage("plot_inputs", chart_inputs, deps=("stats",)),
+        Stage("statistics_csv", statistics_csv, deps=("plot_inputs",), params={"output_dir": output_dir},
+              outputs=(out("statistics.csv"),), code=(plots.write_statistics,)),
+        Stage("raw_csv", raw_users_csv, deps=("transform",), params={"output_dir": output_dir},
+              outputs=(out("raw_users.csv"),)),
+        Stage("marina_stats", marina_json, deps=("extract",), params={"output_dir": output_dir},
+              outputs=(out("estadisticas.json"),)),
+    ]
+
+    # Un gráfico por etapa: cambiar uno solo vuelve a dibujar ese
+    for chart, (plot, _) in plots.PLOTS.items():
+        stages.append(Stage(f"plot:{chart}", render_chart, deps=("plot_inputs",),
+                            params={"chart": chart, "output_dir": output_dir},
+                            outputs=(out(f"{chart}.png"),), code=(plot,)))
+    if parquet:
+        stages.append(Stage("parquet", parquet_dataset, deps=("transform",), params={"output_dir": output_dir},
+                            outputs=(out("usuarios_parquet"),)))
+    if maps:
+        stages.append(Stage("heatmap", heatmap_html, deps=("stats",), params={"output_dir": output_dir},
+                            outputs=(out("heatmap_usuarios.html"),), code=(plots.write_heatmap,)))
+        # Sin geodata/ el mapa no se genera; se vuelve a intentar cuando exista
+        stages.append(Stage("choropleth", choropleth_html, deps=("stats",),
+                            params={"output_dir": output_dir, "zoom": 2, "geo_bundle": geo_bundle_available()},
+                            outputs=(out("choropleth_usuarios.html"),)))
+    return Pipeline(stages, cache_dir=cache_dir)
+
+
+def run_pipeline(targets=None, force=(), metrics_name="pipeline", **options):
+    """
+    Construir y ejecutar el pipeline; guarda metrics.json de las etapas ejecutadas.
+    """
+    pipeline = build_pipeline(**options)
+    metrics = StageMetrics(metrics_name)
+    result = pipeline.run(targets, force, metrics)
+    if metrics.stages:
+        metrics.write_json(options.get("output_dir", "Resultados"))
+    ran = sum(1 for status in result.values() if status == "ejecutada")
+    print(f"✅ Pipeline completado: {ran} etapas ejecutadas, {len(result) - ran} sin cambios.")
+    return result
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline de la ETL de usuarios (DAG con caché por etapa)")
+    parser.add_argument("--users", type=int, default=200, help="Número de usuarios a extraer")
+    parser.add_argument("--seed", default="1234", help="Seed de la API (mismo seed = mismos usuarios)")
+    parser.add_argument("--page-size", type=int, help="Usuarios por página (extracción paginada)")
+    parser.add_argument("--output-dir", default="Resultados", help="Carpeta de resultados")
+    parser.add_argument("--db", default="usuarios.db", help="Base de datos SQLite")
+    parser.add_argument("--no-maps", action="store_true", help="No generar los mapas HTML")
+    parser.add_argument("--compact", action="store_true", help="Esquema compacto de df_clean (menos memoria)")
+    parser.add_argument("--landing-dir", help="Guardar las páginas crudas en esta zona de aterrizaje")
+    parser.add_argument("--targets", nargs="+", help="Etapas a generar (con sus dependencias)")
+    parser.add_argument("--force", nargs="+", default=(), help="Etapas a ejecutar aunque no hayan cambiado")
+    parser.add_argument("--list", action="store_true", help="Mostrar las etapas y su estado")
+    args = parser.parse_args()
+
+    options = dict(users=args.users, seed=args.seed, page_size=args.page_size, output_dir=args.output_dir,
+                   db_name=args.db, maps=not args.no_maps, compact=args.compact, landing_dir=args.landing_dir)
+    if args.list:
+        for name, state in build_pipeline(**options).status().items():
+            print(f"{name:<32} {state}")
+        sys.exit(0)
+    run_pipeline(args.targets, set(args.force), **options)
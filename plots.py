@@ -0,0 +1,262 @@
+"""
+Gráficos, estadísticas y mapas de la ETL (etapa de visualización).
+
+Separado de Functions_v1 para que matplotlib (y folium, que solo se importa
+al generar el mapa de calor) no se carguen en las ejecuciones que solo
+extraen y cargan los datos. Functions_v1 sigue exponiendo estas funciones
+(make_plots, render_plots...) y las importa solo cuando se usan.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from accumulators import UserStats, rango_edad
+from Functions_v1 import write_parquet
+
+def plot_inputs(df_clean):
+    """
+    Calcular las estadísticas y las series de entrada de todos los gráficos.
+
+    Devuelve un diccionario con: n_users, gender_counts, average_age,
+    avg_age_by_gender, age_hist (counts, edges), country_counts,
+    bivar (pares Edad/Registered distintos con su frecuencia) y rango_counts.
+    Se calcula con los acumuladores de accumulators.UserStats, que también
+    se pueden actualizar bloque a bloque (ver make_plots(stats=...)). El
+    mismo formato lo genera sql_stats.compute_statistics_sql desde SQLite.
+    """
+    return UserStats().update_df(df_clean).to_plot_inputs()
+
+def plot_gender(inputs, output_dir):
+    # Gráfico 1: Distribución de Género (Barra)
+    plt.figure(figsize=(8, 5))
+    inputs['gender_counts'].plot(kind='bar', color=['pink', 'skyblue'])
+    plt.title('Distribución por Género (500 Usuarios)')
+    plt.xlabel('Género')
+    plt.ylabel('Cantidad')
+    plt.xticks(rotation=0)
+    plot_path_gender = os.path.join(output_dir, 'distribucion_genero.png')
+    plt.savefig(plot_path_gender)
+    plt.close()
+    print(f"Gráfico de género guardado en: {plot_path_gender}")
+    return plot_path_gender
+
+def plot_age(inputs, output_dir):
+    # Gráfico 1: Distribución de Edades (Histograma)
+    average_age = inputs['average_age']
+    counts, edges = inputs['age_hist']
+    plt.figure(figsize=(10, 6))
+    plt.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', color='lightgreen')
+    plt.title('Distribución de Edades (500 Usuarios)')
+    plt.xlabel('Edad')
+    plt.ylabel('Frecuencia')
+    # Añadimos una línea vertical para la edad media
+    plt.axvline(average_age, color='red', linestyle='dashed', linewidth=2, label=f'Edad Media: {average_age:.2f}')
+    plt.legend()
+    plot_path_age = os.path.join(output_dir, 'distribucion_edad.png')
+    plt.savefig(plot_path_age)
+    plt.close()
+    print(f"Gráfico de edad guardado en: {plot_path_age}")
+    return plot_path_age
+
+def plot_country(inputs, output_dir):
+    # Gráfico 2: Histograma de Nacionalidad
+    plt.figure(figsize=(12, 6))
+    inputs['country_counts'].plot(kind='bar', color='lightcoral')
+    plt.title('Distribución de Usuarios por Nacionalidad')
+    plt.xlabel('País')
+    plt.ylabel('Cantidad de Usuarios')
+    plt.xticks(rotation=90)
+    plt.tight_layout()
+
+    plot_path_country = os.path.join(output_dir, 'histograma_nacionalidad.png')
+    plt.savefig(plot_path_country)
+    plt.close()
+    print(f"Histograma de nacionalidad guardado en: {plot_path_country}")
+    return plot_path_country
+
+def plot_bivar(inputs, output_dir):
+    # Gráfico 3: Gráfico Bivariante: Edad vs Años registrados
+    # Cada punto es un par Edad/Años registrado distinto; su área es proporcional
+    # al número de usuarios (n), con tamaño 50 para la frecuencia media
+    bivar = inputs['bivar']
+    sizes = 50 * bivar['n'] / bivar['n'].mean() if len(bivar) else 50
+    plt.figure(figsize=(10, 6))
+    plt.scatter(bivar['Edad'], bivar['Registered'], alpha=0.6, color='purple', edgecolors='w', s=sizes)
+    plt.title('Edad del Usuario vs Años Registrado')
+    plt.xlabel('Edad del Usuario')
+    plt.ylabel('Años Registrado')
+    plt.grid(True)
+    plt.tight_layout()
+
+    plot_path_bivar = os.path.join(output_dir, 'bivar_age_registered.png')
+    plt.savefig(plot_path_bivar)
+    plt.close()
+    print(f"Gráfico bivariante guardado en: {plot_path_bivar}")
+    return plot_path_bivar
+
+def plot_rango(inputs, output_dir):
+    # Grafico 4: Histograma de usuarios por rango de edad
+    plt.figure(figsize=(8, 5))
+    inputs['rango_counts'].plot(kind='bar', color='orange', edgecolor='black')
+    plt.title('Número de Usuarios por Rango de Edad')
+    plt.xlabel('Rango de Edad')
+    plt.ylabel('Número de Usuarios')
+    plt.xticks(rotation=0)
+    plt.tight_layout()
+
+    plot_path_rango = os.path.join(output_dir, 'histograma_rango_edad.png')
+    plt.savefig(plot_path_rango)
+    plt.close()
+    print(f"Histograma de rango de edades guardado en: {plot_path_rango}")
+    return plot_path_rango
+
+# Gráficos -> (función, claves de plot_inputs que necesita)
+PLOTS = {
+    'distribucion_genero': (plot_gender, ('gender_counts',)),
+    'distribucion_edad': (plot_age, ('age_hist', 'average_age')),
+    'histograma_nacionalidad': (plot_country, ('country_counts',)),
+    'bivar_age_registered': (plot_bivar, ('bivar',)),
+    'histograma_rango_edad': (plot_rango, ('rango_counts',)),
+}
+
+def _init_plot_worker():
+    """
+    Inicializar cada proceso del pool con el backend Agg (sin ventanas).
+    """
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+def render_plots(inputs, output_dir, parallel=False, max_workers=None):
+    """
+    Generar los gráficos en formato png a partir de las series de plot_inputs.
+
+    Con parallel=True cada gráfico se dibuja en un proceso distinto (backend
+    Agg) y los png se escriben en paralelo. A cada proceso solo se le envían
+    las series que necesita su gráfico.
+    """
+    # 2c. Generar Gráficos
+    print("Generando gráficos...")
+
+    if not parallel:
+        for plot, _ in PLOTS.values():
+            plot(inputs, output_dir)
+        return
+
+    max_workers = min(len(PLOTS), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_plot_worker) as executor:
+        futures = [
+            executor.submit(plot, {key: inputs[key] for key in keys}, output_dir)
+            for plot, keys in PLOTS.values()
+        ]
+        for future in futures:
+            future.result()   # Propagar cualquier error de los procesos
+
+def write_statistics(inputs, output_dir):
+    """
+    Guardar las estadísticas de plot_inputs en statistics.csv.
+    """
+    average_age = inputs['average_age']
+    avg_age_by_gender = inputs['avg_age_by_gender']
+    gender_counts = inputs['gender_counts']
+
+    # 3b. Cargar estadísticas a CSV
+    stats_data = {
+        'Metrica': [
+            'Edad Media Total', 
+            'Edad Media (male)', 
+            'Edad Media (female)', 
+            'Total (male)', 
+            'Total (female)'
+        ],
+        'Valor': [
+            f"{average_age:.2f}",
+            f"{avg_age_by_gender.get('male', 0):.2f}",
+            f"{avg_age_by_gender.get('female', 0):.2f}",
+            gender_counts.get('male', 0),
+            gender_counts.get('female', 0)
+        ]
+    }
+    stats_df = pd.DataFrame(stats_data)
+    stats_path = os.path.join(output_dir, 'statistics.csv')
+    stats_df.to_csv(stats_path, index=False, encoding='utf-8')
+    print(f"Estadísticas guardadas en: {stats_path}")
+
+def write_heatmap(grid, output_dir, filename="heatmap_usuarios.html", radius=12, blur=10, min_opacity=0.3):
+    """
+    Mapa de calor de usuarios a partir de una rejilla (accumulators.GeoGrid).
+
+    Solo se escribe un punto por celda con usuarios, con peso relativo a la
+    celda más poblada, así que el tamaño del HTML depende de la resolución
+    de la rejilla y no del número de usuarios.
+    """
+    cells = grid.to_frame()
+    if cells.empty:
+        print("Sin coordenadas válidas, no se genera el mapa de calor.")
+        return None
+
+    weights = cells["weight"].to_numpy() / cells["weight"].max()
+    puntos = np.column_stack([cells["latitude"], cells["longitude"], weights]).round(4).tolist()
+
+    import folium
+    from folium.plugins import HeatMap
+
+    m = folium.Map(location=list(grid.center()), zoom_start=2, tiles="OpenStreetMap")
+    HeatMap(puntos, radius=radius, blur=blur, min_opacity=min_opacity).add_to(m)
+    path = os.path.join(output_dir, filename)
+    m.save(path)
+    print(f"Mapa de calor guardado en: {path} ({len(cells)} celdas de {grid.resolution}°)")
+    return path
+
+def make_plots(df_clean, output_dir, parallel=False, parquet=True, stats=None, heatmap=True, inputs=None):
+    """
+    Función para calcular estadísticas y generar plots en formato png.
+    Con parallel=True los gráficos se generan en un pool de procesos.
+    Con parquet=True los datos limpios se guardan también en Parquet.
+    Con heatmap=True se genera heatmap_usuarios.html con las coordenadas.
+    Si se pasa stats (accumulators.UserStats ya actualizado, e.g., durante la
+    extracción por streaming) no se vuelven a recorrer los datos.
+    Si se pasa inputs (e.g., stats_table.read_statistics de usuarios.db tras
+    una carga 'append') los gráficos y statistics.csv usan esas estadísticas.
+    """
+    # 1. # Creamos un directorio para guardar los resultados si no existe
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 2b. Calcular Estadísticas
+    print("Calculando estadísticas...")
+    if stats is None and (inputs is None or heatmap):
+        stats = UserStats().update_df(df_clean)
+    if inputs is None:
+        inputs = stats.to_plot_inputs()
+
+    print(f"Edad media total: {inputs['average_age']:.2f}")
+    print(f"Conteo por género:\n{inputs['gender_counts']}")
+
+    render_plots(inputs, output_dir, parallel=parallel)
+
+    if heatmap:
+        write_heatmap(stats.geo, output_dir)
+
+    # --- Columna de rango de edades (ya la crea transform) ---
+    if 'RangoEdad' not in df_clean.columns:
+        df_clean['RangoEdad'] = rango_edad(df_clean['Edad'])
+
+    # --- 3. CARGA (Load) ---
+    print("3. Cargando datos y estadísticas en ficheros...")
+    
+    # 3a. Cargar datos crudos de usuarios a CSV
+    raw_data_path = os.path.join(output_dir, 'raw_users.csv')
+    df_clean.to_csv(raw_data_path, index=False, encoding='utf-8')
+    print(f"Datos crudos de usuarios guardados en: {raw_data_path}")
+
+    # 3a'. Mismos datos en formato columnar (Parquet particionado por país)
+    if parquet:
+        write_parquet(df_clean, output_dir)
+
+    # 3b. Cargar estadísticas a CSV
+    write_statistics(inputs, output_dir)
+    
+    return
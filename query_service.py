@@ -0,0 +1,323 @@
+"""
+Servicio local de consultas (solo lectura) sobre usuarios.db.
+
+Los paneles piden agregados en vivo (usuarios por país, distribución de
+edades filtrada por género...) sin volver a ejecutar el ETL. El servidor
+usa http.server de la biblioteca estándar y:
+
+    - un pool de conexiones SQLite en modo solo lectura (mode=ro), así que
+      nunca bloquea ni modifica una carga en curso (WAL);
+    - consultas agregadas fijas y parametrizadas (QUERIES): el SQL no cambia
+      entre peticiones y cada conexión reutiliza la sentencia preparada;
+    - una caché LRU con la respuesta JSON ya serializada. Cada entrada lleva
+      la versión de la tabla (load_version de stats_table más el último
+      rowid): cuando load_sqlite3_db confirma una carga la versión cambia y
+      la caché se vacía en la siguiente petición.
+
+Una consulta repetida solo lee la versión (dos búsquedas por clave) y
+devuelve los bytes guardados.
+
+Uso:
+    python query_service.py --db usuarios.db --port 8050
+    # en otra terminal
+    curl "http://127.0.0.1:8050/query/paises"
+    curl "http://127.0.0.1:8050/query/edades?genero=female"
+    curl "http://127.0.0.1:8050/queries"
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import stats_table
+from stats_table import rango_case
+
+# Filtros comunes a todas las consultas (None = sin filtrar). El SQL es
+# siempre el mismo, solo cambian los parámetros
+FILTERS = {
+    "genero": str,
+    "pais": str,
+    "nacionalidad": str,
+    "edad_min": int,
+    "edad_max": int,
+}
+
+WHERE = """
+    (:genero IS NULL OR Genero = :genero)
+    AND (:pais IS NULL OR Pais = :pais)
+    AND (:nacionalidad IS NULL OR Nacionalidad = :nacionalidad)
+    AND (:edad_min IS NULL OR Edad >= :edad_min)
+    AND (:edad_max IS NULL OR Edad <= :edad_max)"""
+
+# Consultas agregadas disponibles: nombre -> SQL ({table} = tabla de usuarios)
+QUERIES = {
+    "resumen": f"""
+        SELECT COUNT(*) AS usuarios, AVG(Edad) AS edad_media, MIN(Edad) AS edad_min, MAX(Edad) AS edad_max
+        FROM {{table}} WHERE {WHERE}""",
+    "paises": f"""
+        SELECT Pais, COUNT(*) AS n, AVG(Edad) AS edad_media FROM {{table}}
+        WHERE Pais IS NOT NULL AND {WHERE} GROUP BY Pais ORDER BY n DESC, Pais""",
+    "nacionalidades": f"""
+        SELECT Nacionalidad, COUNT(*) AS n FROM {{table}}
+        WHERE Nacionalidad IS NOT NULL AND {WHERE} GROUP BY Nacionalidad ORDER BY n DESC, Nacionalidad""",
+    "generos": f"""
+        SELECT Genero, COUNT(*) AS n, AVG(Edad) AS edad_media FROM {{table}}
+        WHERE Genero IS NOT NULL AND {WHERE} GROUP BY Genero ORDER BY n DESC, Genero""",
+    "edades": f"""
+        SELECT Edad, COUNT(*) AS n FROM {{table}}
+        WHERE Edad IS NOT NULL AND {WHERE} GROUP BY Edad ORDER BY Edad""",
+    "rangos": f"""
+        SELECT {rango_case()} AS rango, COUNT(*) AS n FROM {{table}}
+        WHERE {WHERE} GROUP BY rango HAVING rango IS NOT NULL ORDER BY MIN(Edad)""",
+}
+
+
+class QueryError(ValueError):
+    """
+    Petición no válida (consulta desconocida o parámetro incorrecto).
+    """
+
+
+def parse_params(query):
+    """
+    Convertir los parámetros de la URL (parse_qs) en el diccionario de
+    filtros de las consultas. Lanza QueryError si alguno no es válido.
+    """
+    unknown = sorted(set(query) - set(FILTERS))
+    if unknown:
+        raise QueryError(f"Parámetros no válidos: {', '.join(unknown)} (válidos: {', '.join(FILTERS)})")
+    params = dict.fromkeys(FILTERS)
+    for name, values in query.items():
+        try:
+            params[name] = FILTERS[name](values[-1])
+        except ValueError:
+            raise QueryError(f"Valor no válido para {name}: {values[-1]!r}")
+    return params
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite de solo lectura compartidas entre los hilos
+    del servidor (cada conexión la usa un solo hilo a la vez).
+    """
+
+    def __init__(self, db_name, size=4):
+        if not os.path.exists(db_name):
+            raise FileNotFoundError(f"No existe la base de datos: {db_name}")
+        self.db_name = db_name
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True, isolation_level=None,
+                                   check_same_thread=False, cached_statements=4 * len(QUERIES))
+            conn.row_factory = sqlite3.Row
+            self.connections.put(conn)
+        self.size = size
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        for _ in range(self.size):
+            self.connections.get().close()
+
+
+class ResultCache:
+    """
+    Caché LRU de respuestas serializadas, válida para una versión de la tabla.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            if version != self.version:
+                # Una carga nueva invalida todos los resultados
+                self.entries.clear()
+                self.version = version
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, version, body):
+        with self.lock:
+            if version != self.version:
+                return
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class QueryService:
+    """
+    Ejecuta las consultas de QUERIES sobre la tabla de usuarios con caché.
+
+    Parameters
+    ----------
+    db_name : str
+        Archivo SQLite (el que escribe load_sqlite3_db).
+    table_name : str
+        Tabla de usuarios.
+    pool_size : int
+        Conexiones de solo lectura del pool.
+    cache_size : int
+        Respuestas que guarda la caché LRU.
+    """
+
+    def __init__(self, db_name="usuarios.db", table_name="usuarios", pool_size=4, cache_size=1024):
+        self.table_name = table_name
+        self.pool = ConnectionPool(db_name, pool_size)
+        self.cache = ResultCache(cache_size)
+        self.sql = {name: sql.format(table=f'"{table_name}"') for name, sql in QUERIES.items()}
+
+    def _version(self, conn):
+        """
+        (versión de carga, último rowid) de la tabla; None si no existe.
+        """
+        try:
+            max_rowid = conn.execute(f'SELECT MAX(rowid) FROM "{self.table_name}"').fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            return None
+        try:
+            return stats_table.load_version(conn.cursor(), self.table_name), max_rowid
+        except sqlite3.OperationalError:
+            # Base de datos cargada sin tabla de estadísticas
+            return 0, max_rowid
+
+    def query(self, name, params):
+        """
+        Respuesta JSON (bytes) de la consulta `name` con los filtros `params`
+        y si viene de la caché. Lanza QueryError o LookupError.
+        """
+        if name not in self.sql:
+            raise QueryError(f"Consulta desconocida: {name!r} (disponibles: {', '.join(self.sql)})")
+        key = (name, tuple(params[f] for f in FILTERS))
+
+        with self.pool.connection() as conn:
+            version = self._version(conn)
+            if version is None:
+                raise LookupError(f"No existe la tabla {self.table_name!r}")
+            body = self.cache.get(key, version)
+            if body is not None:
+                return body, True
+
+            # Versión y resultado leídos en la misma transacción de lectura
+            conn.execute("BEGIN")
+            try:
+                version = self._version(conn)
+                rows = [dict(row) for row in conn.execute(self.sql[name], params)]
+            finally:
+                conn.execute("COMMIT")
+
+        body = json.dumps({"query": name, "params": {k: v for k, v in params.items() if v is not None},
+                           "version": list(version), "rows": rows}, ensure_ascii=False).encode("utf-8")
+        self.cache.put(key, version, body)
+        return body, False
+
+    def close(self):
+        self.pool.close()
+
+
+def make_server(db_name="usuarios.db", table_name="usuarios", host="127.0.0.1", port=8050,
+                pool_size=4, cache_size=1024):
+    """
+    Crear el servidor (sin arrancarlo). En server.service está el
+    QueryService, con las estadísticas de la caché en service.cache.
+    """
+    service = QueryService(db_name, table_name, pool_size, cache_size)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeceras y cuerpo van en escrituras separadas: sin TCP_NODELAY una
+        # conexión keep-alive espera el ACK retrasado (~40 ms) en cada respuesta
+        disable_nagle_algorithm = True
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/queries":
+                self._send(200, json.dumps({"queries": list(QUERIES), "filters": list(FILTERS)}).encode("utf-8"))
+                return
+            if url.path == "/health":
+                cache = service.cache
+                body = {"status": "ok", "cache_entries": len(cache.entries), "hits": cache.hits, "misses": cache.misses}
+                self._send(200, json.dumps(body).encode("utf-8"))
+                return
+            if not url.path.startswith("/query/"):
+                self._error(404, f"Ruta desconocida: {url.path}")
+                return
+            try:
+                params = parse_params(parse_qs(url.query))
+                body, hit = service.query(url.path[len("/query/"):], params)
+            except QueryError as e:
+                self._error(400, str(e))
+            except LookupError as e:
+                self._error(503, str(e))
+            except sqlite3.Error as e:
+                self._error(500, f"Error de SQLite: {e}")
+            else:
+                self._send(200, body, {"X-Cache": "hit" if hit else "miss"})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de consultas sobre usuarios.db")
+    parser.add_argument("--db", default="usuarios.db", help="Archivo SQLite")
+    parser.add_argument("--table", default="usuarios", help="Tabla de usuarios")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--pool-size", type=int, default=4, help="Conexiones de solo lectura")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Respuestas guardadas en la caché LRU")
+    args = parser.parse_args()
+
+    server = make_server(args.db, args.table, args.host, args.port, args.pool_size, args.cache_size)
+    print(f"Servicio de consultas en http://{args.host}:{args.port}/query/<consulta>")
+    print(f"Consultas: {', '.join(QUERIES)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
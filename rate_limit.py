@@ -0,0 +1,274 @@
+"""
+Control de ritmo de las peticiones a la API (randomuser.me).
+
+Con muchas peticiones la API responde 429 (Too Many Requests) o 503. En
+lugar de fallar, AdaptiveScheduler reparte las peticiones con:
+
+- un token bucket que limita las peticiones por segundo,
+- un límite de peticiones simultáneas,
+- control AIMD de ambos: suben poco a poco mientras las respuestas son
+  correctas y se reducen (ritmo x0.75, concurrencia a la mitad) cuando
+  el servidor limita,
+- la cabecera Retry-After: todas las peticiones esperan lo que indica el
+  servidor antes de volver a enviar.
+
+Así el ritmo se mantiene cerca del límite real del servidor sin que la
+extracción falle.
+
+Uso:
+    scheduler = AdaptiveScheduler(rate=10, max_concurrency=8)
+    data = api_etl(url, results=100000, seed="1234", page_size=5000, scheduler=scheduler)
+    print(scheduler.report())
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+# Códigos HTTP con los que el servidor indica que vamos demasiado rápido
+THROTTLE_STATUSES = (429, 503)
+# Errores temporales del servidor que se reintentan sin reducir el ritmo
+RETRY_STATUSES = (500, 502, 504)
+
+
+def parse_retry_after(value, now=None):
+    """
+    Segundos de espera de una cabecera Retry-After (número de segundos o
+    fecha HTTP). Devuelve None si no se puede interpretar.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class AIMD:
+    """
+    Valor con aumento aditivo y reducción multiplicativa (AIMD).
+
+    Cada éxito suma increase / value, es decir, +increase por cada "ventana"
+    de value éxitos (por segundo si value es un ritmo, por ronda si es un
+    número de peticiones simultáneas). Cada aviso de saturación multiplica
+    por decrease, como mucho una vez por cooldown segundos para que una
+    ráfaga de 429 de peticiones ya enviadas no hunda el valor.
+
+    Hasta el primer aviso (slow start, como en TCP) cada éxito suma
+    increase, así que el valor se duplica por ventana y se llega rápido al
+    límite del servidor.
+    """
+
+    def __init__(self, value, minimum, maximum, increase=1.0, decrease=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = min(max(value, minimum), maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._last_decrease = float("-inf")
+        self.slow_start = True
+        self._lock = threading.Lock()
+
+    def on_success(self):
+        with self._lock:
+            step = self.increase if self.slow_start else self.increase / self.value
+            self.value = min(self.maximum, self.value + step)
+            return self.value
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            self.slow_start = False
+            if now - self._last_decrease >= self.cooldown:
+                self.value = max(self.minimum, self.value * self.decrease)
+                self._last_decrease = now
+            return self.value
+
+
+class TokenBucket:
+    """
+    Limitador de peticiones por segundo (token bucket) seguro entre hilos.
+    El ritmo lo da un AIMD, así que puede cambiar durante la extracción.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate          # AIMD con peticiones/segundo
+        self.burst = burst
+        self.tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _capacity(self):
+        return self.burst if self.burst is not None else max(1.0, self.rate.value)
+
+    def pause(self, seconds):
+        """
+        No entregar ningún token durante `seconds` (Retry-After).
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # Al terminar la pausa los tokens se acumulan desde cero
+            self.tokens = 0.0
+            self._updated = self._paused_until
+
+    def acquire(self):
+        """
+        Bloquear hasta obtener un token.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    rate = self.rate.value
+                    self.tokens = min(self._capacity(), self.tokens + (now - self._updated) * rate)
+                    self._updated = now
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    wait = (1.0 - self.tokens) / rate
+            time.sleep(wait)
+
+
+class ConcurrencyLimiter:
+    """
+    Semáforo cuyo límite lo da un AIMD (peticiones simultáneas).
+    """
+
+    def __init__(self, limit):
+        self.limit = limit        # AIMD con el número de peticiones simultáneas
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit.value):
+                self._cond.wait(timeout=0.1)   # el límite puede subir sin notify
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+        return False
+
+
+class AdaptiveScheduler:
+    """
+    Envía peticiones GET respetando el ritmo y la concurrencia adaptativos,
+    reintentando los 429/503/5xx y los errores de conexión.
+
+    Parameters
+    ----------
+    rate : float
+        Peticiones por segundo iniciales.
+    max_rate : float
+        Ritmo máximo al que puede subir el AIMD.
+    min_rate : float
+        Ritmo mínimo al que puede bajar el AIMD.
+    concurrency : int
+        Peticiones simultáneas iniciales.
+    max_concurrency : int
+        Máximo de peticiones simultáneas (también el tamaño del pool de hilos).
+    max_attempts : int
+        Intentos por petición antes de dar el error por definitivo.
+    backoff : float
+        Espera base entre reintentos sin Retry-After (0.5 -> hasta 0.5s, 1s, 2s...).
+    max_backoff : float
+        Espera máxima entre reintentos (y máximo Retry-After respetado).
+    """
+
+    def __init__(self, rate=5.0, max_rate=50.0, min_rate=0.2, concurrency=2, max_concurrency=8,
+                 max_attempts=8, backoff=0.5, max_backoff=60.0):
+        self.rate = AIMD(rate, min_rate, max_rate, decrease=0.75)
+        self.concurrency = AIMD(concurrency, 1, max_concurrency)
+        self.bucket = TokenBucket(self.rate)
+        self.limiter = ConcurrencyLimiter(self.concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "retries": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt):
+        # Full jitter: espera aleatoria para que los hilos no reintenten a la vez
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _throttled(self, response, attempt):
+        self._count("throttled")
+        self.rate.on_throttle()
+        self.concurrency.on_throttle()
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            # El límite es del servidor: esperan todas las peticiones, no solo esta
+            self.bucket.pause(min(retry_after, self.max_backoff))
+        else:
+            time.sleep(self._backoff(attempt))
+
+    def get(self, session, url, params=None, **kwargs):
+        """
+        session.get(url, params, **kwargs) con control de ritmo y reintentos.
+        Devuelve la respuesta (también los 4xx no reintentables, para que el
+        llamador use raise_for_status) o lanza el último error.
+        """
+        for attempt in range(self.max_attempts):
+            last = attempt == self.max_attempts - 1
+            self.bucket.acquire()
+            try:
+                with self.limiter:
+                    self._count("requests")
+                    response = session.get(url, params=params, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._count("errors")
+                self.concurrency.on_throttle()
+                if last:
+                    raise
+                self._count("retries")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in THROTTLE_STATUSES or response.status_code in RETRY_STATUSES:
+                if last:
+                    return response
+                response.close()
+                self._count("retries")
+                if response.status_code in THROTTLE_STATUSES:
+                    self._throttled(response, attempt)
+                else:
+                    self._count("errors")
+                    time.sleep(self._backoff(attempt))
+                continue
+
+            self._count("ok")
+            self.rate.on_success()
+            self.concurrency.on_success()
+            return response
+
+    def report(self):
+        """
+        Contadores y valores actuales del ritmo y la concurrencia.
+        """
+        with self._lock:
+            report = dict(self.stats)
+        report["rate"] = round(self.rate.value, 3)
+        report["concurrency"] = int(self.concurrency.value)
+        return report
@@ -0,0 +1,169 @@
+"""
+Estadísticas calculadas dentro de SQLite (usuarios.db).
+
+En lugar de cargar todo el DataFrame en memoria para hacer value_counts,
+mean y groupby con pandas, las agregaciones se ejecutan como consultas SQL
+sobre la tabla que ya ha escrito load_sqlite3_db. Solo viajan a Python los
+resultados agregados, por lo que funciona con tablas más grandes que la RAM.
+
+Devuelve el mismo diccionario que Functions_v1.plot_inputs, así que los
+gráficos y statistics.csv se generan con las mismas funciones.
+ETL_main_v1.py --plots-from-db usa make_plots_from_db después de la carga
+en lugar de los gráficos desde df_clean.
+
+Uso:
+    python sql_stats.py   # usuarios.db -> Resultados/
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from accumulators import AGE_HIST_BINS, RANGO_LABELS
+from stats_table import rango_case, read_statistics  # rango_case reexportado
+
+
+def connect_readonly(db_name):
+    """
+    Abrir la base de datos en modo solo lectura.
+    """
+    if not os.path.exists(db_name):
+        raise FileNotFoundError(f"No existe la base de datos: {db_name}")
+    return sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+
+
+def _counts(conn, sql, params=()):
+    """
+    Ejecutar una consulta (clave, n) y devolverla como Series de conteos.
+    """
+    rows = conn.execute(sql, params).fetchall()
+    return pd.Series([n for _, n in rows], index=[key for key, _ in rows], dtype="int64", name="count")
+
+
+def compute_statistics_sql(db_name="usuarios.db", table_name="usuarios"):
+    """
+    Calcular con consultas SQL las estadísticas y series de entrada de los gráficos.
+
+    Parámetros:
+        db_name (str): archivo SQLite (default 'usuarios.db')
+        table_name (str): tabla de usuarios (default 'usuarios')
+    """
+    conn = connect_readonly(db_name)
+    table = f'"{table_name}"'
+    try:
+        n_users, average_age = conn.execute(f"SELECT COUNT(*), AVG(Edad) FROM {table}").fetchone()
+
+        # Conteo por género (mismo orden que value_counts: mayor a menor)
+        gender_counts = _counts(conn, f"""
+            SELECT Genero, COUNT(*) AS n FROM {table}
+            WHERE Genero IS NOT NULL GROUP BY Genero ORDER BY n DESC, Genero""")
+        gender_counts.index.name = "Genero"
+
+        # Edad media por género
+        rows = conn.execute(f"""
+            SELECT Genero, AVG(Edad) FROM {table}
+            WHERE Genero IS NOT NULL GROUP BY Genero ORDER BY Genero""").fetchall()
+        avg_age_by_gender = pd.Series([avg for _, avg in rows], index=[g for g, _ in rows], name="Edad")
+        avg_age_by_gender.index.name = "Genero"
+
+        # Contar usuarios por país
+        country_counts = _counts(conn, f"""
+            SELECT Pais, COUNT(*) AS n FROM {table}
+            WHERE Pais IS NOT NULL GROUP BY Pais ORDER BY n DESC, Pais""")
+        country_counts.index.name = "Pais"
+
+        # Las edades son enteras: con la frecuencia de cada edad el histograma
+        # ponderado es idéntico al de np.histogram sobre todas las filas
+        rows = conn.execute(f"""
+            SELECT Edad, COUNT(*) FROM {table}
+            WHERE Edad IS NOT NULL GROUP BY Edad ORDER BY Edad""").fetchall()
+        edades = np.array([edad for edad, _ in rows], dtype=np.float64)
+        pesos = np.array([n for _, n in rows], dtype=np.int64)
+        age_hist = np.histogram(edades, bins=AGE_HIST_BINS, weights=pesos)
+        age_hist = (age_hist[0].astype(np.int64), age_hist[1])
+
+        # Pares (Edad, Registered) distintos para el gráfico bivariante
+        bivar = pd.read_sql_query(f"""
+            SELECT Edad, Registered, COUNT(*) AS n FROM {table}
+            WHERE Edad IS NOT NULL AND Registered IS NOT NULL
+            GROUP BY Edad, Registered ORDER BY Edad, Registered""", conn)
+
+        # Conteo de usuarios por rango de edad (incluye rangos sin usuarios)
+        rango_counts = _counts(conn, f"""
+            SELECT {rango_case()} AS rango, COUNT(*) FROM {table}
+            GROUP BY rango HAVING rango IS NOT NULL""")
+        rango_counts = rango_counts.reindex(RANGO_LABELS, fill_value=0)
+        rango_counts.index = pd.CategoricalIndex(RANGO_LABELS, categories=RANGO_LABELS, ordered=True, name="Edad")
+    finally:
+        conn.close()
+
+    return {
+        'n_users': n_users,
+        'gender_counts': gender_counts,
+        'average_age': average_age if average_age is not None else float("nan"),
+        'avg_age_by_gender': avg_age_by_gender,
+        'age_hist': age_hist,
+        'country_counts': country_counts,
+        'bivar': bivar,
+        'rango_counts': rango_counts,
+    }
+
+
+def export_table_csv(db_name, table_name, path, chunk_size=100000):
+    """
+    Exportar la tabla de usuarios a CSV por bloques, sin cargarla entera.
+    RangoEdad se guarda en la tabla desde transform; en filas de cargas
+    anteriores sin ella se calcula en la consulta.
+    """
+    conn = connect_readonly(db_name)
+    try:
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+        select = ", ".join(f'"{col}"' for col in columns if col != "RangoEdad")
+        rango = f'COALESCE("RangoEdad", {rango_case()})' if "RangoEdad" in columns else rango_case()
+        query = f'SELECT {select}, {rango} AS RangoEdad FROM "{table_name}"'
+        header = True
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+    finally:
+        conn.close()
+
+
+def make_plots_from_db(db_name="usuarios.db", table_name="usuarios", output_dir="Resultados", parallel=False):
+    """
+    Generar statistics.csv, raw_users.csv y los gráficos directamente desde
+    SQLite, sin repetir la extracción ni la transformación.
+
+    Las estadísticas se leen de la tabla `statistics` que mantiene la carga
+    (stats_table.py); solo si no existe o no está al día se calculan con
+    consultas sobre toda la tabla de usuarios.
+    """
+    # matplotlib solo se carga si se generan gráficos
+    from plots import render_plots, write_statistics
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    inputs = read_statistics(db_name, table_name)
+    if inputs is None:
+        print("Calculando estadísticas en SQLite...")
+        inputs = compute_statistics_sql(db_name, table_name)
+
+    print(f"Edad media total: {inputs['average_age']:.2f}")
+    print(f"Conteo por género:\n{inputs['gender_counts']}")
+
+    render_plots(inputs, output_dir, parallel=parallel)
+
+    raw_data_path = os.path.join(output_dir, 'raw_users.csv')
+    export_table_csv(db_name, table_name, raw_data_path)
+    print(f"Datos crudos de usuarios guardados en: {raw_data_path}")
+
+    write_statistics(inputs, output_dir)
+    return inputs
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    make_plots_from_db(parallel=True)
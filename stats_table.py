@@ -0,0 +1,309 @@
+"""
+Tabla de estadísticas mantenida de forma incremental en usuarios.db.
+
+load_sqlite3_db actualiza la tabla `statistics` dentro de la misma
+transacción que cada carga, con los conteos y las sumas de Edad (n, suma y
+suma de cuadrados) por:
+
+    total            (clave '')
+    genero           Genero
+    pais             Pais
+    rango            rango de edad (RANGO_LABELS)
+    edad             cada edad (buckets del histograma)
+    edad_registered  pares 'Edad|Registered' (gráfico bivariante)
+
+En 'append' solo se suman las filas nuevas y en 'upsert' se restan antes
+los valores anteriores de las filas actualizadas, así que el coste depende
+de la carga y no del tamaño de la tabla. read_statistics devuelve el mismo
+diccionario que plot_inputs leyendo solo esas filas agregadas.
+
+Si la tabla de usuarios se escribe por otro camino (el último rowid no
+coincide con el guardado) las estadísticas se recalculan con una pasada
+completa en la siguiente carga.
+
+Cada carga suma además 1 a la versión de carga de la tabla (load_version),
+que query_service.py usa para invalidar su caché de resultados.
+
+Uso:
+    inputs = read_statistics("usuarios.db")    # None si no está al día
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from accumulators import AGE_HIST_BINS, RANGO_BINS, RANGO_LABELS, rango_column
+
+STATS_TABLE = "statistics"
+# Dimensión especial con el último rowid de la tabla de usuarios
+META_DIMENSION = "_meta"
+# Clave _meta con el número de cargas confirmadas (invalida cachés de consultas)
+LOAD_VERSION_KEY = "load_version"
+
+DIMENSIONS = ("total", "genero", "pais", "rango", "edad", "edad_registered")
+# Columnas necesarias para calcular las estadísticas de una carga
+STATS_COLUMNS = ("Genero", "Pais", "Edad")
+
+
+def rango_case(column="Edad"):
+    """
+    Expresión SQL CASE equivalente a pd.cut(Edad, RANGO_BINS, right=False).
+    """
+    whens = " ".join(
+        f"WHEN {column} >= {low} AND {column} < {high} THEN '{label}'"
+        for low, high, label in zip(RANGO_BINS[:-1], RANGO_BINS[1:], RANGO_LABELS)
+    )
+    return f"CASE {whens} END"
+
+
+def ensure_table(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS "{STATS_TABLE}" (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        key TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        edad_n INTEGER NOT NULL,
+        edad_sum REAL NOT NULL,
+        edad_sumsq REAL NOT NULL,
+        PRIMARY KEY (table_name, dimension, key)
+    ) WITHOUT ROWID;
+    """)
+
+
+def _number_keys(serie):
+    """
+    Claves de texto de una columna numérica ('35', no '35.0'), NaN se mantiene.
+    """
+    values = pd.to_numeric(serie, errors="coerce").astype("float64")
+    keys = pd.Series(np.nan, index=serie.index, dtype=object)
+    valid = values.notna()
+    integral = valid & (values % 1 == 0)
+    keys[integral] = values[integral].astype("int64").astype(str)
+    keys[valid & ~integral] = values[valid & ~integral].astype(str)
+    return keys
+
+
+def statistics_rows(df, sign=1):
+    """
+    Filas (dimension, key, n, edad_n, edad_sum, edad_sumsq) con la
+    contribución de las filas de df; sign=-1 para restarlas.
+    """
+    edad = pd.to_numeric(df["Edad"], errors="coerce").astype("float64")
+    edad_key = _number_keys(df["Edad"])
+    values = pd.DataFrame({
+        "edad_n": edad.notna().astype("int64"),
+        "edad_sum": edad.fillna(0.0),
+        "edad_sumsq": edad.fillna(0.0) ** 2,
+    }, index=df.index)
+
+    keys = {
+        "total": pd.Series("", index=df.index, dtype=object),
+        "genero": df["Genero"].astype(object),
+        "pais": df["Pais"].astype(object),
+        "rango": pd.Series(rango_column(df), index=df.index).astype(object),
+        "edad": edad_key,
+    }
+    if "Registered" in df.columns:
+        keys["edad_registered"] = edad_key + "|" + _number_keys(df["Registered"])
+
+    rows = []
+    for dimension, key in keys.items():
+        grouped = values.assign(key=key).dropna(subset=["key"]).groupby("key", sort=False)
+        agg = grouped.agg(n=("edad_n", "size"), edad_n=("edad_n", "sum"),
+                          edad_sum=("edad_sum", "sum"), edad_sumsq=("edad_sumsq", "sum"))
+        for key_value, n, edad_n, edad_sum, edad_sumsq in agg.itertuples():
+            rows.append((dimension, str(key_value), sign * int(n), sign * int(edad_n),
+                         sign * float(edad_sum), sign * float(edad_sumsq)))
+    return rows
+
+
+def apply_rows(cursor, table_name, rows):
+    """
+    Sumar las filas a la tabla de estadísticas (UPSERT por clave) y borrar
+    las claves que se quedan sin usuarios.
+    """
+    cursor.executemany(
+        f'INSERT INTO "{STATS_TABLE}" (table_name, dimension, key, n, edad_n, edad_sum, edad_sumsq) '
+        f'VALUES (?, ?, ?, ?, ?, ?, ?) '
+        f'ON CONFLICT(table_name, dimension, key) DO UPDATE SET '
+        f'n = n + excluded.n, edad_n = edad_n + excluded.edad_n, '
+        f'edad_sum = edad_sum + excluded.edad_sum, edad_sumsq = edad_sumsq + excluded.edad_sumsq',
+        [(table_name, *row) for row in rows],
+    )
+    cursor.execute(f'DELETE FROM "{STATS_TABLE}" WHERE table_name = ? AND n <= 0 AND dimension != ?',
+                   (table_name, META_DIMENSION))
+
+
+def _max_rowid(cursor, table_name):
+    cursor.execute(f'SELECT MAX(rowid) FROM "{table_name}"')
+    return cursor.fetchone()[0] or 0
+
+
+def stored_rowid(cursor, table_name):
+    """
+    Último rowid de la tabla de usuarios cuando se actualizaron las
+    estadísticas (None si no hay estadísticas).
+    """
+    cursor.execute(f'SELECT n FROM "{STATS_TABLE}" WHERE table_name = ? AND dimension = ? AND key = ?',
+                   (table_name, META_DIMENSION, "max_rowid"))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def is_current(cursor, table_name):
+    """
+    True si las estadísticas corresponden al contenido actual de la tabla.
+    """
+    return stored_rowid(cursor, table_name) == _max_rowid(cursor, table_name)
+
+
+def mark_current(cursor, table_name):
+    """
+    Guardar el último rowid de la tabla y sumar 1 a su versión de carga
+    (se llama una vez por carga, dentro de su transacción).
+    """
+    cursor.execute(
+        f'INSERT OR REPLACE INTO "{STATS_TABLE}" (table_name, dimension, key, n, edad_n, edad_sum, edad_sumsq) '
+        f'VALUES (?, ?, ?, ?, 0, 0, 0)',
+        (table_name, META_DIMENSION, "max_rowid", _max_rowid(cursor, table_name)),
+    )
+    cursor.execute(
+        f'INSERT INTO "{STATS_TABLE}" (table_name, dimension, key, n, edad_n, edad_sum, edad_sumsq) '
+        f'VALUES (?, ?, ?, 1, 0, 0, 0) ON CONFLICT(table_name, dimension, key) DO UPDATE SET n = n + 1',
+        (table_name, META_DIMENSION, LOAD_VERSION_KEY),
+    )
+
+
+def load_version(cursor, table_name):
+    """
+    Versión de carga de la tabla: cambia con cada carga confirmada de
+    load_sqlite3_db (0 si nunca se ha cargado con estadísticas).
+    """
+    cursor.execute(f'SELECT n FROM "{STATS_TABLE}" WHERE table_name = ? AND dimension = ? AND key = ?',
+                   (table_name, META_DIMENSION, LOAD_VERSION_KEY))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def clear_statistics(cursor, table_name):
+    # La versión de carga se conserva: tras un 'replace' debe seguir creciendo
+    ensure_table(cursor)
+    cursor.execute(f'DELETE FROM "{STATS_TABLE}" WHERE table_name = ? AND NOT (dimension = ? AND key = ?)',
+                   (table_name, META_DIMENSION, LOAD_VERSION_KEY))
+
+
+def rebuild_statistics(cursor, table_name):
+    """
+    Recalcular todas las estadísticas con consultas GROUP BY sobre la tabla
+    (una pasada completa, solo si no estaban al día).
+    """
+    clear_statistics(cursor, table_name)
+    table = f'"{table_name}"'
+    aggregates = "COUNT(*), COUNT(Edad), TOTAL(Edad), TOTAL(Edad * Edad)"
+    queries = {
+        "total": f"SELECT '', {aggregates} FROM {table}",
+        "genero": f"SELECT Genero, {aggregates} FROM {table} WHERE Genero IS NOT NULL GROUP BY Genero",
+        "pais": f"SELECT Pais, {aggregates} FROM {table} WHERE Pais IS NOT NULL GROUP BY Pais",
+        "rango": f"SELECT {rango_case()} AS rango, {aggregates} FROM {table} GROUP BY rango HAVING rango IS NOT NULL",
+        "edad": f"SELECT CAST(Edad AS TEXT), {aggregates} FROM {table} WHERE Edad IS NOT NULL GROUP BY Edad",
+        "edad_registered": f"""SELECT CAST(Edad AS TEXT) || '|' || CAST(Registered AS TEXT), {aggregates}
+                               FROM {table} WHERE Edad IS NOT NULL AND Registered IS NOT NULL
+                               GROUP BY Edad, Registered""",
+    }
+    rows = []
+    for dimension, sql in queries.items():
+        cursor.execute(sql)
+        rows.extend((dimension, str(key), *values) for key, *values in cursor.fetchall() if values[0])
+    apply_rows(cursor, table_name, rows)
+
+
+def existing_rows(cursor, table_name, keys, batch_size=900):
+    """
+    Valores actuales (Genero, Pais, Edad, Registered) de los usuarios de
+    `keys` que ya están en la tabla, buscados por el índice único de uuid.
+    """
+    columns = ["Genero", "Pais", "Edad", "Registered"]
+    rows = []
+    keys = list(keys)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f'SELECT {", ".join(columns)} FROM "{table_name}" WHERE uuid IN ({placeholders})', batch)
+        rows.extend(cursor.fetchall())
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _counts(frame, dimension, index_name):
+    part = frame[frame["dimension"] == dimension].sort_values(["n", "key"], ascending=[False, True])
+    serie = pd.Series(part["n"].to_numpy(dtype=np.int64), index=part["key"].to_list(), name="count")
+    serie.index.name = index_name
+    return serie
+
+
+def statistics_inputs(frame, hist_bins=AGE_HIST_BINS):
+    """
+    Convertir las filas de la tabla de estadísticas al diccionario de plot_inputs.
+    """
+    total = frame[frame["dimension"] == "total"]
+    n_users = int(total["n"].sum())
+    edad_n = int(total["edad_n"].sum())
+    average_age = float(total["edad_sum"].sum()) / edad_n if edad_n else float("nan")
+
+    genero = frame[(frame["dimension"] == "genero") & (frame["edad_n"] > 0)].sort_values("key")
+    avg_age_by_gender = pd.Series((genero["edad_sum"] / genero["edad_n"]).to_numpy(dtype=np.float64),
+                                  index=genero["key"].to_list(), name="Edad")
+    avg_age_by_gender.index.name = "Genero"
+
+    # Histograma ponderado con la frecuencia de cada edad (como sql_stats)
+    edad = frame[frame["dimension"] == "edad"]
+    edades = edad["key"].astype(np.float64).to_numpy()
+    order = np.argsort(edades)
+    counts, edges = np.histogram(edades[order], bins=hist_bins, weights=edad["n"].to_numpy()[order])
+    age_hist = (counts.astype(np.int64), edges)
+
+    pares = frame[frame["dimension"] == "edad_registered"]
+    bivar = pd.DataFrame([(*map(float, key.split("|")), n) for key, n in zip(pares["key"], pares["n"])],
+                         columns=["Edad", "Registered", "n"])
+    bivar = bivar.sort_values(["Edad", "Registered"], ignore_index=True).astype("int64")
+
+    rango = frame[frame["dimension"] == "rango"].set_index("key")["n"]
+    rango_counts = rango.reindex(RANGO_LABELS, fill_value=0).astype("int64")
+    rango_counts.index = pd.CategoricalIndex(RANGO_LABELS, categories=RANGO_LABELS, ordered=True, name="Edad")
+    rango_counts.name = "count"
+
+    return {
+        'n_users': n_users,
+        'gender_counts': _counts(frame, "genero", "Genero"),
+        'average_age': average_age,
+        'avg_age_by_gender': avg_age_by_gender,
+        'age_hist': age_hist,
+        'country_counts': _counts(frame, "pais", "Pais"),
+        'bivar': bivar,
+        'rango_counts': rango_counts,
+    }
+
+
+def read_statistics(db_name="usuarios.db", table_name="usuarios", hist_bins=AGE_HIST_BINS):
+    """
+    Leer las estadísticas de la tabla `statistics` (mismo formato que
+    plot_inputs). Solo se leen las filas agregadas, nunca la tabla de
+    usuarios. Devuelve None si no existen o no están al día.
+    """
+    if not os.path.exists(db_name):
+        raise FileNotFoundError(f"No existe la base de datos: {db_name}")
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+                       (STATS_TABLE, table_name))
+        if len(cursor.fetchall()) < 2 or not is_current(cursor, table_name):
+            return None
+        frame = pd.read_sql_query(
+            f'SELECT dimension, key, n, edad_n, edad_sum, edad_sumsq FROM "{STATS_TABLE}" '
+            f'WHERE table_name = ? AND dimension != ?', conn, params=(table_name, META_DIMENSION))
+    finally:
+        conn.close()
+    return statistics_inputs(frame, hist_bins)
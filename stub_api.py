@@ -0,0 +1,117 @@
+"""
+Servidor local que imita randomuser.me para probar la extracción sin red.
+
+Devuelve usuarios sintéticos (synthetic_users.py) con los parámetros
+results, seed y page de la API, y limita las peticiones con un token bucket
+propio: si se supera --rate responde 429 con Retry-After, como la API real
+cuando se le envían demasiadas peticiones. Con --error-rate se inyectan
+además 503 aleatorios.
+
+Uso:
+    python stub_api.py --port 8000 --rate 10 --burst 5
+    # en otra terminal
+    scheduler = AdaptiveScheduler(rate=2, max_concurrency=16)
+    api_etl("http://127.0.0.1:8000/api", 100000, "1234", page_size=1000, scheduler=scheduler)
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_users import generate_payload
+
+
+class ServerBucket:
+    """
+    Límite de peticiones por segundo del servidor (token bucket).
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+def make_server(host="127.0.0.1", port=8000, rate=None, burst=5, retry_after=1, error_rate=0.0, latency=0.0):
+    """
+    Crear el servidor (sin arrancarlo). rate=None no limita las peticiones.
+    En server.counters se cuentan las respuestas por código HTTP.
+    """
+    bucket = ServerBucket(rate, burst) if rate else None
+    counters = {}
+    counters_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body=b"", headers=None):
+            with counters_lock:
+                counters[status] = counters.get(status, 0) + 1
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if bucket is not None and not bucket.take():
+                self._send(429, b'{"error": "Too Many Requests"}', {"Retry-After": str(retry_after)})
+                return
+            if error_rate and random.random() < error_rate:
+                self._send(503, b'{"error": "Service Unavailable"}')
+                return
+            query = parse_qs(urlparse(self.path).query)
+            results = int(query.get("results", ["1"])[0])
+            seed = query.get("seed", ["1234"])[0]
+            page = int(query.get("page", ["1"])[0])
+            if latency:
+                time.sleep(latency)
+            body = json.dumps(generate_payload(results, seed, page)).encode("utf-8")
+            self._send(200, body, {"Content-Type": "application/json"})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.counters = counters
+    return server
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API local de usuarios sintéticos con límite de peticiones")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rate", type=float, help="Peticiones por segundo permitidas (sin límite por defecto)")
+    parser.add_argument("--burst", type=int, default=5, help="Ráfaga máxima de peticiones")
+    parser.add_argument("--retry-after", type=int, default=1, help="Segundos de la cabecera Retry-After")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 503 aleatorias")
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos de espera por respuesta")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.rate, args.burst, args.retry_after, args.error_rate, args.latency)
+    print(f"API local en http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
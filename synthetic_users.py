@@ -0,0 +1,136 @@
+"""
+Generador de usuarios sintéticos con la misma estructura que randomuser.me.
+
+Permite medir el rendimiento de la ETL sin llamar a la API: cada usuario
+tiene los mismos campos anidados que data["results"] (name, location,
+login, dob, registered, picture, nat...). Con el mismo seed se generan
+siempre los mismos usuarios.
+
+Uso:
+    from synthetic_users import generate_payload
+    data = generate_payload(10000, seed="1234")
+    df_clean = transform(data)
+
+    python synthetic_users.py 100000 usuarios_100k.json
+"""
+
+import json
+import random
+import sys
+import uuid
+
+# Nacionalidad -> (país, ciudades, nombres, apellidos)
+NATIONALITIES = {
+    "AU": ("Australia", ["Sydney", "Melbourne", "Perth"], ["Jack", "Olivia", "Noah"], ["Smith", "Jones", "Brown"]),
+    "BR": ("Brazil", ["São Paulo", "Recife", "Curitiba"], ["João", "Ana", "Lucas"], ["Silva", "Souza", "Costa"]),
+    "CA": ("Canada", ["Toronto", "Montreal", "Calgary"], ["Liam", "Emma", "Leo"], ["Roy", "Martin", "Tremblay"]),
+    "CH": ("Switzerland", ["Zürich", "Genève", "Basel"], ["Luca", "Mia", "Noah"], ["Müller", "Meier", "Keller"]),
+    "DE": ("Germany", ["Berlin", "Hamburg", "München"], ["Lukas", "Lena", "Felix"], ["Müller", "Schmidt", "Weber"]),
+    "DK": ("Denmark", ["København", "Aarhus", "Odense"], ["William", "Ida", "Oscar"], ["Jensen", "Nielsen", "Hansen"]),
+    "ES": ("Spain", ["Madrid", "Barcelona", "Valencia"], ["Hugo", "Lucía", "Martín"], ["García", "López", "Martínez"]),
+    "FI": ("Finland", ["Helsinki", "Espoo", "Tampere"], ["Eino", "Aino", "Onni"], ["Korhonen", "Virtanen", "Mäkinen"]),
+    "FR": ("France", ["Paris", "Lyon", "Marseille"], ["Gabriel", "Jade", "Louis"], ["Martin", "Bernard", "Dubois"]),
+    "GB": ("United Kingdom", ["London", "Leeds", "Bristol"], ["Oliver", "Amelia", "Harry"], ["Taylor", "Wilson", "Evans"]),
+    "IE": ("Ireland", ["Dublin", "Cork", "Galway"], ["Jack", "Grace", "Conor"], ["Murphy", "Kelly", "Walsh"]),
+    "IN": ("India", ["Mumbai", "Delhi", "Pune"], ["Aarav", "Diya", "Vivaan"], ["Sharma", "Patel", "Reddy"]),
+    "IR": ("Iran", ["Tehran", "Shiraz", "Tabriz"], ["Ali", "Zahra", "Reza"], ["Ahmadi", "Hosseini", "Karimi"]),
+    "MX": ("Mexico", ["Guadalajara", "Puebla", "Monterrey"], ["Santiago", "Sofía", "Mateo"], ["Hernández", "Pérez", "Ramírez"]),
+    "NL": ("Netherlands", ["Amsterdam", "Utrecht", "Rotterdam"], ["Daan", "Emma", "Sem"], ["de Jong", "Jansen", "Bakker"]),
+    "NO": ("Norway", ["Oslo", "Bergen", "Trondheim"], ["Jakob", "Nora", "Emil"], ["Hansen", "Johansen", "Olsen"]),
+    "NZ": ("New Zealand", ["Auckland", "Wellington", "Dunedin"], ["Oliver", "Isla", "Jack"], ["Wilson", "Thompson", "Walker"]),
+    "RS": ("Serbia", ["Beograd", "Novi Sad", "Niš"], ["Luka", "Milica", "Stefan"], ["Jovanović", "Petrović", "Nikolić"]),
+    "TR": ("Turkey", ["İstanbul", "Ankara", "İzmir"], ["Yusuf", "Zeynep", "Emir"], ["Yılmaz", "Kaya", "Demir"]),
+    "UA": ("Ukraine", ["Kyiv", "Lviv", "Odesa"], ["Andriy", "Oksana", "Taras"], ["Shevchenko", "Bondarenko", "Melnyk"]),
+    "US": ("United States", ["Dallas", "Seattle", "Chicago"], ["James", "Emma", "Ethan"], ["Johnson", "Williams", "Miller"]),
+}
+NATS = list(NATIONALITIES)
+
+STREETS = ["Main Street", "Calle Mayor", "Hauptstraße", "Rue de la Paix", "Park Lane", "Avenida Central"]
+TIMEZONES = [("-5:00", "Eastern Time (US & Canada), Bogota, Lima"), ("+1:00", "Brussels, Copenhagen, Madrid, Paris"),
+             ("+5:30", "Bombay, Calcutta, Madras, New Delhi"), ("+10:00", "Eastern Australia, Guam, Vladivostok")]
+TITLES = {"male": ["Mr", "Monsieur"], "female": ["Ms", "Mrs", "Miss", "Madame"]}
+
+# Año de referencia para calcular dob.age y registered.age
+REFERENCE_YEAR = 2025
+
+
+def _user(rng):
+    nat = rng.choice(NATS)
+    country, cities, firsts, lasts = NATIONALITIES[nat]
+    gender = "male" if rng.random() < 0.5 else "female"
+    first, last = rng.choice(firsts), rng.choice(lasts)
+    username = f"{first.lower()}{rng.randrange(1000)}"
+
+    age = rng.randint(18, 80)
+    registered_age = rng.randint(0, 20)
+    birth_year = REFERENCE_YEAR - age
+    registered_year = REFERENCE_YEAR - registered_age
+    offset, description = rng.choice(TIMEZONES)
+    picture_id = rng.randrange(100)
+    folder = "men" if gender == "male" else "women"
+
+    return {
+        "gender": gender,
+        "name": {"title": rng.choice(TITLES[gender]), "first": first, "last": last},
+        "location": {
+            "street": {"number": rng.randint(1, 9999), "name": rng.choice(STREETS)},
+            "city": rng.choice(cities),
+            "state": rng.choice(cities),
+            "country": country,
+            "postcode": rng.randint(10000, 99999),
+            # La API devuelve las coordenadas como texto
+            "coordinates": {"latitude": f"{rng.uniform(-90, 90):.4f}", "longitude": f"{rng.uniform(-180, 180):.4f}"},
+            "timezone": {"offset": offset, "description": description},
+        },
+        "email": f"{first.lower()}.{last.lower()}@example.com",
+        "login": {
+            "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "username": username,
+            "password": "password",
+            "salt": "salt1234",
+            "md5": "%032x" % rng.getrandbits(128),
+            "sha1": "%040x" % rng.getrandbits(160),
+            "sha256": "%064x" % rng.getrandbits(256),
+        },
+        "dob": {"date": f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z", "age": age},
+        "registered": {"date": f"{registered_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z",
+                       "age": registered_age},
+        "phone": f"{rng.randrange(10**8, 10**9)}",
+        "cell": f"{rng.randrange(10**8, 10**9)}",
+        "id": {"name": nat, "value": f"{rng.randrange(10**7, 10**8)}"},
+        "picture": {
+            "large": f"https://randomuser.me/api/portraits/{folder}/{picture_id}.jpg",
+            "medium": f"https://randomuser.me/api/portraits/med/{folder}/{picture_id}.jpg",
+            "thumbnail": f"https://randomuser.me/api/portraits/thumb/{folder}/{picture_id}.jpg",
+        },
+        "nat": nat,
+    }
+
+
+def generate_users(n, seed="1234", page=1):
+    """
+    Generar n usuarios sintéticos. Igual que en la API, (seed, page) definen
+    siempre el mismo conjunto de usuarios.
+    """
+    rng = random.Random(f"{seed}-{page}")
+    return [_user(rng) for _ in range(n)]
+
+
+def generate_payload(n, seed="1234", page=1):
+    """
+    Generar una respuesta completa con el formato de randomuser.me:
+    {"results": [...], "info": {"seed", "results", "page", "version"}}.
+    """
+    return {
+        "results": generate_users(n, seed, page),
+        "info": {"seed": seed, "results": n, "page": page, "version": "1.4"},
+    }
+
+
+# --- Ejecutar el script ---
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"usuarios_sinteticos_{n}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(generate_payload(n), f, ensure_ascii=False)
+    print(f"{n} usuarios sintéticos guardados en: {out}")
@@ -0,0 +1,42 @@
+"""
+Fixtures comunes de los tests: los módulos de la ETL están en la raíz del
+repositorio y la API se sustituye por stub_api (sin red).
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Gráficos sin ventanas
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from stub_api import make_server  # noqa: E402
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Crear y arrancar un servidor stub_api en un puerto libre; devuelve
+    (url, server). Acepta los mismos parámetros que make_server.
+    """
+    servers = []
+
+    def start(**options):
+        server = make_server(port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/api", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub_url(stub_server):
+    url, _ = stub_server()
+    return url
@@ -0,0 +1,24 @@
+from Functions_v1 import MAX_RESULTS_PER_PAGE, api_etl, api_etl_stream
+from synthetic_users import generate_users
+
+
+def test_paginated_extraction_trims_last_page(stub_server):
+    url, server = stub_server()
+    results = 2 * MAX_RESULTS_PER_PAGE + 345
+    data = api_etl(url, results, "1234", page_size=MAX_RESULTS_PER_PAGE)
+
+    # Tres peticiones de MAX_RESULTS_PER_PAGE; de la última solo se usan 345
+    assert server.counters == {200: 3}
+    assert len(data["results"]) == results
+    assert data["info"]["results"] == results and data["info"]["page"] == 3
+    assert data["results"][MAX_RESULTS_PER_PAGE:MAX_RESULTS_PER_PAGE + 5] == generate_users(5, "1234", page=2)
+    assert data["results"][-1] == generate_users(345, "1234", page=3)[-1]
+
+    streamed = list(api_etl_stream(url, results, "1234", page_size=MAX_RESULTS_PER_PAGE))
+    assert streamed == data["results"]
+
+
+def test_small_page_size_is_split(stub_url):
+    data = api_etl(stub_url, 250, "abc", page_size=100)
+    pages = generate_users(100, "abc", 1) + generate_users(100, "abc", 2) + generate_users(100, "abc", 3)
+    assert data["results"] == pages[:250]
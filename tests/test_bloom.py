@@ -0,0 +1,79 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bloom import BloomFilter, load_filter
+from Functions_v1 import load_sqlite3_db, transform
+from synthetic_users import generate_payload
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    added = [f"user-{i}" for i in range(10_000)]
+    bloom.add_many(added)
+    assert bloom.contains_many(added).all()
+
+    others = bloom.contains_many([f"otro-{i}" for i in range(20_000)])
+    assert others.mean() < 0.03
+    assert not bloom.full()
+
+
+def test_full_after_capacity():
+    bloom = BloomFilter(100)
+    bloom.add_many([str(i) for i in range(101)])
+    assert bloom.full()
+
+
+def _count(db, table="usuarios"):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def test_append_is_idempotent(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    df = transform(generate_payload(300, seed="a"))
+    assert load_sqlite3_db(df, db, data_load_type="replace", verbose=False) == 300
+
+    # Repetir la misma carga no añade filas; solo se escriben los usuarios nuevos
+    assert load_sqlite3_db(df, db, data_load_type="append", verbose=False) == 0
+    nuevos = transform(generate_payload(100, seed="b"))
+    mezcla = pd.concat([df.iloc[:50], nuevos], ignore_index=True)
+    assert load_sqlite3_db(mezcla, db, data_load_type="append", verbose=False) == 100
+    assert _count(db) == 400
+
+    # El filtro guardado sigue al día y contiene todos los uuid cargados
+    with sqlite3.connect(db) as conn:
+        bloom = load_filter(conn.cursor(), "usuarios")
+    assert bloom is not None
+    assert bloom.contains_many(mezcla["uuid"]).all()
+
+
+def test_upsert_updates_existing_users(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    df = transform(generate_payload(200))
+    load_sqlite3_db(df, db, data_load_type="replace", verbose=False)
+
+    cambiados = df.iloc[:20].copy()
+    cambiados["Edad"] = 99
+    load_sqlite3_db(cambiados, db, data_load_type="upsert", verbose=False)
+
+    with sqlite3.connect(db) as conn:
+        edades = dict(conn.execute("SELECT uuid, Edad FROM usuarios").fetchall())
+    assert len(edades) == 200
+    assert all(edades[uuid] == 99 for uuid in cambiados["uuid"])
+
+
+def test_rows_without_uuid_are_not_collapsed(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    df = transform(generate_payload(10))
+    df.loc[[1, 2, 3], "uuid"] = np.nan
+    df = pd.concat([df, df.iloc[[5]]], ignore_index=True)
+    assert load_sqlite3_db(df, db, data_load_type="replace", verbose=False) == 10
+
+
+def test_upsert_requires_uuid(tmp_path):
+    df = transform(generate_payload(5)).drop(columns="uuid")
+    with pytest.raises(ValueError, match="uuid"):
+        load_sqlite3_db(df, str(tmp_path / "usuarios.db"), data_load_type="upsert", verbose=False)
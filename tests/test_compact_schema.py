@@ -0,0 +1,35 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from Functions_v1 import load_sqlite3_db, memory_report, transform
+from synthetic_users import generate_payload
+
+
+def test_compact_dtypes():
+    data = generate_payload(500)
+    default = transform(data)
+    compact = transform(data, compact=True)
+
+    assert compact["Edad"].dtype == np.uint8
+    assert compact["Registered"].dtype == np.uint8
+    assert compact["latitude"].dtype == np.float32
+    assert compact["longitude"].dtype == np.float32
+    assert isinstance(compact["Nombre"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["Apellido"].dtype, pd.CategoricalDtype)
+    assert compact["uuid"].dtype == default["uuid"].dtype
+    assert memory_report(compact)["bytes_per_row"] < memory_report(default)["bytes_per_row"]
+
+
+def test_compact_sqlite_output_unchanged(tmp_path):
+    data = generate_payload(500)
+    tables = []
+    for compact in (False, True):
+        db = str(tmp_path / f"compact_{compact}.db")
+        load_sqlite3_db(transform(data, compact=compact), db, "usuarios", "replace")
+        with sqlite3.connect(db) as conn:
+            schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'usuarios'").fetchone()
+            rows = conn.execute("SELECT * FROM usuarios ORDER BY uuid").fetchall()
+        tables.append((schema, rows))
+    assert tables[0] == tables[1]
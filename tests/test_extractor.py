@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from extractor import compile_extractor
+from synthetic_users import generate_users
+
+COLUMNS = {
+    "dob.age": "Edad",
+    "gender": "Genero",
+    "location.country": "Pais",
+    "location.coordinates.latitude": "latitude",
+    "registered.age": "Registered",
+    "login.uuid": "uuid",
+    "no.existe": "Fantasma",
+}
+
+
+def normalized(records):
+    # Referencia: json_normalize + selección de las columnas existentes + rename
+    df = pd.json_normalize(records)
+    return df[[path for path in COLUMNS if path in df.columns]].rename(columns=COLUMNS)
+
+
+def messy_users():
+    users = generate_users(8)
+    del users[1]["dob"]["age"]                   # clave anidada ausente
+    users[2]["location"] = None                  # nivel intermedio None
+    del users[3]["location"]["coordinates"]
+    users[4]["login"] = None
+    del users[5]["gender"]
+    users[6]["registered"] = {}
+    return users
+
+
+@pytest.mark.parametrize("records", [generate_users(50), messy_users()], ids=["completos", "incompletos"])
+def test_matches_json_normalize(records):
+    got = compile_extractor(COLUMNS)(records)
+    pd.testing.assert_frame_equal(got, normalized(records))
+    assert "Fantasma" not in got.columns
+
+
+def test_typed_columns_with_missing_values():
+    records = messy_users()
+    dtypes = {"Edad": "int", "latitude": "float", "Genero": "category", "Pais": "category"}
+    got = compile_extractor(COLUMNS, dtypes)(records)
+    ref = normalized(records)
+
+    # Con ausentes la columna int pasa a float, como en json_normalize
+    np.testing.assert_array_equal(got["Edad"].to_numpy(), ref["Edad"].to_numpy())
+    np.testing.assert_allclose(got["latitude"].to_numpy(), pd.to_numeric(ref["latitude"]).to_numpy())
+    assert isinstance(got["Genero"].dtype, pd.CategoricalDtype)
+    assert got["Pais"].astype(object).where(got["Pais"].notna(), None).tolist() == \
+        ref["Pais"].astype(object).where(ref["Pais"].notna(), None).tolist()
+
+
+def test_extractor_is_compiled_once():
+    assert compile_extractor(COLUMNS) is compile_extractor(dict(COLUMNS))
+    assert compile_extractor(COLUMNS).__name__ == "extract"
+    assert len(compile_extractor(COLUMNS)([])) == 0
@@ -0,0 +1,18 @@
+from collections import Counter
+
+from geo import ZOOM_LEVELS, choropleth_data, country_iso3, geo_bundle_available, load_world
+from synthetic_users import generate_users
+
+
+def test_bundle_is_committed():
+    assert geo_bundle_available()
+    for zoom in ZOOM_LEVELS:
+        assert load_world(zoom)["features"]
+
+
+def test_synthetic_countries_have_geometry():
+    counts = Counter(user["location"]["country"] for user in generate_users(500))
+    world, df = choropleth_data(counts)
+    assert df["count"].sum() == 500
+    assert len(world["features"]) == len(df)
+    assert country_iso3("United States") == "USA"
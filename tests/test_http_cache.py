@@ -0,0 +1,60 @@
+import os
+import time
+
+from Functions_v1 import api_etl
+from http_cache import ResponseCache
+
+URL = "http://example.test/api"
+
+
+def params(page):
+    return {"results": 10, "seed": "1234", "page": page, "format": "json"}
+
+
+def test_roundtrip_and_key_normalization(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(URL, params(1), b'{"results": []}')
+    assert cache.get(URL, params(1)) == b'{"results": []}'
+    # Misma respuesta: sin 'page' la API devuelve la primera, la barra final no cuenta
+    assert cache.get(URL + "/", {"results": 10, "seed": "1234"}) == b'{"results": []}'
+    assert cache.get(URL, params(2)) is None
+    assert not ResponseCache.cacheable({"results": 10})
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put(URL, params(1), b"viejo")
+    path = cache._path(cache.key(URL, params(1)))
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert cache.get(URL, params(1)) is None
+    assert not os.path.exists(path)
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    body = os.urandom(4096)   # no se comprime: cada entrada ocupa ~4 KB
+    cache = ResponseCache(str(tmp_path), max_bytes=10_000)
+    cache.put(URL, params(1), body)
+    cache.put(URL, params(2), body)
+    # La página 2 se usó hace más tiempo que la 1
+    now = time.time()
+    for page, atime in ((1, now - 10), (2, now - 20)):
+        path = cache._path(cache.key(URL, params(page)))
+        os.utime(path, (atime, os.stat(path).st_mtime))
+
+    cache.put(URL, params(3), body)
+    assert cache.get(URL, params(2)) is None
+    assert cache.get(URL, params(1)) == body
+    assert cache.get(URL, params(3)) == body
+    assert cache.size() <= 10_000
+
+
+def test_cached_extraction_skips_network(tmp_path, stub_server):
+    url, server = stub_server()
+    cache = ResponseCache(str(tmp_path))
+    stats = {}
+    first = api_etl(url, 300, "1234", page_size=100, cache=cache, stats=stats)
+    second = api_etl(url, 300, "1234", page_size=100, cache=cache, stats=stats)
+    assert first == second
+    assert server.counters == {200: 3}
+    assert stats["requests"] == 3 and stats["cache_hits"] == 3
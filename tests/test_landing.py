@@ -0,0 +1,105 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ETL_main_v1 import run_etl
+from Functions_v1 import api_etl, api_etl_stream, transform
+from http_cache import ResponseCache
+from landing import LandingZone
+
+
+def segment_bytes(zone):
+    return sum(os.path.getsize(os.path.join(zone.segments_dir, name)) for name in os.listdir(zone.segments_dir))
+
+
+def test_replay_matches_extraction(tmp_path, stub_url):
+    zone = LandingZone(str(tmp_path / "landing"), fsync=False)
+    run = zone.new_run("test", url=stub_url, seed="1234")
+    data = api_etl(stub_url, 900, "1234", page_size=300, landing=run)
+
+    assert zone.pages(run.run_id) == [1, 2, 3]
+    replay = zone.replay(run.run_id)
+    assert replay["results"] == data["results"]
+    pd.testing.assert_frame_equal(transform(replay), transform(data))
+    # Cada página se lee sola, sin descomprimir las demás
+    assert zone.load_page(run.run_id, 2)["results"] == data["results"][300:600]
+    assert zone.replay(run.run_id, pages=[3], results=10)["results"] == data["results"][600:610]
+
+    # Otra instancia (otro proceso) lee el mismo índice
+    other = LandingZone(str(tmp_path / "landing"))
+    assert [r["run"] for r in other.runs()] == [run.run_id]
+
+
+def test_streaming_pages_are_landed(tmp_path, stub_url):
+    zone = LandingZone(str(tmp_path / "landing"), fsync=False)
+    run = zone.new_run("stream")
+    users = list(api_etl_stream(stub_url, 250, "1234", page_size=100, landing=run))
+    # La última página se guarda completa aunque solo se usen 50 usuarios
+    assert list(zone.iter_records(run.run_id))[:250] == users
+    assert zone.runs()[0]["pages"] == 3
+
+
+def test_cache_hits_do_not_grow_segments(tmp_path, stub_url):
+    zone = LandingZone(str(tmp_path / "landing"), fsync=False)
+    cache = ResponseCache(str(tmp_path / "cache"))
+    runs = []
+    for _ in range(3):
+        run = zone.new_run("cached")
+        api_etl(stub_url, 600, "1234", page_size=200, cache=cache, landing=run)
+        runs.append(run.run_id)
+        if len(runs) == 1:
+            size = segment_bytes(zone)
+
+    assert segment_bytes(zone) == size
+    assert zone.replay(runs[2])["results"] == zone.replay(runs[0])["results"]
+    stored = {run["run"]: run["stored_bytes"] for run in zone.runs()}
+    assert stored[runs[0]] == size and stored[runs[1]] == stored[runs[2]] == 0
+
+
+def test_torn_index_line_is_ignored(tmp_path, stub_url):
+    root = str(tmp_path / "landing")
+    zone = LandingZone(root, fsync=False)
+    run = zone.new_run("test")
+    api_etl(stub_url, 100, "1234", landing=run)
+    # Escritura interrumpida a mitad de una línea del índice
+    with open(zone.index_path, "a", encoding="utf-8") as f:
+        f.write('{"run": "x", "pa')
+
+    second = zone.new_run("test")
+    api_etl(stub_url, 100, "4321", landing=second)
+    reopened = LandingZone(root)
+    assert reopened.pages(run.run_id) == [1]
+    assert reopened.pages(second.run_id) == [1]
+
+
+@pytest.mark.parametrize("chunked_mode", [False, True])
+def test_replay_reproduces_requested_users(tmp_path, monkeypatch, stub_url, chunked_mode):
+    # 250 usuarios en páginas de 100: la última página guardada trae 100
+    monkeypatch.chdir(tmp_path)
+    zone = LandingZone("landing", fsync=False)
+    run = zone.new_run("test", url=stub_url, seed="1234", results=250)
+    data = api_etl(stub_url, 250, "1234", page_size=100, landing=run)
+    assert sum(len(zone.load_page(run.run_id, page)["results"]) for page in zone.pages(run.run_id)) == 300
+
+    assert zone.replay(run.run_id)["results"] == data["results"]
+    assert list(zone.iter_records(run.run_id)) == data["results"]
+    assert len(zone.replay(run.run_id, results=280)["results"]) == 280
+
+    run_etl(replay=run.run_id, landing_dir="landing", plots=False, chunked_mode=chunked_mode, chunk_size=60)
+    with sqlite3.connect("usuarios.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 250
+
+
+def test_landing_is_opt_in(tmp_path, monkeypatch, stub_url):
+    from pipeline import build_pipeline
+
+    monkeypatch.chdir(tmp_path)
+    options = {"url": stub_url, "users": 50, "maps": False, "parquet": False}
+    build_pipeline(**options).run(["load"])
+    assert not os.path.exists("landing")
+
+    build_pipeline(**options, landing_dir="crudo").run(["load"])
+    zone = LandingZone("crudo")
+    assert [run["source"] for run in zone.runs()] == ["pipeline"]
@@ -0,0 +1,57 @@
+import contextlib
+import threading
+
+import pandas as pd
+import pytest
+
+from Functions_v1 import transform
+from metrics import StageMetrics
+from parallel_transform import transform_parallel
+from synthetic_users import generate_payload
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_parallel_matches_serial(compact):
+    data = generate_payload(2000)
+    # Usuarios sin coordenadas ni fecha de registro: los trozos deben mantener los tipos
+    del data["results"][7]["location"]["coordinates"]
+    del data["results"][1500]["registered"]
+
+    serial = transform(data, compact=compact)
+    parallel = transform_parallel(data, workers=3, compact=compact, min_shard=1)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_few_users_fall_back_to_serial():
+    data = generate_payload(10)
+    pd.testing.assert_frame_equal(transform_parallel(data, workers=4), transform(data))
+
+
+def _sampler_threads():
+    return [t for t in threading.enumerate() if t.name == "rss-sampler"]
+
+
+def test_samplers_paused_around_fork(monkeypatch):
+    import parallel_transform
+
+    seen = []
+    pause = parallel_transform.pause_samplers
+
+    @contextlib.contextmanager
+    def spy():
+        with pause():
+            seen.append(len(_sampler_threads()))
+            yield
+
+    monkeypatch.setattr(parallel_transform, "pause_samplers", spy)
+    data = generate_payload(300)
+    metrics = StageMetrics()
+    with metrics.stage("transform"):
+        assert len(_sampler_threads()) == 1
+        df = transform_parallel(data, workers=2, min_shard=1)
+        # El hilo vuelve a muestrear después de crear los procesos
+        assert len(_sampler_threads()) == 1
+    assert seen == [0]
+    assert not _sampler_threads()
+    assert len(df) == 300
+    assert metrics.stages[0]["peak_rss_bytes"]
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+
+import pytest
+
+from pipeline import Pipeline, Stage, build_pipeline
+
+
+# --- Huellas con etapas de juguete ---
+
+def double(x):
+    return 2 * x
+
+
+def triple(x):
+    return 3 * x
+
+
+def source(n):
+    return n
+
+
+def toy_pipeline(cache_dir, n=1, fn=double, output=None):
+    def write(value, path):
+        with open(path, "w") as f:
+            f.write(str(value))
+        return value
+
+    stages = [
+        Stage("source", source, params={"n": n}),
+        Stage("scaled", fn, deps=("source",)),
+        Stage("other", source, params={"n": 0}),
+    ]
+    if output is not None:
+        stages.append(Stage("write", write, deps=("scaled",), params={"path": output}, outputs=(output,)))
+    return Pipeline(stages, cache_dir=cache_dir)
+
+
+def ran(result):
+    return sorted(name for name, status in result.items() if status == "ejecutada")
+
+
+def test_second_run_uses_cache(tmp_path):
+    cache = str(tmp_path / "cache")
+    assert ran(toy_pipeline(cache).run()) == ["other", "scaled", "source"]
+    assert ran(toy_pipeline(cache).run()) == []
+
+
+def test_param_change_invalidates_dependents_only(tmp_path):
+    cache = str(tmp_path / "cache")
+    toy_pipeline(cache).run()
+    assert ran(toy_pipeline(cache, n=2).run()) == ["scaled", "source"]
+
+
+def test_code_change_invalidates_stage(tmp_path):
+    cache = str(tmp_path / "cache")
+    toy_pipeline(cache).run()
+    assert ran(toy_pipeline(cache, fn=triple).run()) == ["scaled"]
+
+
+def test_force_and_targets(tmp_path):
+    cache = str(tmp_path / "cache")
+    pipeline = toy_pipeline(cache)
+    assert ran(pipeline.run(targets=["scaled"])) == ["scaled", "source"]
+    assert ran(pipeline.run(targets=["scaled"], force=("source",))) == ["source"]
+    assert pipeline.status()["other"] == "pendiente"
+
+
+def test_missing_or_overwritten_output_reruns_stage(tmp_path):
+    cache, output = str(tmp_path / "cache"), str(tmp_path / "out.txt")
+    toy_pipeline(cache, output=output).run()
+    assert ran(toy_pipeline(cache, output=output).run()) == []
+
+    # Otro script sobrescribe la salida: la etapa se vuelve a ejecutar
+    with open(output, "w") as f:
+        f.write("sobrescrito por otro script")
+    assert ran(toy_pipeline(cache, output=output).run()) == ["write"]
+    assert open(output).read() == "2"
+
+    os.remove(output)
+    assert ran(toy_pipeline(cache, output=output).run()) == ["write"]
+
+
+def test_cycles_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Ciclo"):
+        Pipeline([Stage("a", source, deps=("b",)), Stage("b", source, deps=("a",))], cache_dir=str(tmp_path))
+
+
+# --- Pipeline de la ETL contra stub_api ---
+
+@pytest.fixture
+def etl_options(tmp_path, monkeypatch, stub_url):
+    # .cache_api se crea en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    return {"url": stub_url, "users": 120, "output_dir": "Resultados", "maps": False, "parquet": False}
+
+
+def test_etl_pipeline_is_incremental(etl_options):
+    first = build_pipeline(**etl_options).run()
+    assert set(first.values()) == {"ejecutada"}
+    with sqlite3.connect("usuarios.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 120
+    assert os.path.exists(os.path.join("Resultados", "statistics.csv"))
+
+    assert set(build_pipeline(**etl_options).run().values()) == {"caché"}
+
+    # Solo cambia un gráfico de salida: se dibuja ese gráfico
+    os.remove(os.path.join("Resultados", "distribucion_edad.png"))
+    assert ran(build_pipeline(**etl_options).run()) == ["plot:distribucion_edad"]
+
+    # Más usuarios: se vuelve a extraer y todo lo que depende de la extracción
+    assert set(build_pipeline(**{**etl_options, "users": 150}).run().values()) == {"ejecutada"}
+
+
+def test_unseeded_pipeline_extracts_every_run(etl_options):
+    options = {**etl_options, "seed": None}
+    build_pipeline(**options).run(targets=["transform"])
+    assert ran(build_pipeline(**options).run(targets=["transform"])) == ["extract", "transform"]
@@ -0,0 +1,82 @@
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from Functions_v1 import load_sqlite3_db, transform
+from query_service import make_server
+from synthetic_users import generate_payload
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "usuarios.db")
+    load_sqlite3_db(transform(generate_payload(200)), path, "usuarios", "replace")
+    return path
+
+
+@pytest.fixture
+def service_url(db):
+    server = make_server(db, port=0, pool_size=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.headers["X-Cache"], json.loads(response.read())
+
+
+def _status(url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url, timeout=10)
+    return error.value.code
+
+
+def test_cache_miss_then_hit(service_url):
+    cache, first = _get(f"{service_url}/query/resumen")
+    assert cache == "miss"
+    assert first["rows"][0]["usuarios"] == 200
+
+    cache, second = _get(f"{service_url}/query/resumen")
+    assert cache == "hit"
+    assert second == first
+    # Otros filtros son otra entrada de la caché
+    cache, _ = _get(f"{service_url}/query/resumen?genero=female")
+    assert cache == "miss"
+
+
+def test_load_invalidates_cache(service_url, db):
+    _, before = _get(f"{service_url}/query/resumen")
+    # Nueva carga: cambia load_version de stats_table
+    load_sqlite3_db(transform(generate_payload(50, seed="otra")), db, "usuarios", "append")
+    cache, after = _get(f"{service_url}/query/resumen")
+    assert cache == "miss"
+    assert after["rows"][0]["usuarios"] == 250
+    assert after["version"] != before["version"]
+
+
+def test_insert_without_stats_invalidates_cache(service_url, db):
+    _get(f"{service_url}/query/resumen")
+    # Sin pasar por load_sqlite3_db solo cambia MAX(rowid)
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO usuarios (uuid, Edad) VALUES ('manual', 30)")
+    cache, after = _get(f"{service_url}/query/resumen")
+    assert cache == "miss"
+    assert after["rows"][0]["usuarios"] == 201
+
+
+@pytest.mark.parametrize("path", [
+    "/query/resumen?edad_min=abc",
+    "/query/resumen?color=azul",
+    "/query/desconocida",
+])
+def test_bad_request(service_url, path):
+    assert _status(f"{service_url}{path}") == 400
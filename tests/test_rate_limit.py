@@ -0,0 +1,38 @@
+from Functions_v1 import api_etl
+from rate_limit import AIMD, AdaptiveScheduler, parse_retry_after
+
+
+def test_aimd_multiplicative_decrease_and_additive_increase():
+    aimd = AIMD(8, minimum=1, maximum=16, increase=1.0, decrease=0.5, cooldown=60)
+    # Slow start: cada éxito suma increase
+    assert aimd.on_success() == 9
+    assert aimd.on_throttle() == 4.5
+    # Dentro del cooldown una ráfaga de avisos no vuelve a reducir
+    assert aimd.on_throttle() == 4.5
+    # Tras el primer aviso, +increase por ventana de `value` éxitos
+    assert aimd.on_success() == 4.5 + 1 / 4.5
+    assert AIMD(1, minimum=1, maximum=4).on_throttle() == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+    assert parse_retry_after("mañana") is None
+    assert parse_retry_after(None) is None
+
+
+def test_scheduler_backs_off_on_429(stub_server):
+    # El servidor admite 20 peticiones/s; el scheduler empieza pidiendo 100/s
+    url, server = stub_server(rate=20, burst=5, retry_after=0)
+    scheduler = AdaptiveScheduler(rate=100, max_rate=200, concurrency=8, max_concurrency=8,
+                                  max_attempts=30, backoff=0.01)
+    data = api_etl(url, 400, "1234", page_size=20, scheduler=scheduler)
+
+    assert len(data["results"]) == 400
+    report = scheduler.report()
+    assert server.counters.get(429, 0) > 0
+    assert report["throttled"] == server.counters[429]
+    assert report["ok"] == server.counters[200] == 20
+    # El ritmo y la concurrencia bajan desde los valores iniciales
+    assert report["rate"] < 100
+    assert report["concurrency"] < 8
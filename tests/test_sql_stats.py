@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from Functions_v1 import load_sqlite3_db, transform
+from plots import plot_inputs, write_statistics
+from sql_stats import compute_statistics_sql, make_plots_from_db
+from synthetic_users import generate_payload
+
+
+def _loaded(tmp_path, n=400):
+    df_clean = transform(generate_payload(n))
+    db = str(tmp_path / "usuarios.db")
+    load_sqlite3_db(df_clean, db, "usuarios", "replace")
+    return df_clean, db
+
+
+def test_sql_statistics_match_dataframe(tmp_path):
+    df_clean, db = _loaded(tmp_path)
+    expected = plot_inputs(df_clean)
+    got = compute_statistics_sql(db)
+
+    assert got["n_users"] == expected["n_users"]
+    assert np.isclose(got["average_age"], expected["average_age"])
+    assert got["gender_counts"].to_dict() == expected["gender_counts"].to_dict()
+    assert got["country_counts"].sort_index().to_dict() == expected["country_counts"].sort_index().to_dict()
+    np.testing.assert_array_equal(got["age_hist"][0], expected["age_hist"][0])
+    assert got["rango_counts"].tolist() == expected["rango_counts"].tolist()
+    assert got["bivar"]["n"].sum() == len(df_clean)
+
+
+def test_make_plots_from_db(tmp_path):
+    df_clean, db = _loaded(tmp_path)
+    output_dir = str(tmp_path / "Resultados")
+    make_plots_from_db(db, output_dir=output_dir)
+
+    reference = str(tmp_path / "referencia")
+    os.makedirs(reference)
+    write_statistics(plot_inputs(df_clean), reference)
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join(output_dir, "statistics.csv")),
+                                  pd.read_csv(os.path.join(reference, "statistics.csv")))
+    assert len(pd.read_csv(os.path.join(output_dir, "raw_users.csv"))) == len(df_clean)
+    assert os.path.exists(os.path.join(output_dir, "bivar_age_registered.png"))
+
+
+def test_run_etl_plots_from_db(tmp_path, monkeypatch, stub_url):
+    from ETL_main_v1 import run_etl
+    from Functions_v1 import api_etl
+    from landing import LandingZone
+
+    monkeypatch.chdir(tmp_path)
+    run = LandingZone("landing", fsync=False).new_run("test", url=stub_url, seed="1234", results=150)
+    api_etl(stub_url, 150, "1234", landing=run)
+
+    run_etl(replay=run.run_id, landing_dir="landing", plots_from_db=True)
+    assert len(pd.read_csv(os.path.join("Resultados", "raw_users.csv"))) == 150
+    assert os.path.exists(os.path.join("Resultados", "statistics.csv"))
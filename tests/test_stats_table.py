@@ -0,0 +1,76 @@
+import copy
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import stats_table
+from accumulators import UserStats
+from Functions_v1 import load_sqlite3_db, transform
+from stats_table import read_statistics
+from synthetic_users import generate_payload
+
+
+def assert_inputs_equal(actual, expected):
+    assert actual["n_users"] == expected["n_users"]
+    assert np.isclose(actual["average_age"], expected["average_age"])
+    for key in ("gender_counts", "country_counts"):
+        pd.testing.assert_series_equal(actual[key].sort_index(), expected[key].sort_index(),
+                                       check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(actual["avg_age_by_gender"].sort_index(),
+                                   expected["avg_age_by_gender"].sort_index(), check_names=False)
+    np.testing.assert_array_equal(actual["age_hist"][0], expected["age_hist"][0])
+    pd.testing.assert_frame_equal(actual["bivar"], expected["bivar"])
+    np.testing.assert_array_equal(actual["rango_counts"].to_numpy(), expected["rango_counts"].to_numpy())
+
+
+def rebuilt_inputs(db, table="usuarios"):
+    # Estadísticas recalculadas con una pasada completa sobre la tabla
+    conn = sqlite3.connect(db, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    stats_table.rebuild_statistics(cursor, table)
+    stats_table.mark_current(cursor, table)
+    cursor.execute("COMMIT")
+    conn.close()
+    return read_statistics(db, table)
+
+
+def test_incremental_statistics_match_full_rebuild(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    primera = generate_payload(400, seed="a")
+    load_sqlite3_db(transform(primera), db, data_load_type="replace", verbose=False)
+    load_sqlite3_db(transform(generate_payload(300, seed="b")), db, data_load_type="append", verbose=False)
+
+    # Upsert: 50 usuarios cambian de edad y país (en la respuesta cruda, así
+    # transform recalcula RangoEdad), 100 son nuevos
+    cambiados = copy.deepcopy(primera["results"][:50])
+    for user in cambiados:
+        user["dob"]["age"] += 7
+        user["location"]["country"] = "Spain"
+    upsert = {"results": cambiados + generate_payload(100, seed="c")["results"]}
+    load_sqlite3_db(transform(upsert), db, data_load_type="upsert", verbose=False)
+
+    incremental = read_statistics(db)
+    assert incremental is not None
+    assert incremental["n_users"] == 800
+    assert_inputs_equal(incremental, rebuilt_inputs(db))
+
+
+def test_statistics_match_accumulators(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    df = transform(generate_payload(500))
+    load_sqlite3_db(df, db, data_load_type="replace", verbose=False)
+    assert_inputs_equal(read_statistics(db), UserStats().update_df(df).to_plot_inputs())
+
+
+def test_load_version_increases_and_stale_statistics_are_ignored(tmp_path):
+    db = str(tmp_path / "usuarios.db")
+    df = transform(generate_payload(50))
+    load_sqlite3_db(df, db, data_load_type="replace", verbose=False)
+    load_sqlite3_db(df, db, data_load_type="replace", verbose=False)
+    with sqlite3.connect(db) as conn:
+        assert stats_table.load_version(conn.cursor(), "usuarios") == 2
+        # Filas escritas sin pasar por load_sqlite3_db: las estadísticas ya no valen
+        conn.execute("INSERT INTO usuarios (uuid, Edad) VALUES ('externo', 30)")
+    assert read_statistics(db) is None
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from Functions_v1 import api_etl, api_etl_stream, iter_json_array
+from synthetic_users import generate_payload
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 4096])
+def test_document_split_across_chunks(size):
+    payload = generate_payload(20)
+    payload["results"][3]["name"]["first"] = "Ñandú Øster 東京"   # multibyte partido entre trozos
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_array(chunked(body, size))) == payload["results"]
+
+
+@pytest.mark.parametrize("size", [1, 5])
+def test_escaped_quotes_and_braces_inside_strings(size):
+    tricky = ['"}]', '{"results": [', '\\"', "a\\b", "},{", "]", "\n\t"]
+    payload = {"info": {"note": '"results": [1, 2]'}, "results": [{"s": s} for s in tricky], "tail": "}"}
+    body = json.dumps(payload).encode("utf-8")
+    assert list(iter_json_array(chunked(body, size))) == payload["results"]
+
+
+def test_numbers_split_at_chunk_end_and_other_keys():
+    body = b'{"info": {"page": 1}, "results": [1, 23, 456, -7.5e3], "extra": null}'
+    assert list(iter_json_array(chunked(body, 1))) == [1, 23, 456, -7.5e3]
+
+
+@pytest.mark.parametrize("body", [b'{"results": []}', b'{"results":[ ] , "info": {}}', b"{}", b'{"info": {}}'])
+def test_empty_or_missing_results(body):
+    assert list(iter_json_array(chunked(body, 2))) == []
+
+
+@pytest.mark.parametrize("cut", [10, 60, -3])
+def test_truncated_body_raises(cut):
+    body = json.dumps(generate_payload(3)).encode("utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(body[:cut], 16)))
+
+
+def test_truncated_body_yields_complete_users_first():
+    payload = generate_payload(3)
+    body = json.dumps(payload).encode("utf-8")
+    # Corte a mitad del tercer usuario
+    cut = body.index(json.dumps(payload["results"][2]).encode("utf-8")) + 50
+    users = []
+    with pytest.raises(ValueError):
+        for user in iter_json_array(chunked(body[:cut], 16)):
+            users.append(user)
+    assert users == payload["results"][:2]
+
+
+def test_stream_matches_api_etl(stub_url):
+    expected = api_etl(stub_url, 250, "1234", page_size=100)["results"]
+    assert list(api_etl_stream(stub_url, 250, "1234", page_size=100, chunk_size=97)) == expected